@@ -0,0 +1,244 @@
+"""
+BudgetIQ – Dialect-Aware Aggregation Queries
+Grouped SQL aggregates for the dashboard and AI engine, served from the rollup
+tables (see rollups.py). Buckets are grouped on the rollups' integer bucket
+columns (see buckets.py) and category_id, so every bucket comes back from a
+single integer GROUP BY with the same plan on SQLite and PostgreSQL; category
+names are joined onto the grouped rows afterwards.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func, select, literal, case
+from sqlalchemy.orm import Session
+from models import Category, DailyRollup, MonthlyRollup
+from rollups import INCOME, EXPENSE
+from buckets import bucket_number, bucket_number_sql
+
+# Bucket key for rows dated before the requested window (sorts before any real bucket)
+PRIOR_BUCKET = -10**9
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+# Rollup totals are maintained incrementally, so they pick up float noise from
+# repeated additions; amounts are currency, so aggregates are reported to the cent.
+MONEY_PLACES = 2
+
+
+def _money(value) -> float:
+    """Round an aggregated amount to currency precision."""
+    return round(float(value), MONEY_PLACES)
+
+
+def bucket_floor(day: date, granularity: str) -> date:
+    """Start of the bucket containing `day`."""
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def next_bucket(bucket_start: date, granularity: str) -> date:
+    """Start of the bucket following `bucket_start`."""
+    if granularity == "day":
+        return bucket_start + timedelta(days=1)
+    if granularity == "week":
+        return bucket_start + timedelta(weeks=1)
+    months = {"month": 1, "quarter": 3, "year": 12}[granularity]
+    index = bucket_start.year * 12 + bucket_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def count_buckets(first_day: date, last_day: date, granularity: str) -> int:
+    """Number of buckets spanned by [first_day, last_day], without materializing them."""
+    first, last = bucket_floor(first_day, granularity), bucket_floor(last_day, granularity)
+    if granularity == "day":
+        return (last - first).days + 1
+    if granularity == "week":
+        return (last - first).days // 7 + 1
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return months // {"month": 1, "quarter": 3, "year": 12}[granularity] + 1
+
+
+def bucket_starts(first_day: date, last_day: date, granularity: str) -> List[date]:
+    """Every bucket start covering [first_day, last_day], oldest first."""
+    starts = []
+    current = bucket_floor(first_day, granularity)
+    while current <= last_day:
+        starts.append(current)
+        current = next_bucket(current, granularity)
+    return starts
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _rollup_source(granularity: str):
+    """Coarsest rollup table that can serve a granularity, with its date column."""
+    if granularity in ("month", "quarter", "year"):
+        return MonthlyRollup, MonthlyRollup.month
+    return DailyRollup, DailyRollup.day
+
+
+def get_totals(db: Session, user_id: int) -> Dict[str, float]:
+    """All-time income/expense sums and counts for a user in one round trip."""
+    rows = db.execute(
+        select(
+            MonthlyRollup.kind,
+            func.sum(MonthlyRollup.total).label("total"),
+            func.sum(MonthlyRollup.count).label("count"),
+        ).where(MonthlyRollup.user_id == user_id).group_by(MonthlyRollup.kind)
+    ).all()
+    by_kind = {row.kind: row for row in rows}
+
+    def _total(kind):
+        return _money(by_kind[kind].total) if kind in by_kind else 0.0
+
+    def _count(kind):
+        return int(by_kind[kind].count) if kind in by_kind else 0
+
+    return {
+        "total_income": _total(INCOME),
+        "total_expense": _total(EXPENSE),
+        "income_count": _count(INCOME),
+        "expense_count": _count(EXPENSE),
+    }
+
+
+def get_window_totals(db: Session, user_id: int, since: date, recent_since: date, today: date) -> list:
+    """
+    One grouped pass over the daily rollups from `since` onwards, per
+    (kind, category, year_month): total and count, the same restricted to
+    days from `recent_since`, and today's count. Enough to answer every
+    month, trailing-window and today question about that period. Rows carry
+    both category_id and the category name.
+    """
+    return db.execute(_with_category_names(
+        _window_totals(since, recent_since, today).where(DailyRollup.user_id == user_id)
+    )).all()
+
+
+def get_window_totals_for_users(db: Session, lo: int, hi: int, since: date, recent_since: date, today: date) -> list:
+    """get_window_totals() for every user with id in [lo, hi) in one query; rows carry user_id."""
+    return db.execute(_with_category_names(
+        _window_totals(since, recent_since, today, DailyRollup.user_id)
+        .where(DailyRollup.user_id >= lo, DailyRollup.user_id < hi)
+    )).all()
+
+
+def _window_totals(since: date, recent_since: date, today: date, *group):
+    recent = DailyRollup.day >= recent_since
+    return select(
+        *group,
+        DailyRollup.kind,
+        DailyRollup.category_id,
+        DailyRollup.year_month,
+        func.sum(DailyRollup.total).label("total"),
+        func.sum(DailyRollup.count).label("count"),
+        func.sum(case((recent, DailyRollup.total), else_=0.0)).label("recent_total"),
+        func.sum(case((recent, DailyRollup.count), else_=0)).label("recent_count"),
+        func.sum(case((DailyRollup.day == today, DailyRollup.count), else_=0)).label("today_count"),
+    ).where(DailyRollup.day >= since).group_by(*group, DailyRollup.kind, DailyRollup.category_id, DailyRollup.year_month)
+
+
+def _with_category_names(grouped):
+    """Rows of a statement grouped on category_id, with the category name joined on."""
+    grouped = grouped.subquery("grouped")
+    return select(grouped, Category.name.label("category")).join(Category, Category.id == grouped.c.category_id)
+
+
+def get_bucket_series(
+    db: Session,
+    user_id: int,
+    granularity: str,
+    start: date,
+    end: date,
+) -> Dict[int, dict]:
+    """
+    Income/expense sums per bucket in [start, end), plus a running net worth.
+
+    Reads the rollup tables and groups once; everything dated before `start`
+    collapses into PRIOR_BUCKET so the window function's running total starts
+    from the opening balance. `start` and `end` must fall on day boundaries
+    (datetimes are truncated to their date).
+    Returns {bucket_number: row} for buckets that have data; the PRIOR_BUCKET
+    entry holds the opening balance.
+    """
+    model, column = _rollup_source(granularity)
+    start_day, end_day = _as_date(start), _as_date(end)
+    key = case((column < start_day, literal(PRIOR_BUCKET)), else_=bucket_number_sql(model, granularity))
+    grouped = select(
+        key.label("bucket"),
+        func.sum(case((model.kind == INCOME, model.total), else_=0.0)).label("income"),
+        func.sum(case((model.kind == EXPENSE, model.total), else_=0.0)).label("expense"),
+    ).where(model.user_id == user_id, column < end_day).group_by(key).subquery("grouped")
+
+    stmt = select(
+        grouped.c.bucket,
+        grouped.c.income,
+        grouped.c.expense,
+        func.sum(grouped.c.income - grouped.c.expense).over(order_by=grouped.c.bucket).label("net_worth"),
+    ).order_by(grouped.c.bucket)
+
+    return {
+        row.bucket: {
+            "income": _money(row.income),
+            "expense": _money(row.expense),
+            "net_worth": _money(row.net_worth),
+        }
+        for row in db.execute(stmt)
+    }
+
+
+def get_category_bucket_series(
+    db: Session,
+    user_id: int,
+    granularity: str,
+    start: date,
+    end: date,
+) -> Dict[int, Dict[str, Dict[str, float]]]:
+    """
+    Per-bucket, per-category totals in [start, end) in one grouped query:
+    {bucket_number: {"income": {category: total}, "expense": {category: total}}}.
+    Rows before `start` are folded into PRIOR_BUCKET (used for the opening balance).
+    """
+    model, column = _rollup_source(granularity)
+    start_day, end_day = _as_date(start), _as_date(end)
+    key = case((column < start_day, literal(PRIOR_BUCKET)), else_=bucket_number_sql(model, granularity))
+    rows = db.execute(_with_category_names(
+        select(key.label("bucket"), model.kind, model.category_id, func.sum(model.total).label("total"))
+        .where(model.user_id == user_id, column < end_day)
+        .group_by(key, model.kind, model.category_id)
+        .having(func.sum(model.count) > 0)
+    )).all()
+
+    series: Dict[int, Dict[str, Dict[str, float]]] = {}
+    for row in rows:
+        bucket = series.setdefault(row.bucket, {INCOME: {}, EXPENSE: {}})
+        bucket[row.kind][row.category] = _money(row.total)
+    return series
+
+
+def densify(series: Dict[int, dict], bucket_starts: List[date], granularity: str) -> List[dict]:
+    """
+    Expand a sparse bucket series onto the requested bucket starts.
+    Empty buckets report zero flows and carry the running net worth forward.
+    """
+    prior: Optional[dict] = series.get(PRIOR_BUCKET)
+    running = prior["net_worth"] if prior else 0.0
+    points = []
+    for bucket_start in bucket_starts:
+        row = series.get(bucket_number(bucket_start, granularity))
+        if row:
+            running = row["net_worth"]
+            points.append({"start": bucket_start, "income": row["income"], "expense": row["expense"], "net_worth": running})
+        else:
+            points.append({"start": bucket_start, "income": 0.0, "expense": 0.0, "net_worth": running})
+    return points
@@ -1,41 +1,171 @@
 """
 BudgetIQ - AI Insights Engine
 Powered by Google Gemini LLM with real user financial data context.
-Falls back to rule-based analysis if no API key is configured.
+Falls back to rule-based analysis if no API key is configured. The LLM sits
+behind a provider interface (LLM_PROVIDER), with a local fake for load tests.
 """
+import asyncio
+import json
 import logging
+import random
+import re
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from collections import defaultdict
+from dataclasses import dataclass, field
+import numpy as np
+from sqlalchemy import event, literal, select, union_all
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date
-from datetime import datetime, timedelta, timezone
-from models import Income, Expense
-from typing import List, Dict, Optional
-from config import GEMINI_API_KEY
+from fastapi.concurrency import run_in_threadpool
+from datetime import date, datetime, timedelta, timezone
+from database import SessionLocal
+from models import Income, Expense, PrecomputedInsights
+from aggregates import get_window_totals, MONEY_PLACES
+from forecast import get_forecast
+from rollups import rollup_day, INCOME, EXPENSE
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Optional
+from config import (
+    GEMINI_API_KEY, LLM_PROVIDER, LLM_TIMEOUT_SECONDS, LLM_MAX_CONCURRENCY,
+    FAKE_LLM_LATENCY_MS, FAKE_LLM_TOKENS_PER_SECOND, FAKE_LLM_ERROR_RATE, FAKE_LLM_REPLY_WORDS,
+)
 
 logger = logging.getLogger(__name__)
 
-# ─── Gemini LLM Setup ────────────────────────────────────
-_gemini_model = None
+# ─── LLM Providers ───────────────────────────────────────
 
-def _get_gemini_model():
-    """Lazy-initialize and return the Gemini generative model."""
-    global _gemini_model
-    if _gemini_model is not None:
-        return _gemini_model
-    if not GEMINI_API_KEY:
-        logger.info("No GEMINI_API_KEY set. AI chat will use rule-based fallback.")
-        return None
-    try:
+class LLMProvider(ABC):
+    """
+    Text generation backend for AI chat. Implementations must be safe to call
+    concurrently from the event loop; concurrency limits and timeouts are
+    applied by the callers (chat_response / chat_stream).
+    """
+    name = "llm"
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        """Full reply to a prompt."""
+
+    @abstractmethod
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Async iterator of reply text chunks, as they are generated."""
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google-generativeai's async API."""
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash"):
         import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-        _gemini_model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash",
-            system_instruction=_build_system_prompt(),
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name=model_name, system_instruction=_build_system_prompt())
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text if response else ""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. a safety or finish-reason-only chunk)
+                continue
+            if text:
+                yield text
+
+
+class FakeLLMError(RuntimeError):
+    """Simulated provider failure raised by FakeProvider."""
+
+
+class FakeProvider(LLMProvider):
+    """
+    Local stand-in for load tests and benchmarks: no network, configurable
+    time to first token, token throughput and failure rate. Replies are
+    canned text of `reply_words` words; with streaming, a simulated failure
+    may also strike mid-reply.
+    """
+    name = "fake"
+
+    _WORDS = ("your", "budget", "looks", "steady", "this", "month", "consider", "moving",
+              "a", "little", "more", "into", "savings", "and", "reviewing", "recurring", "costs")
+
+    def __init__(self, latency: float = 0.3, tokens_per_second: float = 50.0,
+                 error_rate: float = 0.0, reply_words: int = 60, seed: Optional[int] = None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.reply_words = reply_words
+        self._random = random.Random(seed)
+
+    def _tokens(self) -> List[str]:
+        return [self._WORDS[i % len(self._WORDS)] + " " for i in range(self.reply_words)]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    async def generate(self, prompt: str) -> str:
+        await asyncio.sleep(self.latency + self.reply_words * self._token_delay())
+        if self._random.random() < self.error_rate:
+            raise FakeLLMError("simulated LLM failure")
+        return "".join(self._tokens()).strip()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        tokens = self._tokens()
+        # Index of the token that fails instead of arriving (always within the reply)
+        fail_at = self._random.randint(0, len(tokens) - 1) if tokens and self._random.random() < self.error_rate else None
+        await asyncio.sleep(self.latency)
+        for i, token in enumerate(tokens):
+            if i == fail_at:
+                raise FakeLLMError("simulated LLM failure")
+            if i:
+                await asyncio.sleep(self._token_delay())
+            yield token
+
+
+_provider: Optional[LLMProvider] = None
+_provider_loaded = False
+
+
+def _create_provider() -> Optional[LLMProvider]:
+    if LLM_PROVIDER == "none":
+        return None
+    if LLM_PROVIDER == "fake":
+        return FakeProvider(
+            latency=FAKE_LLM_LATENCY_MS / 1000,
+            tokens_per_second=FAKE_LLM_TOKENS_PER_SECOND,
+            error_rate=FAKE_LLM_ERROR_RATE,
+            reply_words=FAKE_LLM_REPLY_WORDS,
         )
-        logger.info("Gemini LLM model initialized successfully.")
-        return _gemini_model
-    except Exception as e:
-        logger.error(f"Failed to initialize Gemini: {e}")
+    if LLM_PROVIDER != "gemini":
+        logger.error(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'. AI chat will use rule-based fallback.")
+        return None
+    if not GEMINI_API_KEY:
+        logger.info("No GEMINI_API_KEY set. AI chat will use rule-based fallback.")
         return None
+    return GeminiProvider(GEMINI_API_KEY)
+
+
+def get_llm_provider() -> Optional[LLMProvider]:
+    """The configured LLM provider (LLM_PROVIDER), created on first use; None means rule-based only."""
+    global _provider, _provider_loaded
+    if not _provider_loaded:
+        try:
+            _provider = _create_provider()
+            if _provider is not None:
+                logger.info(f"LLM provider '{_provider.name}' initialized successfully.")
+        except Exception as e:
+            logger.error(f"Failed to initialize LLM provider '{LLM_PROVIDER}': {e}")
+            _provider = None
+        _provider_loaded = True
+    return _provider
+
+
+def set_llm_provider(provider: Optional[LLMProvider]):
+    """Replace the process-wide provider (benchmarks and tests)."""
+    global _provider, _provider_loaded
+    _provider, _provider_loaded = provider, True
 
 
 SYSTEM_PROMPT = """You are BudgetIQ AI, a professional personal finance assistant embedded inside the BudgetIQ budget management application.
@@ -63,117 +193,174 @@ def _build_system_prompt():
     return SYSTEM_PROMPT
 
 
-# ─── Data Helpers ─────────────────────────────────────────
+# ─── Financial Snapshot ──────────────────────────────────
 
-def get_category_breakdown(db: Session, user_id: int, days: int = 30) -> Dict[str, float]:
-    """Get expense breakdown by category for the last N days."""
-    since = datetime.now(timezone.utc) - timedelta(days=days)
-    results = db.query(
-        Expense.category,
-        func.sum(Expense.amount).label("total")
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.date >= since
-    ).group_by(Expense.category).all()
-    return {row.category: float(row.total) for row in results}
+# Session.info key holding the request's snapshot
+_SNAPSHOT_KEY = "financial_snapshot"
 
 
-def get_monthly_totals(db: Session, user_id: int, months_ago: int = 0):
-    """Get income and expense totals for a specific month.
-    Uses date-range filtering compatible with both SQLite and PostgreSQL.
+@dataclass
+class FinancialSnapshot:
     """
-    now = datetime.now(timezone.utc)
-    target_month = now.month - months_ago
-    target_year = now.year
-    while target_month <= 0:
-        target_month += 12
-        target_year -= 1
-
-    # Build month start/end for range filter (works on both SQLite and PostgreSQL)
-    month_start = datetime(target_year, target_month, 1)
-    if target_month == 12:
-        month_end = datetime(target_year + 1, 1, 1)
-    else:
-        month_end = datetime(target_year, target_month + 1, 1)
+    Everything the insights and chat paths need about a user's recent money,
+    read from the daily rollups in one grouped query (see load_snapshot()).
+    """
+    user_id: int
+    as_of: date
+    current_income: float = 0.0
+    current_expense: float = 0.0
+    prev_income: float = 0.0
+    prev_expense: float = 0.0
+    categories_30d: Dict[str, float] = field(default_factory=dict)   # expense by category, last 30 days
+    today_expense_count: int = 0
+
+    @property
+    def balance(self) -> float:
+        return self.current_income - self.current_expense
+
+    @property
+    def total_expense_30d(self) -> float:
+        return sum(self.categories_30d.values())
+
+    @property
+    def has_data(self) -> bool:
+        return bool(self.categories_30d) or self.current_income > 0
+
+
+def _month_key(day: date, months_ago: int = 0) -> int:
+    """year_month bucket key of the month `months_ago` before `day`'s month."""
+    index = day.year * 12 + day.month - 1 - months_ago
+    return (index // 12) * 100 + index % 12 + 1
+
+
+@dataclass(frozen=True)
+class SnapshotWindow:
+    """The rollup window a FinancialSnapshot reads, relative to `today`."""
+    today: date
+    since: date
+    recent_since: date
+    current_month: int
+    prev_month: int
+
+
+def snapshot_window(now: Optional[datetime] = None) -> SnapshotWindow:
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+    recent_since = rollup_day(now - timedelta(days=30))
+    return SnapshotWindow(
+        today=today,
+        # Covers last month and the trailing 30 days (which can start before it, e.g. on 1 March)
+        since=min((today.replace(day=1) - timedelta(days=1)).replace(day=1), recent_since),
+        recent_since=recent_since,
+        current_month=_month_key(today),
+        prev_month=_month_key(today, 1),
+    )
 
-    income = db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
-        Income.user_id == user_id,
-        Income.date >= month_start,
-        Income.date < month_end
-    ).scalar()
 
-    expense = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= month_start,
-        Expense.date < month_end
-    ).scalar()
+def load_snapshot(db: Session, user_id: int) -> FinancialSnapshot:
+    """Build a user's FinancialSnapshot with a single grouped rollup query."""
+    window = snapshot_window()
+    today, since, recent_since = window.today, window.since, window.recent_since
+    current_month, prev_month = window.current_month, window.prev_month
+
+    totals = {(kind, m): 0.0 for kind in (INCOME, EXPENSE) for m in (current_month, prev_month)}
+    categories_30d = defaultdict(lambda: [0.0, 0])
+    today_count = 0
+    for row in get_window_totals(db, user_id, since, recent_since, today):
+        if (row.kind, row.year_month) in totals:
+            totals[(row.kind, row.year_month)] += row.total
+        if row.kind != EXPENSE:
+            continue
+        categories_30d[row.category][0] += row.recent_total
+        categories_30d[row.category][1] += row.recent_count
+        today_count += row.today_count
+
+    def _by_category(sums):
+        # Categories emptied by deletes keep zero-count rollup rows; skip them
+        return {c: round(total, MONEY_PLACES) for c, (total, count) in sums.items() if count > 0}
+
+    return FinancialSnapshot(
+        user_id=user_id,
+        as_of=today,
+        current_income=round(totals[(INCOME, current_month)], MONEY_PLACES),
+        current_expense=round(totals[(EXPENSE, current_month)], MONEY_PLACES),
+        prev_income=round(totals[(INCOME, prev_month)], MONEY_PLACES),
+        prev_expense=round(totals[(EXPENSE, prev_month)], MONEY_PLACES),
+        categories_30d=_by_category(categories_30d),
+        today_expense_count=int(today_count),
+    )
 
-    return float(income), float(expense)
 
+def get_snapshot(db: Session, user_id: int) -> FinancialSnapshot:
+    """
+    The user's FinancialSnapshot, memoized on the (request-scoped) session so
+    every consumer in one request shares a single load. Dropped on commit.
+    """
+    snapshot = db.info.get(_SNAPSHOT_KEY)
+    if snapshot is None or snapshot.user_id != user_id or snapshot.as_of != datetime.now(timezone.utc).date():
+        snapshot = db.info[_SNAPSHOT_KEY] = load_snapshot(db, user_id)
+    return snapshot
 
-def get_recent_transactions(db: Session, user_id: int, limit: int = 10) -> str:
-    """Get recent transactions as a formatted string for LLM context."""
-    lines = []
 
-    recent_incomes = db.query(Income).filter(
-        Income.user_id == user_id
-    ).order_by(Income.date.desc()).limit(limit).all()
+@event.listens_for(SessionLocal, "after_commit")
+def _drop_snapshot(session: Session):
+    session.info.pop(_SNAPSHOT_KEY, None)
 
-    recent_expenses = db.query(Expense).filter(
-        Expense.user_id == user_id
-    ).order_by(Expense.date.desc()).limit(limit).all()
 
+def get_recent_transactions(db: Session, user_id: int, limit: int = 10) -> str:
+    """
+    Latest incomes and expenses (up to `limit` of each) as a formatted string
+    for LLM context, fetched in one UNION ALL round trip.
+    """
+    legs = [
+        select(
+            literal(kind).label("kind"), model.id, model.date, model.amount, model.category, text_column.label("text"),
+        ).where(model.user_id == user_id).order_by(model.date.desc(), model.id.desc()).limit(limit).subquery().select()
+        for kind, model, text_column in ((INCOME, Income, Income.source), (EXPENSE, Expense, Expense.description))
+    ]
+    rows = db.execute(union_all(*legs)).all()
+    recent_incomes = sorted((r for r in rows if r.kind == INCOME), key=lambda r: (r.date, r.id), reverse=True)
+    recent_expenses = sorted((r for r in rows if r.kind == EXPENSE), key=lambda r: (r.date, r.id), reverse=True)
+
+    lines = []
     if recent_incomes:
         lines.append("Recent Income Entries:")
         for inc in recent_incomes:
-            lines.append(f"  - {inc.date.strftime('%d %b %Y')}: {inc.source} = {inc.amount:,.0f}")
+            lines.append(f"  - {inc.date.strftime('%d %b %Y')}: {inc.text} = {inc.amount:,.0f}")
 
     if recent_expenses:
         lines.append("Recent Expense Entries:")
         for exp in recent_expenses:
-            desc = f" ({exp.description})" if exp.description else ""
+            desc = f" ({exp.text})" if exp.text else ""
             lines.append(f"  - {exp.date.strftime('%d %b %Y')}: {exp.category}{desc} = {exp.amount:,.0f}")
 
     return "\n".join(lines) if lines else "No transactions recorded yet."
 
 
-def get_predictive_budgeting_context(db: Session, user_id: int) -> str:
-    """Calculate 3-month average spending to project next month's budget."""
-    now = datetime.now(timezone.utc)
-    # Start of 3 months ago
-    since = (now.replace(day=1) - timedelta(days=90)).replace(day=1)
-    
-    results = db.query(
-        Expense.category,
-        func.sum(Expense.amount).label("total")
-    ).filter(
-        Expense.user_id == user_id,
-        Expense.date >= since
-    ).group_by(Expense.category).all()
-    
-    if not results:
+def get_predictive_budgeting_context(forecast: dict) -> str:
+    """Describe the per-category spending forecast (see forecast.py) for the LLM."""
+    if not forecast["categories"]:
         return "Predictive Budget: Not enough data for projection."
-        
-    lines = ["Predictive Budget (Next Month Projection based on 3-month avg):"]
-    total_proj = 0
-    for row in results:
-        avg_monthly = float(row.total) / 3.0
-        total_proj += avg_monthly
-        lines.append(f"  - {row.category}: ~{avg_monthly:,.0f} expected")
-    lines.append(f"  - Total Projected Expenses: ~{total_proj:,.0f}")
-    
+
+    lines = [f"Predictive Budget (Next {forecast['horizon_days']} Days, per-category forecast):"]
+    for row in forecast["categories"]:
+        lines.append(f"  - {row['category']}: ~{row['forecast']:,.0f} expected ({row['model'].replace('_', ' ')})")
+    lines.append(f"  - Total Projected Expenses: ~{forecast['total']:,.0f}")
+    lines.append(f"  - This Month: ~{forecast['month_end']:,.0f} projected ({forecast['month_to_date']:,.0f} spent so far)")
+
     return "\n".join(lines)
 
 
 def build_user_context(db: Session, user_id: int) -> str:
     """Build a comprehensive financial context string for the LLM."""
-    current_income, current_expense = get_monthly_totals(db, user_id, 0)
-    prev_income, prev_expense = get_monthly_totals(db, user_id, 1)
-    balance = current_income - current_expense
-    categories = get_category_breakdown(db, user_id, 30)
-    total_expense_30d = sum(categories.values()) if categories else 0
+    snapshot = get_snapshot(db, user_id)
+    current_income, current_expense = snapshot.current_income, snapshot.current_expense
+    prev_income, prev_expense = snapshot.prev_income, snapshot.prev_expense
+    balance = snapshot.balance
+    categories = snapshot.categories_30d
+    total_expense_30d = snapshot.total_expense_30d
     recent = get_recent_transactions(db, user_id, 8)
-    predictive = get_predictive_budgeting_context(db, user_id)
+    predictive = get_predictive_budgeting_context(get_forecast(db, user_id))
 
     context_parts = [
         f"=== USER FINANCIAL DATA (as of {datetime.now(timezone.utc).strftime('%d %b %Y')}) ===",
@@ -213,130 +400,172 @@ def build_user_context(db: Session, user_id: int) -> str:
 
 # ─── Insights (Rule-Based, for dashboard cards) ──────────
 
-def generate_insights(db: Session, user_id: int) -> List[dict]:
+@dataclass
+class InsightInputs:
     """
-    Generate personalized insights based on user's real financial data.
-    These appear as cards in the AI Insights panel.
+    What the insight rules read, as arrays indexed by user, so the rules are
+    evaluated for one user (generate_insights) or a whole batch
+    (precompute_insights.py) by the same code.
     """
-    insights = []
-
-    current_income, current_expense = get_monthly_totals(db, user_id, 0)
-    prev_income, prev_expense = get_monthly_totals(db, user_id, 1)
-    balance = current_income - current_expense
-    categories = get_category_breakdown(db, user_id, 30)
-    total_expense_30d = sum(categories.values()) if categories else 0
-
-    # Balance status
-    if current_income > 0 and balance > 0:
-        savings_rate = (balance / current_income) * 100
-        insights.append({
-            "type": "info",
-            "message": f"Your savings rate this month is {savings_rate:.1f}%. "
-                       f"You've saved {balance:,.0f} so far!"
-        })
-    elif balance < 0:
-        insights.append({
-            "type": "warning",
-            "message": f"Alert: You've overspent by {abs(balance):,.0f} this month. "
-                       f"Your expenses exceed your income."
-        })
-
-    # Month-over-month comparison
-    if prev_expense > 0 and current_expense > 0:
-        change = ((current_expense - prev_expense) / prev_expense) * 100
-        if change > 10:
+    current_income: np.ndarray
+    current_expense: np.ndarray
+    prev_expense: np.ndarray
+    total_expense_30d: np.ndarray
+    top_amount: np.ndarray                 # largest 30-day category total (0 without expenses)
+    top_category: List[Optional[str]]      # its category (None without expenses)
+    has_data: np.ndarray
+    today_expense_count: np.ndarray
+
+    @classmethod
+    def from_snapshots(cls, snapshots: List[FinancialSnapshot]) -> "InsightInputs":
+        tops = [max(s.categories_30d, key=s.categories_30d.get) if s.categories_30d else None for s in snapshots]
+        return cls(
+            current_income=np.array([s.current_income for s in snapshots], dtype=float),
+            current_expense=np.array([s.current_expense for s in snapshots], dtype=float),
+            prev_expense=np.array([s.prev_expense for s in snapshots], dtype=float),
+            total_expense_30d=np.array([s.total_expense_30d for s in snapshots], dtype=float),
+            top_amount=np.array([s.categories_30d[t] if t else 0.0 for s, t in zip(snapshots, tops)], dtype=float),
+            top_category=tops,
+            has_data=np.array([s.has_data for s in snapshots], dtype=bool),
+            today_expense_count=np.array([s.today_expense_count for s in snapshots], dtype=np.int64),
+        )
+
+
+def evaluate_insights(inputs: InsightInputs) -> List[List[dict]]:
+    """
+    Personalized insight cards for every user in `inputs`, in input order.
+    Every rule's condition and figures are computed for all users at once;
+    only the messages are built per user.
+    """
+    income, expense, prev = inputs.current_income, inputs.current_expense, inputs.prev_expense
+    balance = income - expense
+    has_top = np.array([t is not None for t in inputs.top_category], dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        savings_rate = np.where(income > 0, (balance / income) * 100, 0.0)
+        change = np.where(prev > 0, ((expense - prev) / prev) * 100, 0.0)
+        percentage = np.where(inputs.total_expense_30d > 0, (inputs.top_amount / inputs.total_expense_30d) * 100, 0.0)
+        expense_ratio = np.where(income > 0, (expense / income) * 100, 0.0)
+
+    saving = (income > 0) & (balance > 0)
+    overspent = ~saving & (balance < 0)
+    compared = (prev > 0) & (expense > 0)
+    spending_up, spending_down = compared & (change > 10), compared & (change < -10)
+    top_tip = has_top & (percentage > 30)
+    ratio_alert = (income > 0) & (expense_ratio > 90)
+    ratio_warning = (income > 0) & ~ratio_alert & (expense_ratio > 70)
+    no_data = ~inputs.has_data
+    no_log_today = inputs.today_expense_count == 0
+
+    results = []
+    for i in range(len(income)):
+        insights = []
+
+        # Balance status
+        if saving[i]:
+            insights.append({
+                "type": "info",
+                "message": f"Your savings rate this month is {savings_rate[i]:.1f}%. "
+                           f"You've saved {balance[i]:,.0f} so far!"
+            })
+        elif overspent[i]:
+            insights.append({
+                "type": "warning",
+                "message": f"Alert: You've overspent by {abs(balance[i]):,.0f} this month. "
+                           f"Your expenses exceed your income."
+            })
+
+        # Month-over-month comparison
+        if spending_up[i]:
             insights.append({
                 "type": "warning",
-                "message": f"Your spending increased by {change:.1f}% compared to last month. "
+                "message": f"Your spending increased by {change[i]:.1f}% compared to last month. "
                            f"Consider reviewing your expenses."
             })
-        elif change < -10:
+        elif spending_down[i]:
             insights.append({
                 "type": "tip",
-                "message": f"Great job! Your spending decreased by {abs(change):.1f}% compared to last month."
+                "message": f"Great job! Your spending decreased by {abs(change[i]):.1f}% compared to last month."
             })
 
-    # Top spending category
-    if categories:
-        top_category = max(categories, key=categories.get)
-        top_amount = categories[top_category]
-        percentage = (top_amount / total_expense_30d) * 100 if total_expense_30d > 0 else 0
-        insights.append({
-            "type": "info",
-            "message": f"Your highest spending category is '{top_category}' at {top_amount:,.0f} "
-                       f"({percentage:.0f}% of total expenses)."
-        })
-        if percentage > 30:
-            potential_saving = top_amount * 0.2
+        # Top spending category
+        if has_top[i]:
+            top_category, top_amount = inputs.top_category[i], inputs.top_amount[i]
             insights.append({
-                "type": "tip",
-                "message": f"You could save {potential_saving:,.0f} by reducing "
-                           f"'{top_category}' expenses by 20%."
+                "type": "info",
+                "message": f"Your highest spending category is '{top_category}' at {top_amount:,.0f} "
+                           f"({percentage[i]:.0f}% of total expenses)."
             })
-
-    # Spending ratio alert
-    if current_income > 0:
-        expense_ratio = (current_expense / current_income) * 100
-        if expense_ratio > 90:
+            if top_tip[i]:
+                potential_saving = top_amount * 0.2
+                insights.append({
+                    "type": "tip",
+                    "message": f"You could save {potential_saving:,.0f} by reducing "
+                               f"'{top_category}' expenses by 20%."
+                })
+
+        # Spending ratio alert
+        if ratio_alert[i]:
             insights.append({
                 "type": "alert",
-                "message": f"Critical: You're using {expense_ratio:.0f}% of your income on expenses! "
+                "message": f"Critical: You're using {expense_ratio[i]:.0f}% of your income on expenses! "
                            f"Try to keep it under 70% for a healthy budget."
             })
-        elif expense_ratio > 70:
+        elif ratio_warning[i]:
             insights.append({
                 "type": "warning",
-                "message": f"You're spending {expense_ratio:.0f}% of your income. "
+                "message": f"You're spending {expense_ratio[i]:.0f}% of your income. "
                            f"Aim for the 50-30-20 rule: 50% needs, 30% wants, 20% savings."
             })
 
-    # No data yet
-    if not categories and current_income == 0:
-        insights.append({
-            "type": "info",
-            "message": "Welcome to BudgetIQ! Start by adding your income and expenses "
-                       "to get personalized AI insights."
-        })
-
-    # Daily expense reminder
-    today = datetime.now(timezone.utc).date()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = today_start + timedelta(days=1)
-    today_expenses = db.query(func.count(Expense.id)).filter(
-        Expense.user_id == user_id,
-        Expense.date >= today_start,
-        Expense.date < today_end
-    ).scalar()
-    if today_expenses == 0:
-        insights.append({
-            "type": "info",
-            "message": "Don't forget to log today's expenses for more accurate insights."
-        })
-
-    return insights
+        # No data yet
+        if no_data[i]:
+            insights.append({
+                "type": "info",
+                "message": "Welcome to BudgetIQ! Start by adding your income and expenses "
+                           "to get personalized AI insights."
+            })
+
+        # Daily expense reminder
+        if no_log_today[i]:
+            insights.append({
+                "type": "info",
+                "message": "Don't forget to log today's expenses for more accurate insights."
+            })
 
+        results.append(insights)
+    return results
 
-# ─── Chat Response (LLM-Powered) ─────────────────────────
 
-def chat_response(db: Session, user_id: int, message: str) -> str:
+def generate_insights(db: Session, user_id: int) -> List[dict]:
     """
-    Process a chat message using Gemini LLM with user's real financial context.
-    Falls back to rule-based responses if Gemini is not available.
+    Generate personalized insights based on user's real financial data.
+    These appear as cards in the AI Insights panel.
     """
-    model = _get_gemini_model()
+    return evaluate_insights(InsightInputs.from_snapshots([get_snapshot(db, user_id)]))[0]
 
-    if model is not None:
-        return _gemini_chat(model, db, user_id, message)
-    else:
-        return _rule_based_chat(db, user_id, message)
 
+def get_user_insights(db: Session, user_id: int, data_version: int) -> List[dict]:
+    """
+    The user's insights from the last precompute_insights.py run when it saw
+    their current data version today, otherwise computed live.
+    """
+    row = db.get(PrecomputedInsights, user_id)
+    if row is not None and row.data_version == data_version and row.as_of == datetime.now(timezone.utc).date():
+        return json.loads(row.insights)
+    return generate_insights(db, user_id)
 
-def _gemini_chat(model, db: Session, user_id: int, message: str) -> str:
-    """Send a message to Gemini with the user's financial context."""
-    try:
-        user_context = build_user_context(db, user_id)
 
-        prompt = f"""{user_context}
+# ─── Chat Response (LLM-Powered) ─────────────────────────
+
+@dataclass
+class ChatPlan:
+    """What a chat reply needs from the database, gathered before any LLM call."""
+    fallback: str                 # rule-based reply, used without an LLM or when it fails
+    prompt: Optional[str] = None  # full LLM prompt (None without an LLM or for a direct intent)
+
+
+def _build_prompt(user_context: str, message: str) -> str:
+    return f"""{user_context}
 
 === USER QUESTION ===
 {message}
@@ -346,155 +575,349 @@ Based on the financial data above, provide a helpful, personalized response. Rem
 - Reference the user's actual numbers when relevant
 - Be concise and actionable"""
 
-        response = model.generate_content(prompt)
 
-        if response and response.text:
-            return response.text.strip()
-        else:
-            return "I couldn't generate a response right now. Please try again."
+def prepare_chat(user_id: int, message: str, use_llm: bool) -> ChatPlan:
+    """
+    Run every query a chat reply needs on a short-lived session (blocking; call
+    from a worker thread). The session is closed before any LLM call starts.
+    With an LLM, messages that ask for one of the user's figures get no prompt:
+    the matching rule-based reply is the answer, and the LLM context queries
+    are skipped. Without one, replies follow keyword precedence as before.
+    """
+    route = route_message(message)
+    db = SessionLocal()
+    try:
+        if use_llm and route.direct:
+            return ChatPlan(fallback=_rule_based_chat(db, user_id, message, route.direct_intent), prompt=None)
+        fallback = _rule_based_chat(db, user_id, message, route.intent)
+        prompt = _build_prompt(build_user_context(db, user_id), message) if use_llm else None
+        return ChatPlan(fallback=fallback, prompt=prompt)
+    finally:
+        db.close()
+
+
+# Bounds in-flight LLM calls per process
+_llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Words per chunk when streaming a rule-based reply
+STREAM_CHUNK_WORDS = 6
 
+
+async def chat_response(user_id: int, message: str) -> str:
+    """
+    Reply to a chat message using the LLM with the user's real financial context.
+    Database work runs first in the threadpool and releases its connection;
+    the LLM call is then awaited without holding a worker thread or connection,
+    bounded by LLM_MAX_CONCURRENCY and LLM_TIMEOUT_SECONDS. Questions the
+    numbers answer (see DIRECT_PHRASES) get the rule-based reply straight away;
+    it is also the fallback when no LLM is configured or it is slow or failing.
+    """
+    provider = get_llm_provider()
+    plan = await run_in_threadpool(prepare_chat, user_id, message, provider is not None)
+    if provider is None or plan.prompt is None:
+        return plan.fallback
+
+    try:
+        return await asyncio.wait_for(_llm_chat(provider, plan.prompt), timeout=LLM_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"LLM reply timed out after {LLM_TIMEOUT_SECONDS}s; using rule-based reply.")
     except Exception as e:
-        logger.error(f"Gemini API error: {e}")
-        # Fall back to rule-based on error
-        return _rule_based_chat(db, user_id, message)
+        logger.error(f"LLM API error ({provider.name}): {e}")
+    return plan.fallback
 
 
-def _rule_based_chat(db: Session, user_id: int, message: str) -> str:
-    """Fallback rule-based chat when LLM is not available."""
-    msg = message.lower().strip()
-
-    # Check for non-finance topics first
-    non_finance_keywords = [
-        "weather", "recipe", "cook", "movie", "game", "sport", "music",
-        "code", "program", "python", "java", "html", "css",
-        "politics", "election", "president", "joke", "funny",
-        "hello", "hi ", "hey ", "how are you", "what's up",
-    ]
+async def _llm_chat(provider: LLMProvider, prompt: str) -> str:
+    """Send a prompt to the provider once a concurrency slot is free."""
+    async with _llm_slots:
+        text = await provider.generate(prompt)
 
-    # Allow greetings to pass through
-    greetings = ["hello", "hi ", "hey ", "how are you", "what's up"]
-    is_greeting = any(g in msg for g in greetings)
-
-    if not is_greeting and any(kw in msg for kw in non_finance_keywords):
-        return ("I'm your BudgetIQ financial assistant. I can only help with finance "
-                "and budgeting topics. Please ask me about your budget, savings, "
-                "expenses, or financial planning!")
-
-    current_income, current_expense = get_monthly_totals(db, user_id, 0)
-    balance = current_income - current_expense
-    categories = get_category_breakdown(db, user_id, 30)
-    total_expense = sum(categories.values()) if categories else 0
-
-    # Greetings
-    if is_greeting:
-        if current_income == 0 and current_expense == 0:
-            return ("Hello! I'm your BudgetIQ AI assistant. I can help you with "
-                    "budgeting, saving strategies, and expense analysis.\n\n"
-                    "Start by adding some income and expenses, then ask me anything "
-                    "about your finances!")
-        return (f"Hello! Here's a quick snapshot of your finances:\n\n"
-                f"  Income: {current_income:,.0f}\n"
-                f"  Expenses: {current_expense:,.0f}\n"
-                f"  Balance: {balance:,.0f}\n\n"
-                f"How can I help you with your budget today?")
-
-    # Balance / Summary queries
-    if any(word in msg for word in ["balance", "how much", "left", "remaining", "total", "summary", "overview"]):
-        if current_income == 0 and current_expense == 0:
-            return "You haven't added any income or expenses yet. Start tracking to see your balance!"
-        status = "You're in a healthy financial position!" if balance > 0 else "Your expenses exceed your income. Let's work on a plan to reduce spending."
-        return (
-            f"Here's your financial summary this month:\n\n"
-            f"  Income: {current_income:,.0f}\n"
-            f"  Expenses: {current_expense:,.0f}\n"
-            f"  Balance: {balance:,.0f}\n\n"
-            f"{status}"
-        )
+    if text and text.strip():
+        return text.strip()
+    return "I couldn't generate a response right now. Please try again."
 
-    # Saving suggestions
-    if any(word in msg for word in ["save", "saving", "savings", "reduce", "cut"]):
-        if not categories:
-            return "Add some expenses first so I can analyze where you can save!"
-        top = max(categories, key=categories.get)
-        saving = categories[top] * 0.2
-        daily_limit = (current_income * 0.7 / 30) if current_income > 0 else 0
-        response = (
-            f"Here's a personalized savings plan based on your data:\n\n"
-            f"  1. Your top spending category is '{top}' ({categories[top]:,.0f})\n"
-            f"     Reducing it by 20% saves you {saving:,.0f}\n\n"
-            f"  2. Follow the 50-30-20 rule:\n"
-            f"     50% for needs, 30% for wants, 20% for savings\n"
-        )
-        if daily_limit > 0:
-            response += f"\n  3. Set a daily spending limit of {daily_limit:,.0f}"
-        return response
-
-    # Spending breakdown
-    if any(word in msg for word in ["spending", "spent", "expense", "category", "breakdown", "where"]):
-        if not categories:
-            return "No expense data available yet. Start logging your expenses to see your spending patterns!"
-        breakdown = "\n".join(
-            f"  {cat}: {amt:,.0f} ({(amt/total_expense*100):.0f}%)"
-            for cat, amt in sorted(categories.items(), key=lambda x: -x[1])
-        )
-        return f"Your spending breakdown (last 30 days):\n\n{breakdown}\n\n  Total: {total_expense:,.0f}"
-
-    # Income queries
-    if any(word in msg for word in ["income", "earn", "salary", "revenue"]):
-        if current_income == 0:
-            return "You haven't added any income this month. Add your income to get started with budgeting!"
-        return (
-            f"Your income this month: {current_income:,.0f}\n\n"
-            f"  Spent: {current_expense:,.0f} ({(current_expense/current_income*100):.0f}% of income)\n"
-            f"  Remaining: {balance:,.0f}"
-        )
 
-    # Tips / Advice
-    if any(word in msg for word in ["tip", "advice", "help", "suggest", "recommend", "guide"]):
-        tips = [
-            "Track every expense, no matter how small -- they add up!",
-            "Follow the 50-30-20 rule: 50% needs, 30% wants, 20% savings.",
-            "Set monthly spending limits for each category.",
-            "Review your spending weekly to stay on track.",
-            "Build an emergency fund worth 3-6 months of expenses.",
-            "Avoid impulse purchases -- wait 24 hours before buying.",
-            "Automate your savings by setting aside money on payday.",
-        ]
-        return "Here are some expert budgeting tips:\n\n" + "\n".join(f"  {i+1}. {t}" for i, t in enumerate(tips))
-
-    # Comparison
-    if any(word in msg for word in ["compare", "last month", "previous", "trend", "month over month"]):
-        prev_income, prev_expense = get_monthly_totals(db, user_id, 1)
-        if prev_expense == 0:
-            return "Not enough data from last month to compare. Keep tracking and check back later!"
-        change = current_expense - prev_expense
-        pct = (change / prev_expense * 100) if prev_expense != 0 else 0
-        direction = "increased" if change > 0 else "decreased"
-        emoji_free_status = "Consider reviewing your spending habits." if change > 0 else "Great progress on reducing expenses!"
-        return (
-            f"Month-over-month comparison:\n\n"
-            f"  Last month expenses: {prev_expense:,.0f}\n"
-            f"  This month expenses: {current_expense:,.0f}\n"
-            f"  Change: {direction} by {abs(change):,.0f} ({abs(pct):.1f}%)\n\n"
-            f"{emoji_free_status}"
-        )
+async def _llm_stream(provider: LLMProvider, prompt: str) -> AsyncIterator[str]:
+    """Yield the provider's reply as it is generated, holding a concurrency slot throughout."""
+    async with _llm_slots:
+        async with aclosing(provider.stream(prompt)) as chunks:
+            async for text in chunks:
+                yield text
+
+
+def _text_chunks(text: str, words: int = STREAM_CHUNK_WORDS) -> Iterator[str]:
+    """Split text into chunks of a few words each, whitespace preserved."""
+    tokens = re.findall(r"^\s+|\S+\s*", text)
+    for i in range(0, len(tokens), words):
+        yield "".join(tokens[i:i + words])
+
+
+async def chat_stream(user_id: int, message: str) -> AsyncIterator[str]:
+    """
+    Stream a chat reply as text chunks (see chat_response for the DB/LLM phases).
+    LLM_TIMEOUT_SECONDS bounds the wait for each chunk. If the LLM fails or stalls
+    before its first chunk, the rule-based reply is streamed instead; a failure
+    after text was sent is re-raised. Closing the iterator (e.g. on client
+    disconnect) cancels the LLM request and frees its concurrency slot.
+    """
+    provider = get_llm_provider()
+    plan = await run_in_threadpool(prepare_chat, user_id, message, provider is not None)
+
+    if provider is not None and plan.prompt is not None:
+        sent = False
+        stream = _llm_stream(provider, plan.prompt)
+        try:
+            while True:
+                try:
+                    text = await asyncio.wait_for(stream.__anext__(), timeout=LLM_TIMEOUT_SECONDS)
+                except StopAsyncIteration:
+                    break
+                sent = True
+                yield text
+        except asyncio.TimeoutError:
+            if sent:
+                raise
+            logger.warning(f"LLM stream timed out after {LLM_TIMEOUT_SECONDS}s; using rule-based reply.")
+        except Exception as e:
+            if sent:
+                raise
+            logger.error(f"LLM API error ({provider.name}): {e}")
+        finally:
+            await stream.aclose()
+        if sent:
+            return
+
+    for chunk in _text_chunks(plan.fallback):
+        yield chunk
+
+
+# ─── Rule-Based Chat (intent router) ─────────────────────
+
+# Keyword sets per intent, in precedence order: when a message matches several,
+# the first listed wins. Keywords match whole words of the lowercased message,
+# so "transport" is not "sport" and "reprogram" is not "program".
+INTENT_KEYWORDS: Dict[str, tuple] = {
+    "greeting": ("hello", "hi", "hey", "how are you", "what's up"),
+    "off_topic": (
+        "weather", "recipe", "recipes", "cook", "cooking", "movie", "movies", "game", "games",
+        "sport", "sports", "music", "coding", "programming", "python", "java", "html", "css",
+        "politics", "election", "president", "joke", "jokes", "funny",
+    ),
+    "balance": ("balance", "how much", "left", "remaining", "total", "summary", "overview"),
+    "save": ("save", "saving", "savings", "reduce", "cut"),
+    "breakdown": ("spending", "spent", "expense", "expenses", "category", "categories", "breakdown", "where"),
+    "income": ("income", "earn", "earned", "earning", "earnings", "salary", "revenue"),
+    "tips": ("tip", "tips", "advice", "help", "suggest", "suggestions", "recommend", "recommendations", "guide"),
+    "compare": ("compare", "comparison", "last month", "previous", "trend", "trends", "month over month"),
+    "budget": ("budget", "budgeting", "plan", "planning", "50-30-20", "rule", "allocate", "allocation", "allocating"),
+}
+
+# Questions the rule-based reply answers exactly from the user's numbers. A
+# message gets that reply without asking the LLM, even when one is configured,
+# only if it contains one of these phrases and nothing else in it matches an
+# intent keyword. Everything else – loose keyword hits, off-topic words,
+# greetings – goes to the LLM when there is one.
+DIRECT_PHRASES: Dict[str, tuple] = {
+    "balance": (
+        "my balance", "my current balance", "my financial summary",
+        "how much do i have left", "how much money do i have left", "how much is left",
+    ),
+    "breakdown": (
+        "spending breakdown", "expense breakdown", "breakdown of my spending", "breakdown of my expenses",
+        "how much have i spent", "how much did i spend", "where did my money go", "spending by category",
+    ),
+    "income": ("what's my income", "what is my income", "my income this month", "how much did i earn", "how much have i earned"),
+    "compare": ("compared to last month", "compare to last month", "compare with last month", "vs last month", "versus last month"),
+    "budget": ("50-30-20 budget", "50-30-20 plan", "my budget plan", "make me a budget", "create a budget", "create my budget"),
+}
+
+
+def _alternatives(keywords: Dict[str, tuple]) -> str:
+    """
+    Whole-word alternation with one named group per key. No keyword may be a
+    prefix of another key's keyword (checked here): both would match at the
+    same position and only the first group would be reported.
+    """
+    owners = {kw: key for key, kws in keywords.items() for kw in kws}
+    for kw, key in owners.items():
+        for other, other_key in owners.items():
+            if other_key != key and other != kw and other.startswith(kw):
+                raise ValueError(f"Keyword {kw!r} ({key}) is a prefix of {other!r} ({other_key})")
+    groups = "|".join(
+        f"(?P<{key}>{'|'.join(re.escape(kw) for kw in sorted(kws, key=len, reverse=True))})"
+        for key, kws in keywords.items()
+    )
+    return rf"\b(?:{groups})\b"
+
+
+# Each alternative sits inside a lookahead, so a single finditer() reports every
+# intent with a keyword at any position, overlapping matches included
+_INTENT_PATTERN = re.compile(f"(?={_alternatives(INTENT_KEYWORDS)})")
+_DIRECT_PATTERN = re.compile(_alternatives(DIRECT_PHRASES))
+
+
+def _matched_intents(text: str) -> set:
+    return {m.lastgroup for m in _INTENT_PATTERN.finditer(text)}
+
+
+@dataclass(frozen=True)
+class ChatRoute:
+    intent: str                          # rule-based reply by keyword precedence ("default" when nothing matched)
+    direct_intent: Optional[str] = None  # reply that answers the message without the LLM (see DIRECT_PHRASES)
+
+    @property
+    def direct(self) -> bool:
+        return self.direct_intent is not None
+
+
+def route_message(message: str) -> ChatRoute:
+    """Pick the chat intent for a message, and whether it can skip the LLM (see DIRECT_PHRASES)."""
+    text = message.lower().strip()
+    matched = _matched_intents(text)
+    if "off_topic" in matched and "greeting" not in matched:
+        intent = "off_topic"
+    else:
+        intent = next((i for i in INTENT_KEYWORDS if i in matched and i != "off_topic"), "default")
+
+    direct = {m.lastgroup for m in _DIRECT_PATTERN.finditer(text)}
+    if len(direct) == 1 and not _matched_intents(_DIRECT_PATTERN.sub(" ", text)):
+        return ChatRoute(intent=intent, direct_intent=direct.pop())
+    return ChatRoute(intent=intent)
+
+
+# Each reply takes a loader for the user's snapshot and only calls it if it
+# needs numbers, so the off-topic, tips and help replies run no queries.
+SnapshotLoader = Callable[[], FinancialSnapshot]
+
+
+def _reply_off_topic(load: SnapshotLoader) -> str:
+    return ("I'm your BudgetIQ financial assistant. I can only help with finance "
+            "and budgeting topics. Please ask me about your budget, savings, "
+            "expenses, or financial planning!")
+
+
+def _reply_greeting(load: SnapshotLoader) -> str:
+    s = load()
+    if s.current_income == 0 and s.current_expense == 0:
+        return ("Hello! I'm your BudgetIQ AI assistant. I can help you with "
+                "budgeting, saving strategies, and expense analysis.\n\n"
+                "Start by adding some income and expenses, then ask me anything "
+                "about your finances!")
+    return (f"Hello! Here's a quick snapshot of your finances:\n\n"
+            f"  Income: {s.current_income:,.0f}\n"
+            f"  Expenses: {s.current_expense:,.0f}\n"
+            f"  Balance: {s.balance:,.0f}\n\n"
+            f"How can I help you with your budget today?")
+
+
+def _reply_balance(load: SnapshotLoader) -> str:
+    s = load()
+    if s.current_income == 0 and s.current_expense == 0:
+        return "You haven't added any income or expenses yet. Start tracking to see your balance!"
+    status = "You're in a healthy financial position!" if s.balance > 0 else "Your expenses exceed your income. Let's work on a plan to reduce spending."
+    return (
+        f"Here's your financial summary this month:\n\n"
+        f"  Income: {s.current_income:,.0f}\n"
+        f"  Expenses: {s.current_expense:,.0f}\n"
+        f"  Balance: {s.balance:,.0f}\n\n"
+        f"{status}"
+    )
+
+
+def _reply_save(load: SnapshotLoader) -> str:
+    s = load()
+    categories = s.categories_30d
+    if not categories:
+        return "Add some expenses first so I can analyze where you can save!"
+    top = max(categories, key=categories.get)
+    saving = categories[top] * 0.2
+    daily_limit = (s.current_income * 0.7 / 30) if s.current_income > 0 else 0
+    response = (
+        f"Here's a personalized savings plan based on your data:\n\n"
+        f"  1. Your top spending category is '{top}' ({categories[top]:,.0f})\n"
+        f"     Reducing it by 20% saves you {saving:,.0f}\n\n"
+        f"  2. Follow the 50-30-20 rule:\n"
+        f"     50% for needs, 30% for wants, 20% for savings\n"
+    )
+    if daily_limit > 0:
+        response += f"\n  3. Set a daily spending limit of {daily_limit:,.0f}"
+    return response
+
+
+def _reply_breakdown(load: SnapshotLoader) -> str:
+    s = load()
+    categories, total_expense = s.categories_30d, s.total_expense_30d
+    if not categories:
+        return "No expense data available yet. Start logging your expenses to see your spending patterns!"
+    breakdown = "\n".join(
+        f"  {cat}: {amt:,.0f} ({(amt/total_expense*100):.0f}%)"
+        for cat, amt in sorted(categories.items(), key=lambda x: -x[1])
+    )
+    return f"Your spending breakdown (last 30 days):\n\n{breakdown}\n\n  Total: {total_expense:,.0f}"
+
+
+def _reply_income(load: SnapshotLoader) -> str:
+    s = load()
+    if s.current_income == 0:
+        return "You haven't added any income this month. Add your income to get started with budgeting!"
+    return (
+        f"Your income this month: {s.current_income:,.0f}\n\n"
+        f"  Spent: {s.current_expense:,.0f} ({(s.current_expense/s.current_income*100):.0f}% of income)\n"
+        f"  Remaining: {s.balance:,.0f}"
+    )
+
+
+BUDGETING_TIPS = (
+    "Track every expense, no matter how small -- they add up!",
+    "Follow the 50-30-20 rule: 50% needs, 30% wants, 20% savings.",
+    "Set monthly spending limits for each category.",
+    "Review your spending weekly to stay on track.",
+    "Build an emergency fund worth 3-6 months of expenses.",
+    "Avoid impulse purchases -- wait 24 hours before buying.",
+    "Automate your savings by setting aside money on payday.",
+)
+
+
+def _reply_tips(load: SnapshotLoader) -> str:
+    return "Here are some expert budgeting tips:\n\n" + "\n".join(f"  {i+1}. {t}" for i, t in enumerate(BUDGETING_TIPS))
+
+
+def _reply_compare(load: SnapshotLoader) -> str:
+    s = load()
+    prev_expense, current_expense = s.prev_expense, s.current_expense
+    if prev_expense == 0:
+        return "Not enough data from last month to compare. Keep tracking and check back later!"
+    change = current_expense - prev_expense
+    pct = (change / prev_expense * 100) if prev_expense != 0 else 0
+    direction = "increased" if change > 0 else "decreased"
+    emoji_free_status = "Consider reviewing your spending habits." if change > 0 else "Great progress on reducing expenses!"
+    return (
+        f"Month-over-month comparison:\n\n"
+        f"  Last month expenses: {prev_expense:,.0f}\n"
+        f"  This month expenses: {current_expense:,.0f}\n"
+        f"  Change: {direction} by {abs(change):,.0f} ({abs(pct):.1f}%)\n\n"
+        f"{emoji_free_status}"
+    )
 
-    # Budget / 50-30-20 rule
-    if any(word in msg for word in ["budget", "plan", "50-30-20", "rule", "allocat"]):
-        if current_income == 0:
-            return "Add your income first, and I'll help you create a budget plan based on the 50-30-20 rule!"
-        needs = current_income * 0.50
-        wants = current_income * 0.30
-        savings = current_income * 0.20
-        return (
-            f"Here's a recommended budget based on your income ({current_income:,.0f}):\n\n"
-            f"  Needs (50%):    {needs:,.0f}  -- rent, groceries, utilities\n"
-            f"  Wants (30%):    {wants:,.0f}  -- dining, entertainment, shopping\n"
-            f"  Savings (20%):  {savings:,.0f}  -- emergency fund, investments\n\n"
-            f"Currently spending: {current_expense:,.0f} ({(current_expense/current_income*100):.0f}% of income)"
-        )
 
-    # Default — for unrecognized finance questions
+def _reply_budget(load: SnapshotLoader) -> str:
+    s = load()
+    current_income, current_expense = s.current_income, s.current_expense
+    if current_income == 0:
+        return "Add your income first, and I'll help you create a budget plan based on the 50-30-20 rule!"
+    needs = current_income * 0.50
+    wants = current_income * 0.30
+    savings = current_income * 0.20
+    return (
+        f"Here's a recommended budget based on your income ({current_income:,.0f}):\n\n"
+        f"  Needs (50%):    {needs:,.0f}  -- rent, groceries, utilities\n"
+        f"  Wants (30%):    {wants:,.0f}  -- dining, entertainment, shopping\n"
+        f"  Savings (20%):  {savings:,.0f}  -- emergency fund, investments\n\n"
+        f"Currently spending: {current_expense:,.0f} ({(current_expense/current_income*100):.0f}% of income)"
+    )
+
+
+def _reply_default(load: SnapshotLoader) -> str:
+    # For unrecognized finance questions
     return (
         f"I'm your BudgetIQ financial assistant! Here's what I can help with:\n\n"
         f"  - Your balance or financial summary\n"
@@ -506,3 +929,23 @@ def _rule_based_chat(db: Session, user_id: int, message: str) -> str:
         f"  - Expert budgeting tips\n\n"
         f"Try asking: \"How can I save more?\" or \"Show my spending breakdown\""
     )
+
+
+_INTENT_REPLIES: Dict[str, Callable[[SnapshotLoader], str]] = {
+    "off_topic": _reply_off_topic,
+    "greeting": _reply_greeting,
+    "balance": _reply_balance,
+    "save": _reply_save,
+    "breakdown": _reply_breakdown,
+    "income": _reply_income,
+    "tips": _reply_tips,
+    "compare": _reply_compare,
+    "budget": _reply_budget,
+    "default": _reply_default,
+}
+
+
+def _rule_based_chat(db: Session, user_id: int, message: str, intent: Optional[str] = None) -> str:
+    """Fallback rule-based chat when LLM is not available."""
+    intent = intent or route_message(message).intent
+    return _INTENT_REPLIES[intent](lambda: get_snapshot(db, user_id))
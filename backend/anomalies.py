@@ -0,0 +1,213 @@
+"""
+BudgetIQ – Spending Anomaly Detection
+Keeps running statistics of each user's expense amounts per category
+(category_stats) and raises an "alert" notification when a new expense is far
+above what is usual for its category.
+
+Each new expense costs one row read and write, whatever the history length:
+  - count, mean and m2 follow Welford's online algorithm
+  - median and MAD (median absolute deviation) are streaming "frugal"
+    estimates that step towards each new amount by a fraction of the spread
+
+An expense is anomalous when the category has at least ANOMALY_MIN_HISTORY
+expenses, the amount is at least MIN_RATIO times the median, and its robust
+z-score 0.6745 * (x - median) / MAD exceeds ANOMALY_THRESHOLD. The standard
+deviation stands in for a zero MAD. The statistics are checked before the
+expense is folded in.
+
+Bulk adds and CSV imports fold their rows in at O(batch) (fold_expenses()):
+categories new to the user get exact statistics for the batch, existing ones
+take each amount as if it had been added on its own. Edits and deletes can't
+be retracted from the median/MAD estimates, so they only flag the statistics
+they touch as stale (mark_stale()); those keep serving until
+`rebuild_anomaly_stats.py --stale` recomputes them exactly from history.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import IS_SQLITE
+from models import CategoryStats, Notification
+from config import ANOMALY_THRESHOLD, ANOMALY_MIN_HISTORY
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert as _dialect_insert
+else:
+    from sqlalchemy.dialects.postgresql import insert as _dialect_insert
+
+# An anomaly must also be at least this multiple of the category's median
+MIN_RATIO = 1.5
+# Fraction of the spread the median/MAD estimates move per expense (early
+# expenses move them by 1 / count instead, while that is larger)
+SKETCH_RATE = 0.1
+# Scales the MAD to a standard deviation for normally distributed amounts
+MAD_TO_Z = 0.6745
+
+
+def anomaly_score(stats: CategoryStats, amount: float) -> float:
+    """Robust z-score of `amount` against a category's statistics (inf when they show no spread)."""
+    deviation = amount - stats.median
+    if stats.mad > 0:
+        return MAD_TO_Z * deviation / stats.mad
+    std = math.sqrt(stats.m2 / stats.count) if stats.count else 0.0
+    if std > 0:
+        return deviation / std
+    return math.inf if deviation > 0 else 0.0
+
+
+def is_anomaly(stats: Optional[CategoryStats], amount: float) -> bool:
+    if stats is None or stats.count < ANOMALY_MIN_HISTORY or stats.median <= 0:
+        return False
+    if amount < MIN_RATIO * stats.median:
+        return False
+    return anomaly_score(stats, amount) > ANOMALY_THRESHOLD
+
+
+def update_stats(stats: CategoryStats, amount: float):
+    """Fold one amount into the statistics in O(1)."""
+    count = (stats.count or 0) + 1
+    delta = amount - (stats.mean or 0.0)
+    mean = (stats.mean or 0.0) + delta / count
+    m2 = (stats.m2 or 0.0) + delta * (amount - mean)
+
+    if count == 1:
+        median, mad = amount, 0.0
+    else:
+        median, mad = stats.median, stats.mad
+        spread = mad or math.sqrt(m2 / count) or abs(amount - median)
+        step = max(SKETCH_RATE, 1.0 / count) * spread
+        median += math.copysign(step, amount - median) if amount != median else 0.0
+        deviation = abs(amount - median)
+        mad = max(mad + (math.copysign(step, deviation - mad) if deviation != mad else 0.0), 0.0)
+
+    stats.count, stats.mean, stats.m2, stats.median, stats.mad = count, mean, m2, median, mad
+
+
+def anomaly_message(category: str, amount: float, stats: CategoryStats) -> str:
+    return (f"Unusual expense: {amount:,.0f} on {category} is {amount / stats.median:.1f}x "
+            f"your typical {category} expense of {stats.median:,.0f}.")
+
+
+def _empty_stats(user_id: int, category: str) -> Dict:
+    return {"user_id": user_id, "category": category, "count": 0, "mean": 0.0, "m2": 0.0, "median": 0.0, "mad": 0.0}
+
+
+def _locked_stats(db: Session, user_id: int, category: str) -> CategoryStats:
+    """
+    The category's statistics row, locked for update; created empty on the
+    category's first expense. Concurrent first expenses both insert with ON
+    CONFLICT DO NOTHING and then lock the one row that exists.
+    """
+    stats = db.get(CategoryStats, (user_id, category), with_for_update=True)
+    if stats is not None:
+        return stats
+    db.execute(
+        _dialect_insert(CategoryStats).on_conflict_do_nothing(index_elements=["user_id", "category"]),
+        _empty_stats(user_id, category),
+    )
+    return db.get(CategoryStats, (user_id, category), with_for_update=True)
+
+
+def observe_expense(db: Session, user_id: int, category: str, amount: float, change_seq: int) -> Optional[Notification]:
+    """
+    Check a new expense against its category's statistics, then update them.
+    Adds (and returns) an alert notification when it is anomalous. Runs in the
+    caller's transaction; `change_seq` is the version the expense was written at.
+    """
+    stats = _locked_stats(db, user_id, category)
+    notification = None
+    if is_anomaly(stats, amount):
+        notification = Notification(
+            user_id=user_id,
+            message=anomaly_message(category, amount, stats),
+            type="alert",
+            change_seq=change_seq,
+        )
+        db.add(notification)
+    update_stats(stats, amount)
+    return notification
+
+
+def fold_expenses(db: Session, user_id: int, expenses: Iterable[Tuple[str, float]]):
+    """
+    Fold bulk-inserted (category, amount) pairs into the user's statistics in
+    O(batch), without raising alerts. Categories without statistics get exact
+    ones for the batch (compute_category_stats()); existing rows take each
+    amount through update_stats(). Does not commit.
+    """
+    by_category = defaultdict(list)
+    for category, amount in expenses:
+        by_category[category].append(amount)
+    if not by_category:
+        return
+    existing = db.execute(
+        select(CategoryStats)
+        .where(CategoryStats.user_id == user_id, CategoryStats.category.in_(list(by_category)))
+        .with_for_update()
+    ).scalars().all()
+    for stats in existing:
+        for amount in by_category.pop(stats.category):
+            update_stats(stats, amount)
+    if by_category:
+        categories = [category for category, amounts in by_category.items() for _ in amounts]
+        amounts = [amount for amounts in by_category.values() for amount in amounts]
+        db.execute(
+            _dialect_insert(CategoryStats).on_conflict_do_nothing(index_elements=["user_id", "category"]),
+            compute_category_stats([user_id] * len(amounts), categories, amounts),
+        )
+
+
+def mark_stale(db: Session, user_id: int, categories: Iterable[str]):
+    """
+    Flag a user's statistics for categories whose expenses were edited or
+    deleted, for `rebuild_anomaly_stats.py --stale`. Categories without a row
+    get an empty stale one, so expenses moved into them are counted on rebuild.
+    Does not commit.
+    """
+    rows = [{**_empty_stats(user_id, category), "stale": True} for category in sorted(set(categories))]
+    if rows:
+        stmt = _dialect_insert(CategoryStats)
+        db.execute(stmt.on_conflict_do_update(index_elements=["user_id", "category"], set_={"stale": True}), rows)
+
+
+# ─── Batch (backfill) ────────────────────────────────────
+
+def _group_medians(groups: np.ndarray, values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of `values` per group (groups numbered 0..n-1, with the given sizes and offsets)."""
+    ordered = values[np.lexsort((values, groups))]
+    return (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+
+
+def compute_category_stats(user_ids: Sequence[int], categories: Sequence[str], amounts: Sequence[float]) -> List[Dict]:
+    """
+    Exact category_stats rows for a batch of expenses (parallel sequences, any
+    order), computed for every (user, category) at once with NumPy.
+    """
+    if len(amounts) == 0:
+        return []
+    amounts = np.asarray(amounts, dtype=float)
+    names, name_index = np.unique(np.asarray(categories, dtype=object), return_inverse=True)
+    keys = np.asarray(user_ids, dtype=np.int64) * len(names) + name_index
+    group_keys, groups = np.unique(keys, return_inverse=True)
+
+    counts = np.bincount(groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    means = np.bincount(groups, weights=amounts) / counts
+    m2 = np.bincount(groups, weights=(amounts - means[groups]) ** 2)
+    medians = _group_medians(groups, amounts, starts, counts)
+    mads = _group_medians(groups, np.abs(amounts - medians[groups]), starts, counts)
+
+    return [
+        {
+            "user_id": int(key // len(names)),
+            "category": names[key % len(names)],
+            "count": int(counts[i]),
+            "mean": float(means[i]),
+            "m2": float(m2[i]),
+            "median": float(medians[i]),
+            "mad": float(mads[i]),
+        }
+        for i, key in enumerate(group_keys)
+    ]
@@ -0,0 +1,84 @@
+"""
+BudgetIQ – Integer Date Bucket Keys
+Every income/expense (and every daily rollup row) stores the calendar day it
+belongs to as three integers, computed once at write time:
+
+  - epoch_day:  days since 1970-01-01
+  - iso_week:   ISO year * 100 + ISO week number (e.g. 202642)
+  - year_month: year * 100 + month (e.g. 202610)
+
+Grouping by day, week or month is then a plain integer GROUP BY with the same
+plan on SQLite and PostgreSQL, instead of evaluating strftime/date_trunc on
+every row. Quarters and years are derived from year_month with integer math.
+Transaction dates map to a day with rollups.rollup_day (see date_buckets()).
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict
+from sqlalchemy import Date, cast, func, literal
+from database import IS_SQLITE
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_buckets(day: date) -> Dict[str, int]:
+    """Bucket column values for a calendar day."""
+    iso_year, iso_week, _ = day.isocalendar()
+    return {
+        "epoch_day": (day - EPOCH).days,
+        "iso_week": iso_year * 100 + iso_week,
+        "year_month": day.year * 100 + day.month,
+    }
+
+
+def epoch_day_to_date(epoch_day: int) -> date:
+    return EPOCH + timedelta(days=epoch_day)
+
+
+def bucket_number(day: date, granularity: str) -> int:
+    """Integer key of the bucket containing `day` (a date or datetime); matches bucket_number_sql()."""
+    if isinstance(day, datetime):
+        day = day.date()
+    if granularity == "day":
+        return (day - EPOCH).days
+    if granularity == "week":
+        iso_year, iso_week, _ = day.isocalendar()
+        return iso_year * 100 + iso_week
+    if granularity == "month":
+        return day.year * 100 + day.month
+    if granularity == "quarter":
+        return day.year * 10 + (day.month - 1) // 3 + 1
+    if granularity == "year":
+        return day.year
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def bucket_number_sql(model, granularity: str):
+    """
+    Integer bucket key over a table carrying the bucket columns. Day and week
+    need the daily columns; month, quarter and year only need year_month.
+    """
+    if granularity == "day":
+        return model.epoch_day
+    if granularity == "week":
+        return model.iso_week
+    if granularity == "month":
+        return model.year_month
+    if granularity == "quarter":
+        return model.year_month // 100 * 10 + (model.year_month % 100 - 1) // 3 + 1
+    if granularity == "year":
+        return model.year_month // 100
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def epoch_day_date_sql(column):
+    """SQL date for an epoch_day column (evaluate per group, not per row)."""
+    if IS_SQLITE:
+        return func.date(column * 86400, "unixepoch")
+    return cast(literal(EPOCH.isoformat()), Date) + column
+
+
+def year_month_date_sql(column):
+    """SQL date of the first day of a year_month column's month."""
+    if IS_SQLITE:
+        return func.printf("%04d-%02d-01", column // 100, column % 100)
+    return func.make_date(column // 100, column % 100, 1)
@@ -0,0 +1,113 @@
+"""
+BudgetIQ – Bulk Ingestion Helpers
+Validates many transaction payloads individually (so one bad item doesn't
+reject the batch) and inserts the valid ones with a single multi-row
+INSERT ... RETURNING inside the caller's transaction. Also computes the
+transaction fingerprints used to detect duplicate imports.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from rollups import rollup_day
+
+# Spare occurrence numbers probed per identical manual entry; more are only
+# queried when the user already stores that many identical rows
+OCCURRENCE_PROBE = 2
+
+# Fingerprints per IN (...) lookup, well under SQLite's bound-parameter limit
+FINGERPRINT_LOOKUP_BATCH = 1000
+
+
+def validate_items(items: List[Any], schema: Type[BaseModel]) -> Tuple[List[BaseModel], List[dict]]:
+    """
+    Validate each raw item against `schema`.
+    Returns (valid_items, errors) where each error is {"index": i, "errors": [...]}.
+    """
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append(schema.model_validate(item))
+        except ValidationError as e:
+            errors.append({
+                "index": index,
+                "errors": [f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}" for err in e.errors()],
+            })
+    return valid, errors
+
+
+def insert_rows(db: Session, model, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert rows in one executemany (batched multi-row INSERT ... RETURNING on
+    SQLite and PostgreSQL) and return the new ids in input order. Does not commit.
+    """
+    if not rows:
+        return []
+    result = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+def fingerprint_key(kind: str, dt: datetime, amount: float, text: Optional[str]) -> str:
+    """Identity of a transaction apart from its occurrence number: kind, UTC day, amount, normalized text."""
+    normalized = " ".join((text or "").lower().split())
+    return f"{kind}|{rollup_day(dt).isoformat()}|{amount:.2f}|{normalized}"
+
+
+def transaction_fingerprint(kind: str, dt: datetime, amount: float, text: Optional[str], occurrence: int = 0) -> str:
+    """
+    Stable hash identifying a transaction by kind, calendar day, amount (to the
+    cent) and normalized description/source. `occurrence` distinguishes
+    legitimately repeated identical rows (e.g. two equal purchases on one day).
+    """
+    raw = f"{fingerprint_key(kind, dt, amount, text)}|{occurrence}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def existing_fingerprints(db: Session, model, user_id: int, fingerprints: List[str]) -> set:
+    """The subset of `fingerprints` already stored for the user."""
+    found = set()
+    for i in range(0, len(fingerprints), FINGERPRINT_LOOKUP_BATCH):
+        batch = fingerprints[i:i + FINGERPRINT_LOOKUP_BATCH]
+        found.update(db.execute(
+            select(model.fingerprint).where(model.user_id == user_id, model.fingerprint.in_(batch))
+        ).scalars())
+    return found
+
+
+def assign_fingerprints(db: Session, model, user_id: int, kind: str, rows: List[Dict[str, Any]], text_field: str):
+    """
+    Set the fingerprint of manually entered rows (dicts with date, amount and
+    `text_field`). Identical rows take the lowest occurrence numbers not yet
+    stored for the user, so a purchase entered twice by hand is numbered 0 and
+    1 like a statement listing it twice, and importing that statement later
+    skips both. Call after bump_data_version(), which serializes the user's
+    writers. Does not commit.
+    """
+    groups: Dict[str, List[dict]] = defaultdict(list)
+    for r in rows:
+        groups[fingerprint_key(kind, r["date"], r["amount"], r.get(text_field))].append(r)
+    start = dict.fromkeys(groups, 0)
+    while groups:
+        # Candidate fingerprints per key, in occurrence order
+        window = {}
+        for key, members in groups.items():
+            first = members[0]
+            end = start[key] + len(members) + OCCURRENCE_PROBE
+            for occurrence in range(start[key], end):
+                window[transaction_fingerprint(kind, first["date"], first["amount"], first.get(text_field), occurrence)] = key
+            start[key] = end
+        taken = existing_fingerprints(db, model, user_id, list(window))
+        for fingerprint, key in window.items():
+            if fingerprint not in taken and groups[key]:
+                groups[key].pop()["fingerprint"] = fingerprint
+        groups = {key: members for key, members in groups.items() if members}
+
+
+def manual_fingerprint(db: Session, model, user_id: int, kind: str, dt: datetime, amount: float, text: Optional[str]) -> str:
+    """Fingerprint of one manually entered row (see assign_fingerprints())."""
+    row = {"date": dt, "amount": amount, "text": text}
+    assign_fingerprints(db, model, user_id, kind, [row], "text")
+    return row["fingerprint"]
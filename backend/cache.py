@@ -0,0 +1,226 @@
+"""
+BudgetIQ – Per-User Versioned Response Cache
+Caches computed dashboard / AI payloads keyed by (user_id, data_version, endpoint, params).
+Every income/expense write bumps the user's data_version, so a write invalidates
+that user's entries exactly; the TTL only bounds data that depends on "today".
+
+Layers:
+  - a bounded in-process LRU (always on)
+  - an optional shared backend (CACHE_BACKEND=sqlite uses a local SQLite file as a
+    stand-in for a shared store such as Redis)
+Setting CACHE_STALE_SECONDS > 0 enables stale-while-revalidate: an expired entry
+is served once more while a background thread recomputes it.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import User
+from config import CACHE_TTL_SECONDS, CACHE_STALE_SECONDS, CACHE_MAX_ENTRIES, CACHE_BACKEND, CACHE_SQLITE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Data Versioning ─────────────────────────────────────
+
+def bump_data_version(db: Session, user_id: int) -> int:
+    """
+    Increment the user's data version inside the caller's transaction and return it.
+    Call from every route that changes a user's financial data, before commit.
+    """
+    return db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .returning(User.data_version)
+    ).scalar_one()
+
+
+# ─── Backends ────────────────────────────────────────────
+
+class MemoryBackend:
+    """Thread-safe, size-bounded LRU of key -> (value, stored_at)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float):
+        with self._lock:
+            self._data[key] = (value, stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteBackend:
+    """Shared cache in a SQLite file (JSON values), pruned to max_entries by age."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float):
+        payload = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, payload, stored_at),
+            )
+            self._writes += 1
+            # Prune occasionally rather than on every write
+            if self._writes % 100 == 0:
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE key NOT IN "
+                    "(SELECT key FROM response_cache ORDER BY stored_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+
+# ─── Cache ───────────────────────────────────────────────
+
+class ResponseCache:
+    """Two-level (local LRU + optional shared backend) cache with TTL and stale-while-revalidate."""
+
+    def __init__(self, local: MemoryBackend, shared=None, ttl: int = 300, stale_ttl: int = 0):
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+    @staticmethod
+    def make_key(user_id: int, version: int, endpoint: str, params: Optional[dict] = None) -> str:
+        return f"{user_id}:{version}:{endpoint}:{json.dumps(params or {}, sort_keys=True, default=str)}"
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared cache read failed: {e}")
+                entry = None
+            if entry is not None:
+                self.local.set(key, *entry)
+        return entry
+
+    def _store(self, key: str, value: Any):
+        stored_at = time.time()
+        self.local.set(key, value, stored_at)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, stored_at)
+            except Exception as e:
+                logger.warning(f"Shared cache write failed: {e}")
+
+    def _refresh(self, key: str, compute: Callable[[Session], Any]):
+        """Recompute an entry on a background thread with its own DB session."""
+        db = SessionLocal()
+        try:
+            self._store(key, jsonable_encoder(compute(db)))
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {key}: {e}")
+        finally:
+            db.close()
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+    def get_or_compute(
+        self,
+        db: Session,
+        user: User,
+        endpoint: str,
+        params: Optional[dict],
+        compute: Callable[[Session], Any],
+    ) -> Any:
+        """
+        Return the cached payload for this user's current data version, computing
+        (and caching) it on a miss. `compute` receives a Session and must return
+        JSON-encodable data; it may run on a background thread with its own session.
+        """
+        key = self.make_key(user.id, user.data_version or 0, endpoint, params)
+        entry = self._lookup(key)
+        now = time.time()
+        if entry is not None:
+            value, stored_at = entry
+            age = now - stored_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.stale_ttl:
+                with self._refresh_lock:
+                    start = key not in self._refreshing
+                    self._refreshing.add(key)
+                if start:
+                    self._refresher.submit(self._refresh, key, compute)
+                return value
+
+        value = jsonable_encoder(compute(db))
+        self._store(key, value)
+        return value
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+def _build_shared_backend():
+    if CACHE_BACKEND == "sqlite":
+        try:
+            return SQLiteBackend(CACHE_SQLITE_PATH, CACHE_MAX_ENTRIES * 10)
+        except Exception as e:
+            logger.warning(f"SQLite cache backend unavailable, using in-process cache only: {e}")
+    elif CACHE_BACKEND:
+        logger.warning(f"Unknown CACHE_BACKEND '{CACHE_BACKEND}', using in-process cache only.")
+    return None
+
+
+response_cache = ResponseCache(
+    MemoryBackend(CACHE_MAX_ENTRIES),
+    shared=_build_shared_backend(),
+    ttl=CACHE_TTL_SECONDS,
+    stale_ttl=CACHE_STALE_SECONDS,
+)
@@ -0,0 +1,139 @@
+"""
+BudgetIQ – Category Lookup
+Category names are stored once per user in the categories table; incomes,
+expenses and the rollups reference them by a small integer category_id
+(incomes and expenses also keep the name, as a denormalized display value).
+
+Name -> id resolution is cached in-process. A (user, name) pair never changes
+id, so entries never go stale. Ids created inside a transaction are only
+cached once it commits, so a rollback can't leave a dangling id behind.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from database import IS_SQLITE, SessionLocal
+from models import Category
+from config import CATEGORY_CACHE_SIZE
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert as _dialect_insert
+else:
+    from sqlalchemy.dialects.postgresql import insert as _dialect_insert
+
+# Session.info key holding ids created in the current transaction
+_PENDING = "pending_category_ids"
+
+
+class CategoryCache:
+    """Thread-safe, size-bounded LRU of (user_id, name) -> category id."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Tuple[int, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, name: str):
+        with self._lock:
+            key = (user_id, name)
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def update(self, user_id: int, ids: Dict[str, int]):
+        with self._lock:
+            for name, category_id in ids.items():
+                self._data[(user_id, name)] = category_id
+                self._data.move_to_end((user_id, name))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+category_cache = CategoryCache(CATEGORY_CACHE_SIZE)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_pending(session: Session):
+    for user_id, ids in session.info.pop(_PENDING, {}).items():
+        category_cache.update(user_id, ids)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction):
+    session.info.pop(_PENDING, None)
+
+
+def resolve_category_ids(db: Session, user_id: int, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Map category names to this user's category ids, creating missing categories
+    in the caller's transaction (one INSERT ... ON CONFLICT DO NOTHING plus one
+    SELECT for all cache misses). Does not commit.
+    """
+    ids, missing = {}, set()
+    pending = db.info.get(_PENDING, {}).get(user_id, {})
+    for name in set(names):
+        category_id = category_cache.get(user_id, name) or pending.get(name)
+        if category_id is None:
+            missing.add(name)
+        else:
+            ids[name] = category_id
+    if not missing:
+        return ids
+
+    db.execute(
+        _dialect_insert(Category).on_conflict_do_nothing(index_elements=["user_id", "name"]),
+        [{"user_id": user_id, "name": name} for name in sorted(missing)],
+    )
+    found = dict(db.execute(
+        select(Category.name, Category.id).where(Category.user_id == user_id, Category.name.in_(missing))
+    ).all())
+    db.info.setdefault(_PENDING, {}).setdefault(user_id, {}).update(found)
+    ids.update(found)
+    return ids
+
+
+def resolve_category_id(db: Session, user_id: int, name: str) -> int:
+    """Single-name form of resolve_category_ids()."""
+    return resolve_category_ids(db, user_id, [name])[name]
+
+
+def with_category_ids(db: Session, user_id: int, rows: List[dict]) -> List[dict]:
+    """Set "category_id" on row dicts from their "category" names (in place)."""
+    ids = resolve_category_ids(db, user_id, (r["category"] for r in rows))
+    for r in rows:
+        r["category_id"] = ids[r["category"]]
+    return rows
+
+
+def find_category_ids(db: Session, user_id: int, names: Iterable[str]) -> List[int]:
+    """
+    Ids of the user's existing categories among `names`, for filters on
+    category_id. Unknown names are skipped, never created; cache misses cost
+    one SELECT.
+    """
+    ids, missing = [], set()
+    pending = db.info.get(_PENDING, {}).get(user_id, {})
+    for name in set(names):
+        category_id = category_cache.get(user_id, name) or pending.get(name)
+        if category_id is None:
+            missing.add(name)
+        else:
+            ids.append(category_id)
+    if missing:
+        ids.extend(db.execute(
+            select(Category.id).where(Category.user_id == user_id, Category.name.in_(missing))
+        ).scalars())
+    return ids
+
+
+def list_categories(db: Session, user_id: int) -> List[Category]:
+    """All of a user's categories, alphabetically."""
+    return db.execute(
+        select(Category).where(Category.user_id == user_id).order_by(Category.name)
+    ).scalars().all()
@@ -24,6 +24,20 @@ DATABASE_URL = os.getenv(
     os.getenv("DATABASE_URL", "sqlite:///./budgetiq.db")
 )
 
+# Response cache for dashboard / AI endpoints (entries are keyed by the user's
+# data version, so writes invalidate exactly; the TTL only bounds time-relative data)
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_STALE_SECONDS = int(os.getenv("CACHE_STALE_SECONDS", "0"))  # >0 enables stale-while-revalidate
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))  # per-process LRU bound
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "")  # "" (in-process only) or "sqlite"
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join(os.path.dirname(__file__), "cache.sqlite3"))
+
+# In-process cache of (user, category name) -> category id
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "10000"))
+
+# Upper bound on items per bulk income/expense request
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", "5000"))
+
 # Upload directory for profile pictures
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -43,6 +57,24 @@ BACKEND_URL = os.getenv(
 # Google Gemini API key (get free key at https://aistudio.google.com/apikey)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
+# AI chat: per-reply LLM deadline (falls back to the rule-based answer) and the
+# max LLM calls in flight per process; further chats wait for a slot within the deadline
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# AI chat LLM backend: "gemini" (needs GEMINI_API_KEY), "fake" (local simulator
+# for load tests, tuned by the FAKE_LLM_* settings) or "none" (rule-based only)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))            # time to first token
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))              # 0..1, share of failed replies
+FAKE_LLM_REPLY_WORDS = int(os.getenv("FAKE_LLM_REPLY_WORDS", "60"))
+
+# Spending anomaly alerts: an expense is flagged when its robust z-score against
+# the category's history exceeds the threshold, once the category has enough expenses
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "3.5"))
+ANOMALY_MIN_HISTORY = int(os.getenv("ANOMALY_MIN_HISTORY", "10"))
+
 # Resend Email API (recommended – sign up free at https://resend.com)
 RESEND_API_KEY = os.getenv("RESEND_API_KEY", "")
 RESEND_FROM = os.getenv("RESEND_FROM", "BudgetIQ <onboarding@resend.dev>")  # Use your verified domain in production
@@ -0,0 +1,203 @@
+"""
+BudgetIQ – Streaming Bank-Statement CSV Import
+Parses an uploaded CSV row by row, maps each line to an Income or Expense,
+drops rows already present (by transaction fingerprint) and inserts the rest
+in fixed-size chunks, one transaction per chunk. Memory use is bounded by the
+chunk size regardless of file size; progress and per-line errors are emitted
+as events while the import runs.
+
+Identical lines (same UTC day, amount and text) are numbered in file order and
+the number is part of the fingerprint. Manual entries are numbered after the
+identical rows already stored (bulk.assign_fingerprints()), so a statement
+listing purchases that were first entered by hand skips them.
+
+Sign convention: with a single amount column, negative amounts are expenses and
+positive amounts are income. With separate debit/credit columns, debits are
+expenses and credits are income.
+"""
+import csv
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from sqlalchemy.orm import Session
+from models import Income, Expense
+from schemas import CsvColumnMapping
+from bulk import insert_rows, existing_fingerprints, fingerprint_key, transaction_fingerprint
+from rollups import apply_rollups, date_buckets, INCOME, EXPENSE
+from cache import bump_data_version
+from categories import with_category_ids
+from anomalies import fold_expenses
+
+# Parsed rows per insert batch / transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Per-line errors reported individually; later ones are only counted
+MAX_REPORTED_ERRORS = 200
+
+# Distinct (day, amount, text) keys remembered for numbering repeated identical
+# rows; bank exports list same-day repeats together, so a bounded window suffices
+OCCURRENCE_WINDOW = 50_000
+
+# Date formats tried (in order) when no explicit date_format is given
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%m/%d/%Y")
+
+_AMOUNT_JUNK = re.compile(r"[^\d.\-]")
+
+
+def parse_amount(raw: str) -> Optional[float]:
+    """Parse '1,234.50', '₹ 99', '(12.00)' or '-5' into a float; blank -> None."""
+    text = (raw or "").strip()
+    if not text:
+        return None
+    negative = text.startswith("(") and text.endswith(")")
+    cleaned = _AMOUNT_JUNK.sub("", text)
+    if cleaned in ("", "-", "."):
+        raise ValueError(f"invalid amount '{raw}'")
+    value = float(cleaned)
+    return -abs(value) if negative else value
+
+
+def parse_date(raw: str, date_format: Optional[str] = None) -> datetime:
+    """Parse a statement date with an explicit format, ISO 8601, or common bank formats."""
+    text = (raw or "").strip()
+    if not text:
+        raise ValueError("missing date")
+    if date_format:
+        return datetime.strptime(text, date_format)
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date '{raw}'")
+
+
+def parse_row(row: Dict[str, str], mapping: CsvColumnMapping) -> Tuple[str, dict]:
+    """Map one CSV record to (kind, column values). Raises ValueError with a readable message."""
+    dt = parse_date(row.get(mapping.date_column), mapping.date_format)
+
+    if mapping.debit_column or mapping.credit_column:
+        debit = parse_amount(row.get(mapping.debit_column) or "") if mapping.debit_column else None
+        credit = parse_amount(row.get(mapping.credit_column) or "") if mapping.credit_column else None
+        if debit:
+            kind, amount = EXPENSE, abs(debit)
+        elif credit:
+            kind, amount = INCOME, abs(credit)
+        else:
+            raise ValueError("no debit or credit amount")
+    else:
+        value = parse_amount(row.get(mapping.amount_column) or "")
+        if not value:
+            raise ValueError("missing or zero amount")
+        kind, amount = (EXPENSE, -value) if value < 0 else (INCOME, value)
+
+    description = (row.get(mapping.description_column) or "").strip() if mapping.description_column else ""
+    category = (row.get(mapping.category_column) or "").strip() if mapping.category_column else ""
+    category = (category or mapping.default_category)[:100]
+
+    if kind == EXPENSE:
+        return kind, {"amount": amount, "category": category, "description": description or None, "date": dt}
+    return kind, {"amount": amount, "source": (description or "Imported")[:200], "category": category, "date": dt}
+
+
+class _OccurrenceCounter:
+    """Numbers repeated identical rows (0, 1, 2, ...) within a bounded LRU window."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+
+    def next(self, key: str) -> int:
+        count = self._seen.pop(key, -1) + 1
+        self._seen[key] = count
+        if len(self._seen) > self.window:
+            self._seen.popitem(last=False)
+        return count
+
+
+def _flush(db: Session, user_id: int, chunk: List[Tuple[str, dict]], counter: _OccurrenceCounter) -> Tuple[int, int]:
+    """Insert one chunk's new rows in a single transaction; returns (inserted, duplicates)."""
+    by_kind = {INCOME: [], EXPENSE: []}
+    for kind, values in chunk:
+        text = values.get("description") if kind == EXPENSE else values.get("source")
+        key = fingerprint_key(kind, values["date"], values["amount"], text)
+        values["fingerprint"] = transaction_fingerprint(kind, values["date"], values["amount"], text, counter.next(key))
+        values["user_id"] = user_id
+        by_kind[kind].append(values)
+
+    new_by_kind = {}
+    duplicates = 0
+    for kind, model in ((INCOME, Income), (EXPENSE, Expense)):
+        rows = by_kind[kind]
+        existing = existing_fingerprints(db, model, user_id, [r["fingerprint"] for r in rows])
+        new_by_kind[kind] = [r for r in rows if r["fingerprint"] not in existing]
+        duplicates += len(rows) - len(new_by_kind[kind])
+
+    inserted = sum(len(rows) for rows in new_by_kind.values())
+    if inserted:
+        seq = bump_data_version(db, user_id)
+        for kind, model in ((INCOME, Income), (EXPENSE, Expense)):
+            new_rows = new_by_kind[kind]
+            if new_rows:
+                for r in new_rows:
+                    r.update(date_buckets(r["date"]), change_seq=seq)
+                with_category_ids(db, user_id, new_rows)
+                insert_rows(db, model, new_rows)
+                apply_rollups(db, user_id, kind, [(r["category_id"], r["date"], r["amount"], 1) for r in new_rows])
+        fold_expenses(db, user_id, [(r["category"], r["amount"]) for r in new_by_kind[EXPENSE]])
+    db.commit()
+    return inserted, duplicates
+
+
+def run_import(db: Session, stream: TextIO, user_id: int, mapping: CsvColumnMapping) -> Iterator[dict]:
+    """
+    Import a CSV text stream for a user, yielding event dicts:
+      {"event": "error", "line": n, "message": ...}   per bad line (first MAX_REPORTED_ERRORS)
+      {"event": "progress", ...counters}              after each committed chunk
+      {"event": "done", ...counters}                  at the end
+    Chunks committed before a failure stay committed; re-running the same file
+    skips them as duplicates.
+    """
+    reader = csv.DictReader(stream, delimiter=mapping.delimiter)
+    headers = reader.fieldnames or []
+    required = [mapping.date_column] + [
+        c for c in (mapping.amount_column if not (mapping.debit_column or mapping.credit_column) else None,
+                    mapping.debit_column, mapping.credit_column) if c
+    ]
+    missing = [c for c in required if c not in headers]
+    if missing:
+        yield {"event": "failed", "message": f"Missing column(s): {', '.join(missing)}. Found: {', '.join(headers)}"}
+        return
+
+    stats = {"rows_read": 0, "inserted": 0, "duplicates": 0, "errors": 0}
+    counter = _OccurrenceCounter(OCCURRENCE_WINDOW)
+    chunk: List[Tuple[str, dict]] = []
+
+    for row in reader:
+        stats["rows_read"] += 1
+        try:
+            chunk.append(parse_row(row, mapping))
+        except (ValueError, TypeError) as e:
+            stats["errors"] += 1
+            if stats["errors"] <= MAX_REPORTED_ERRORS:
+                yield {"event": "error", "line": reader.line_num, "message": str(e)}
+            continue
+
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            inserted, duplicates = _flush(db, user_id, chunk, counter)
+            stats["inserted"] += inserted
+            stats["duplicates"] += duplicates
+            chunk = []
+            yield {"event": "progress", **stats}
+
+    if chunk:
+        inserted, duplicates = _flush(db, user_id, chunk, counter)
+        stats["inserted"] += inserted
+        stats["duplicates"] += duplicates
+
+    yield {"event": "done", **stats}
@@ -0,0 +1,62 @@
+"""
+BudgetIQ – Conditional GET Support (ETag / If-None-Match)
+Per-user read endpoints derive a strong ETag from the user's data_version, the
+endpoint and its query parameters. A matching If-None-Match short-circuits the
+request with 304 before any aggregate query or response serialization runs.
+
+Usage:
+    @router.get("", dependencies=[Depends(etag_guard("expenses"))])
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response
+from models import User
+from auth import get_current_user
+
+# Clients must revalidate every time, but may keep a private copy to revalidate against
+CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(user: User, scope: str, params: Iterable[Tuple[str, str]] = (), daily: bool = False) -> str:
+    """
+    Strong ETag for a user's view of an endpoint.
+    `daily` folds in the current UTC date for responses relative to "today".
+    """
+    parts = [str(user.id), str(user.data_version or 0), scope]
+    parts.extend(f"{k}={v}" for k, v in sorted(params))
+    if daily:
+        parts.append(datetime.now(timezone.utc).date().isoformat())
+    digest = hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 §13.1.2)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def etag_guard(scope: str, daily: bool = False):
+    """
+    Route dependency: answers 304 Not Modified when the client's ETag is current,
+    otherwise sets the ETag header on the eventual response.
+    """
+    def dependency(request: Request, response: Response, user: User = Depends(get_current_user)) -> str:
+        etag = compute_etag(user, scope, request.query_params.multi_items(), daily)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        return etag
+
+    return dependency
@@ -0,0 +1,100 @@
+"""
+BudgetIQ – Unified Transactions Feed
+One ordered UNION ALL over incomes and expenses with a `kind` discriminator,
+paged by keyset on (sort key, kind, id). Each leg seeks past the cursor and is
+limited on its own (user_id, <sort>, id) index, so a page reads at most
+limit + 1 rows per table before the merge.
+"""
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import literal, null, select, tuple_, union_all
+from sqlalchemy.orm import Session
+from models import Income, Expense
+from filters import TransactionQuery
+from pagination import decode_cursor, encode_cursor, sort_value
+from rollups import INCOME, EXPENSE
+
+# (kind, model, description column, source column) per leg
+_LEGS = (
+    (EXPENSE, Expense, Expense.description, None),
+    (INCOME, Income, None, Income.source),
+)
+
+
+def _decode_feed_cursor(cursor: str, sort: str, order: str) -> Tuple[object, str, int]:
+    values = decode_cursor(cursor)
+    try:
+        cursor_sort, cursor_order, value, kind, last_id = values
+        if (cursor_sort, cursor_order) != (sort, order) or kind not in (INCOME, EXPENSE):
+            raise ValueError("cursor was issued for a different sort")
+        return sort_value(sort, value), kind, int(last_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _seek(model, column, kind: str, order: str, last_value, last_kind: str, last_id: int):
+    """
+    Predicate for rows of one leg that come after (last_value, last_kind, last_id).
+    `kind` is constant within a leg, so the three-part comparison reduces to a
+    comparison on (column, id) or on column alone.
+    """
+    if order == "desc":
+        if kind == last_kind:
+            return tuple_(column, model.id) < tuple_(last_value, last_id)
+        return column <= last_value if kind < last_kind else column < last_value
+    if kind == last_kind:
+        return tuple_(column, model.id) > tuple_(last_value, last_id)
+    return column >= last_value if kind > last_kind else column > last_value
+
+
+def get_feed(
+    db: Session,
+    user_id: int,
+    filters: TransactionQuery,
+    limit: int,
+    cursor: Optional[str] = None,
+    kinds: Tuple[str, ...] = (INCOME, EXPENSE),
+) -> Tuple[List[dict], Optional[str]]:
+    """Return (rows, next_cursor) of a user's incomes and expenses, interleaved in one order."""
+    sort, order = filters.sort, filters.order
+    direction = (lambda c: c.desc()) if order == "desc" else (lambda c: c.asc())
+    seek = _decode_feed_cursor(cursor, sort, order) if cursor else None
+
+    legs = []
+    for kind, model, description, source in _LEGS:
+        if kind not in kinds:
+            continue
+        column = getattr(model, sort)
+        stmt = select(
+            literal(kind).label("kind"),
+            model.id.label("id"),
+            model.amount.label("amount"),
+            model.category.label("category"),
+            (description if description is not None else null()).label("description"),
+            (source if source is not None else null()).label("source"),
+            model.date.label("date"),
+            model.created_at.label("created_at"),
+        ).where(model.user_id == user_id)
+        stmt = filters.apply(db, stmt, model, user_id)
+        if seek:
+            stmt = stmt.where(_seek(model, column, kind, order, *seek))
+        legs.append(stmt.order_by(direction(column), direction(model.id)).limit(limit + 1).subquery().select())
+
+    if not legs:
+        return [], None
+    feed = union_all(*legs).subquery()
+    rows = db.execute(
+        select(feed)
+        .order_by(direction(feed.c[sort]), direction(feed.c.kind), direction(feed.c.id))
+        .limit(limit + 1)
+    ).mappings().all()
+    rows = [dict(r) for r in rows]
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    value = last[sort]
+    if sort == "date":
+        value = value if isinstance(value, str) else value.isoformat()
+    return rows, encode_cursor([sort, order, value, last["kind"], last["id"]])
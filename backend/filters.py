@@ -0,0 +1,72 @@
+"""
+BudgetIQ – Transaction List Filtering & Sorting
+Query-parameter dependency shared by the income and expense list routes.
+Filters and ordering run in SQL against the (user_id, ...) composite indexes.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from fastapi import HTTPException, Query
+from sqlalchemy.orm import Session
+from categories import find_category_ids
+
+SORT_KEYS = ("date", "amount", "category")
+
+
+class TransactionQuery:
+    """Filters (category, date range, amount range) plus sort key and direction."""
+
+    def __init__(
+        self,
+        category: Optional[List[str]] = Query(None, description="Repeat to match any of several categories"),
+        date_from: Optional[date] = Query(None, description="First day to include"),
+        date_to: Optional[date] = Query(None, description="Last day to include"),
+        min_amount: Optional[float] = Query(None, ge=0),
+        max_amount: Optional[float] = Query(None, ge=0),
+        sort: str = Query("date", regex=f"^({'|'.join(SORT_KEYS)})$"),
+        order: str = Query("desc", regex="^(asc|desc)$"),
+    ):
+        if date_from and date_to and date_from > date_to:
+            raise HTTPException(status_code=400, detail="date_from must be on or before date_to")
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise HTTPException(status_code=400, detail="min_amount must not exceed max_amount")
+        self.categories = [c for c in (category or []) if c]
+        self.date_from = date_from
+        self.date_to = date_to
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.sort = sort
+        self.order = order
+
+    def apply(self, db: Session, query, model, user_id: int):
+        """Add this request's WHERE clauses for `model` (rows of `user_id`) to a query."""
+        clauses = filter_clauses(db, model, user_id, self.categories, self.date_from, self.date_to, self.min_amount, self.max_amount)
+        return query.filter(*clauses) if clauses else query
+
+
+def filter_clauses(
+    db: Session,
+    model,
+    user_id: int,
+    categories: Optional[List[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> list:
+    """
+    WHERE clauses on an Income/Expense model; date_to is inclusive of the whole day.
+    Category names are resolved to ids first, so rows match on the integer
+    category_id via the (user_id, category_id, date, id) index.
+    """
+    clauses = []
+    if categories:
+        clauses.append(model.category_id.in_(find_category_ids(db, user_id, categories)))
+    if date_from:
+        clauses.append(model.date >= datetime.combine(date_from, time.min))
+    if date_to:
+        clauses.append(model.date < datetime.combine(date_to + timedelta(days=1), time.min))
+    if min_amount is not None:
+        clauses.append(model.amount >= min_amount)
+    if max_amount is not None:
+        clauses.append(model.amount <= max_amount)
+    return clauses
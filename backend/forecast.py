@@ -0,0 +1,204 @@
+"""
+BudgetIQ – Per-Category Spending Forecast
+Loads a user's daily expense totals per category from the daily rollups once,
+as a dense (categories x days) NumPy array, and fits three lightweight models
+to every category at once:
+
+  - exponential smoothing: exponentially weighted mean of daily spend
+  - seasonal naive:        the same days one year earlier (needs a year of history)
+  - linear trend:          least-squares line over the recent window
+
+Each category gets the model whose forecast of the last `horizon` days of its
+history (fitted on the days before them) came closest to what was spent.
+Forecasts start tomorrow; the month-end projection adds the current month's
+actual spend to the forecast of its remaining days, so partial months count.
+Results are cached per user data version through the response cache.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Category, DailyRollup, User
+from aggregates import MONEY_PLACES
+from buckets import EPOCH
+from rollups import EXPENSE
+from cache import response_cache
+
+# Days of history loaded (about five years)
+HISTORY_DAYS = 5 * 365 + 1
+# Default and maximum forecast horizon in days
+DEFAULT_HORIZON_DAYS = 30
+MAX_HORIZON_DAYS = 365
+# Smoothing factor of the exponential smoothing model (a ~30-day span)
+SMOOTHING_ALPHA = 2 / (30 + 1)
+# Days the linear trend is fitted over
+TREND_WINDOW_DAYS = 180
+# Season length of the seasonal naive model
+SEASON_DAYS = 365
+# Least history (days before the backtest window) needed to compare models
+MIN_BACKTEST_DAYS = 28
+
+MODELS = ("exponential_smoothing", "seasonal_naive", "linear_trend")
+
+
+def load_daily_series(db: Session, user_id: int, today: date) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Daily expense totals per category up to `today`, as (categories, first_day,
+    series): series[i, t] is category i's spend on day t of the window, and
+    first_day[i] the index of its first day with data. The window starts on the
+    user's earliest day in the last HISTORY_DAYS, so new users get short arrays.
+    """
+    since = today - timedelta(days=HISTORY_DAYS - 1)
+    rows = db.execute(
+        select(DailyRollup.category_id, Category.name, DailyRollup.epoch_day, DailyRollup.total)
+        .join(Category, Category.id == DailyRollup.category_id)
+        .where(
+            DailyRollup.user_id == user_id,
+            DailyRollup.kind == EXPENSE,
+            DailyRollup.day >= since,
+            DailyRollup.day <= today,
+            DailyRollup.count > 0,
+        )
+    ).all()
+    if not rows:
+        return [], np.zeros(0, dtype=np.int64), np.zeros((0, 0))
+
+    category_ids, names, days, totals = zip(*rows)
+    _, first, category_index = np.unique(np.fromiter(category_ids, dtype=np.int64, count=len(rows)),
+                                         return_index=True, return_inverse=True)
+    categories = np.array(names, dtype=object)[first]
+    days = np.fromiter(days, dtype=np.int64, count=len(rows))
+    start = days.min()
+    series = np.zeros((len(categories), (today - EPOCH).days - start + 1))
+    np.add.at(series, (category_index, days - start), np.fromiter(totals, dtype=float, count=len(rows)))
+
+    first_day = np.full(len(categories), series.shape[1], dtype=np.int64)
+    np.minimum.at(first_day, category_index, days - start)
+    return list(categories), first_day, series
+
+
+# ─── Models (each forecasts `steps` days for every row of `y`) ───
+
+def exponential_smoothing(y: np.ndarray, first_day: np.ndarray, steps: int) -> np.ndarray:
+    """Flat forecast at the exponentially weighted mean of each row's history."""
+    n = y.shape[1]
+    age = np.arange(n - 1, -1, -1)
+    weights = (1 - SMOOTHING_ALPHA) ** age * (np.arange(n) >= first_day[:, None])
+    total = weights.sum(axis=1)
+    level = np.divide((y * weights).sum(axis=1), total, out=np.zeros(len(y)), where=total > 0)
+    return np.repeat(level[:, None], steps, axis=1)
+
+
+def seasonal_naive(y: np.ndarray, first_day: np.ndarray, steps: int) -> np.ndarray:
+    """The same days one season earlier (NaN where the history is too short)."""
+    n = y.shape[1]
+    if n < SEASON_DAYS or steps > SEASON_DAYS:
+        return np.full((len(y), steps), np.nan)
+    forecast = y[:, n - SEASON_DAYS:n - SEASON_DAYS + steps].copy()
+    forecast[first_day > n - SEASON_DAYS] = np.nan
+    return forecast
+
+
+def linear_trend(y: np.ndarray, first_day: np.ndarray, steps: int) -> np.ndarray:
+    """Least-squares line over each row's last TREND_WINDOW_DAYS, floored at zero."""
+    n = y.shape[1]
+    window = min(TREND_WINDOW_DAYS, n)
+    t = np.arange(window, dtype=float)
+    mask = t >= (first_day - (n - window))[:, None]
+    recent = y[:, n - window:] * mask
+
+    sw, st, stt = mask.sum(axis=1), (mask * t).sum(axis=1), (mask * t * t).sum(axis=1)
+    sy, sty = recent.sum(axis=1), (recent * t).sum(axis=1)
+    denom = sw * stt - st * st
+    slope = np.divide(sw * sty - st * sy, denom, out=np.zeros(len(y)), where=denom > 0)
+    intercept = np.divide(sy - slope * st, sw, out=np.zeros(len(y)), where=sw > 0)
+    ahead = np.arange(window, window + steps, dtype=float)
+    return np.maximum(intercept[:, None] + slope[:, None] * ahead, 0.0)
+
+
+_FITTERS = (exponential_smoothing, seasonal_naive, linear_trend)
+
+
+def select_models(y: np.ndarray, first_day: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Index into MODELS per row: the model with the smallest absolute error on the
+    total of the last `horizon` days, fitted on the days before them. Rows
+    without enough history for a backtest use exponential smoothing.
+    """
+    n = y.shape[1]
+    choice = np.zeros(len(y), dtype=np.int64)
+    if n - horizon < MIN_BACKTEST_DAYS:
+        return choice
+    actual = y[:, n - horizon:].sum(axis=1)
+    train = y[:, :n - horizon]
+    errors = np.stack([np.abs(fit(train, first_day, horizon).sum(axis=1) - actual) for fit in _FITTERS], axis=1)
+    errors[np.isnan(errors)] = np.inf
+    eligible = first_day <= n - horizon - MIN_BACKTEST_DAYS
+    choice[eligible] = errors[eligible].argmin(axis=1)
+    return choice
+
+
+def forecast_series(y: np.ndarray, first_day: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(model index per row, daily forecast of shape rows x horizon)."""
+    choice = select_models(y, first_day, horizon)
+    forecasts = np.stack([fit(y, first_day, horizon) for fit in _FITTERS])
+    return choice, forecasts[choice, np.arange(len(y))]
+
+
+def compute_forecast(db: Session, user_id: int, horizon: int = DEFAULT_HORIZON_DAYS, today: Optional[date] = None) -> dict:
+    """Per-category spending forecast for the next `horizon` days and this month's projected total."""
+    today = today or datetime.now(timezone.utc).date()
+    next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+    days_left = (next_month - today).days - 1
+    categories, first_day, y = load_daily_series(db, user_id, today)
+    result = {
+        "as_of": today,
+        "horizon_days": horizon,
+        "history_days": y.shape[1],
+        "total": 0.0,
+        "month_to_date": 0.0,
+        "month_end": 0.0,
+        "categories": [],
+    }
+    if not categories:
+        return result
+
+    choice, daily = forecast_series(y, first_day, max(horizon, days_left))
+    month_to_date = y[:, y.shape[1] - today.day:].sum(axis=1) if y.shape[1] >= today.day else y.sum(axis=1)
+    next_days = daily[:, :horizon].sum(axis=1)
+    month_end = month_to_date + daily[:, :days_left].sum(axis=1)
+
+    rows = [
+        {
+            "category": category,
+            "model": MODELS[choice[i]],
+            "forecast": round(float(next_days[i]), MONEY_PLACES),
+            "month_to_date": round(float(month_to_date[i]), MONEY_PLACES),
+            "month_end": round(float(month_end[i]), MONEY_PLACES),
+        }
+        for i, category in enumerate(categories)
+    ]
+    rows.sort(key=lambda r: -r["forecast"])
+    result.update(
+        total=round(float(next_days.sum()), MONEY_PLACES),
+        month_to_date=round(float(month_to_date.sum()), MONEY_PLACES),
+        month_end=round(float(month_end.sum()), MONEY_PLACES),
+        categories=rows,
+    )
+    return result
+
+
+def get_forecast(db: Session, user_id: int, horizon: int = DEFAULT_HORIZON_DAYS) -> Dict:
+    """
+    The user's forecast for their current data version, from the response cache
+    when possible. It starts from today (UTC), so the date is part of the key.
+    """
+    today = datetime.now(timezone.utc).date()
+    user = db.get(User, user_id)
+    if user is None:
+        return compute_forecast(db, user_id, horizon, today)
+    return response_cache.get_or_compute(
+        db, user, "ai.forecast", {"horizon": horizon, "as_of": today.isoformat()},
+        lambda s: compute_forecast(s, user_id, horizon, today)
+    )
@@ -30,6 +30,12 @@ from routes.ai_routes import router as ai_router
 from routes.notification_routes import router as notification_router
 from routes.profile_routes import router as profile_router
 from routes.report_routes import router as report_router
+from routes.import_routes import router as import_router
+from routes.search_routes import router as search_router
+from routes.transaction_routes import router as transaction_router
+from routes.sync_routes import router as sync_router
+from routes.category_routes import router as category_router
+from migrate import run_migrations
 
 # Create all database tables (safe for production - uses IF NOT EXISTS)
 try:
@@ -38,6 +44,14 @@ try:
 except Exception as e:
     logger.warning(f"create_all skipped (tables may already exist): {e}")
 
+# Apply pending versioned migrations (columns/indexes create_all can't add to existing tables)
+try:
+    applied = run_migrations(engine)
+    if applied:
+        logger.info(f"Applied migrations: {', '.join(applied)}")
+except Exception as e:
+    logger.error(f"Database migration failed: {e}")
+
 # Initialize FastAPI app
 app = FastAPI(
     title="BudgetIQ API",
@@ -60,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 logger.info(f"CORS: allowing all origins. FRONTEND_URL={FRONTEND_URL}")
 
@@ -75,6 +90,11 @@ app.include_router(ai_router)
 app.include_router(notification_router)
 app.include_router(profile_router)
 app.include_router(report_router)
+app.include_router(import_router)
+app.include_router(search_router)
+app.include_router(transaction_router)
+app.include_router(sync_router)
+app.include_router(category_router)
 
 
 @app.get("/")
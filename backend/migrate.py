@@ -0,0 +1,159 @@
+"""
+BudgetIQ – Versioned Schema Migrations
+Applies the numbered migrations in migrations/ (NNNN_name.py, each defining
+upgrade(op)) in order and records them in the schema_migrations table. Runs on
+SQLite and PostgreSQL. Every helper on `op` is idempotent, so databases built
+by create_all, patched by hand, or fully migrated all converge on one schema.
+
+The API runs pending migrations at startup, after create_all.
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Sequence
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Arbitrary constant; serializes concurrent runners (e.g. several workers) on PostgreSQL
+_PG_LOCK_KEY = 4_815_162_342
+
+_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", String(4), primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass
+class Migration:
+    version: str
+    name: str
+    upgrade: Callable[["MigrationOps"], None]
+
+
+class MigrationOps:
+    """Dialect-aware, idempotent schema operations handed to each migration."""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.is_sqlite = conn.dialect.name == "sqlite"
+
+    def _inspector(self):
+        # Re-inspect every time: earlier steps in the same migration change the schema
+        return inspect(self.conn)
+
+    def has_table(self, table: str) -> bool:
+        return self._inspector().has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return any(c["name"] == column for c in self._inspector().get_columns(table))
+
+    def execute(self, sql: str, **params):
+        return self.conn.execute(text(sql), params)
+
+    def create_table(self, table: Table):
+        """Create a table (e.g. Model.__table__) with its indexes if it doesn't exist."""
+        table.create(self.conn, checkfirst=True)
+
+    def add_column(self, table: str, column: str, ddl: str):
+        """ALTER TABLE ... ADD COLUMN unless present. `ddl` is the portable type/default clause."""
+        if not self.has_column(table, column):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    def create_index(self, name: str, table: str, columns: Sequence[str], unique: bool = False):
+        self.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+        )
+
+    def drop_index(self, name: str):
+        self.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Load every NNNN_name.py migration, ordered by version."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        spec = importlib.util.spec_from_file_location(f"migration_{match.group(1)}", os.path.join(directory, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations.append(Migration(match.group(1), match.group(2), module.upgrade))
+
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def _applied(conn: Connection) -> set:
+    return set(conn.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply pending migrations, each in its own transaction. Returns the versions applied."""
+    schema_migrations.create(engine, checkfirst=True)
+    applied_now = []
+    for migration in discover():
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+            if migration.version in _applied(conn):
+                continue
+            logger.info(f"Applying migration {migration.version}_{migration.name}")
+            migration.upgrade(MigrationOps(conn))
+            conn.execute(schema_migrations.insert().values(
+                version=migration.version, name=migration.name, applied_at=datetime.now(timezone.utc),
+            ))
+            applied_now.append(migration.version)
+    return applied_now
+
+
+def status(engine: Engine) -> List[tuple]:
+    """(version, name, applied) for every known migration."""
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        applied = _applied(conn)
+    return [(m.version, m.name, m.version in applied) for m in discover()]
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Apply BudgetIQ schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying")
+    args = parser.parse_args()
+
+    if args.status:
+        for version, name, applied in status(engine):
+            print(f"{version}  {'applied' if applied else 'pending'}  {name}")
+        return 0
+
+    applied = run_migrations(engine)
+    print(f"Applied {len(applied)} migration(s){': ' + ', '.join(applied) if applied else ''}.")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""Add 'category' to incomes (formerly alter_db.py / add_income_category.sql)."""
+
+
+def upgrade(op):
+    op.add_column("incomes", "category", "VARCHAR(100) NOT NULL DEFAULT 'Other'")
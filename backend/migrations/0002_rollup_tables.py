@@ -0,0 +1,10 @@
+"""
+Daily/monthly rollup tables. Existing databases must be backfilled once with
+`python rebuild_rollups.py`.
+"""
+from models import DailyRollup, MonthlyRollup
+
+
+def upgrade(op):
+    op.create_table(DailyRollup.__table__)
+    op.create_table(MonthlyRollup.__table__)
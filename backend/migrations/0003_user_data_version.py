@@ -0,0 +1,5 @@
+"""users.data_version: bumped on every data change; keys the response cache and ETags."""
+
+
+def upgrade(op):
+    op.add_column("users", "data_version", "INTEGER NOT NULL DEFAULT 0")
@@ -0,0 +1,6 @@
+"""(user_id, date, id) indexes backing newest-first keyset pagination."""
+
+
+def upgrade(op):
+    for table in ("incomes", "expenses"):
+        op.create_index(f"ix_{table}_user_date_id", table, ["user_id", "date", "id"])
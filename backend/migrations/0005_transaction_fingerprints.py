@@ -0,0 +1,10 @@
+"""
+Fingerprint columns used to detect duplicate CSV imports.
+Rows created before this migration have no fingerprint and are not matched.
+"""
+
+
+def upgrade(op):
+    for table in ("incomes", "expenses"):
+        op.add_column(table, "fingerprint", "VARCHAR(64)")
+        op.create_index(f"ix_{table}_user_fingerprint", table, ["user_id", "fingerprint"])
@@ -0,0 +1,10 @@
+"""
+Indexes backing filtered / sorted listings:
+category filter (+ date order) and amount range / amount order.
+"""
+
+
+def upgrade(op):
+    for table in ("incomes", "expenses"):
+        op.create_index(f"ix_{table}_user_category_date", table, ["user_id", "category", "date", "id"])
+        op.create_index(f"ix_{table}_user_amount_id", table, ["user_id", "amount", "id"])
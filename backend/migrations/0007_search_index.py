@@ -0,0 +1,6 @@
+"""Full-text search: FTS5 tables + triggers on SQLite, tsvector column + GIN index on PostgreSQL."""
+from search import ensure_search_index
+
+
+def upgrade(op):
+    ensure_search_index(op.conn)
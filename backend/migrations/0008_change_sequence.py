@@ -0,0 +1,9 @@
+"""Delta sync: per-row change sequence and tombstones for deleted rows."""
+from models import Tombstone
+
+
+def upgrade(op):
+    for table in ("incomes", "expenses", "notifications"):
+        op.add_column(table, "change_seq", "INTEGER NOT NULL DEFAULT 0")
+        op.create_index(f"ix_{table}_user_change_seq", table, ["user_id", "change_seq", "id"])
+    op.create_table(Tombstone.__table__)
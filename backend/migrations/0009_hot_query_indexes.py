@@ -0,0 +1,8 @@
+"""
+Notifications are always read newest first per user; (user_id, created_at, id)
+serves that order straight from the index instead of sorting every row.
+"""
+
+
+def upgrade(op):
+    op.create_index("ix_notifications_user_created", "notifications", ["user_id", "created_at", "id"])
@@ -0,0 +1,25 @@
+"""
+Normalize categories: per-user categories table, category_id on incomes and
+expenses (backfilled from the existing names) and an index for filtering on it.
+"""
+from models import Category
+
+
+def upgrade(op):
+    op.create_table(Category.__table__)
+    op.execute(
+        "INSERT INTO categories (user_id, name) "
+        "SELECT DISTINCT c.user_id, c.category FROM ("
+        "  SELECT user_id, category FROM incomes UNION SELECT user_id, category FROM expenses"
+        ") c WHERE NOT EXISTS ("
+        "  SELECT 1 FROM categories k WHERE k.user_id = c.user_id AND k.name = c.category"
+        ")"
+    )
+    for table in ("incomes", "expenses"):
+        op.add_column(table, "category_id", "INTEGER REFERENCES categories(id)")
+        op.execute(
+            f"UPDATE {table} SET category_id = ("
+            f"  SELECT k.id FROM categories k WHERE k.user_id = {table}.user_id AND k.name = {table}.category"
+            f") WHERE category_id IS NULL"
+        )
+        op.create_index(f"ix_{table}_user_category_id_date", table, ["user_id", "category_id", "date", "id"])
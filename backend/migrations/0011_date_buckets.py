@@ -0,0 +1,44 @@
+"""
+Integer date bucket keys (epoch_day, iso_week, year_month) on incomes, expenses
+and the rollup tables, backfilled from the stored dates, plus per-user indexes
+on the transaction tables. Timestamps are bucketed by their UTC date.
+"""
+
+
+def _bucket_sql(op, column: str) -> dict:
+    """Backfill expressions computing each bucket key from a date/datetime column."""
+    if op.is_sqlite:
+        # Thursday of the row's ISO week; its year and day-of-year give the ISO week
+        thursday = f"date({column}, '-3 days', 'weekday 4')"
+        return {
+            "epoch_day": f"CAST(julianday(date({column})) - 2440587.5 AS INTEGER)",
+            "iso_week": f"CAST(strftime('%Y', {thursday}) AS INTEGER) * 100 "
+                        f"+ (CAST(strftime('%j', {thursday}) AS INTEGER) - 1) / 7 + 1",
+            "year_month": f"CAST(strftime('%Y%m', {column}) AS INTEGER)",
+        }
+    return {
+        "epoch_day": f"CAST({column} AS DATE) - DATE '1970-01-01'",
+        "iso_week": f"CAST(to_char({column}, 'IYYYIW') AS INTEGER)",
+        "year_month": f"CAST(to_char({column}, 'YYYYMM') AS INTEGER)",
+    }
+
+
+def _backfill(op, table: str, date_column: str, columns):
+    for column in columns:
+        op.add_column(table, column, "INTEGER")
+    exprs = _bucket_sql(op, date_column)
+    assignments = ", ".join(f"{c} = {exprs[c]}" for c in columns)
+    op.execute(f"UPDATE {table} SET {assignments} WHERE {columns[0]} IS NULL")
+
+
+def upgrade(op):
+    if not op.is_sqlite:
+        # Bucket keys are UTC dates (rollups.rollup_day); casts and to_char() on
+        # timestamptz use the session time zone, so pin it for this transaction
+        op.execute("SET LOCAL TIME ZONE 'UTC'")
+    for table in ("incomes", "expenses"):
+        _backfill(op, table, "date", ("epoch_day", "iso_week", "year_month"))
+        for column in ("epoch_day", "iso_week", "year_month"):
+            op.create_index(f"ix_{table}_user_{column}", table, ["user_id", column])
+    _backfill(op, "daily_rollups", "day", ("epoch_day", "iso_week", "year_month"))
+    _backfill(op, "monthly_rollups", "month", ("year_month",))
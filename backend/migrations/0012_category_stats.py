@@ -0,0 +1,9 @@
+"""
+Per-user, per-category expense statistics for spending anomaly alerts. Existing
+databases should be backfilled once with `python rebuild_anomaly_stats.py`.
+"""
+from models import CategoryStats
+
+
+def upgrade(op):
+    op.create_table(CategoryStats.__table__)
@@ -0,0 +1,9 @@
+"""
+Precomputed insight cards per user, written by `python precompute_insights.py`
+and served by /api/ai/insights while they match the user's data version.
+"""
+from models import PrecomputedInsights
+
+
+def upgrade(op):
+    op.create_table(PrecomputedInsights.__table__)
@@ -0,0 +1,5 @@
+"""category_stats.stale: set by edits and deletes, cleared by `python rebuild_anomaly_stats.py --stale`."""
+
+
+def upgrade(op):
+    op.add_column("category_stats", "stale", "BOOLEAN NOT NULL DEFAULT FALSE")
@@ -0,0 +1,55 @@
+"""
+Finish the category normalization: category_id becomes NOT NULL on incomes and
+expenses (the name column stays as a denormalized display value), the rollup
+tables are re-keyed from the category name to category_id, and the name-based
+(user_id, category, date, id) indexes are dropped.
+
+SQLite can't add NOT NULL to an existing column; local databases created
+before this migration keep a nullable category_id, which the API always sets.
+"""
+from models import DailyRollup, MonthlyRollup
+
+_MISSING_CATEGORIES = (
+    "INSERT INTO categories (user_id, name) "
+    "SELECT DISTINCT c.user_id, c.category FROM {table} c WHERE {condition} AND NOT EXISTS ("
+    "  SELECT 1 FROM categories k WHERE k.user_id = c.user_id AND k.name = c.category"
+    ")"
+)
+
+_ROLLUP_COLUMNS = {
+    "daily_rollups": ("user_id", "day", "epoch_day", "iso_week", "year_month", "kind"),
+    "monthly_rollups": ("user_id", "month", "year_month", "kind"),
+}
+
+
+def _rekey_rollups(op, model):
+    table = model.__tablename__
+    if not op.has_column(table, "category"):
+        return
+    columns = _ROLLUP_COLUMNS[table]
+    op.execute(_MISSING_CATEGORIES.format(table=table, condition="1 = 1"))
+    op.execute(f"CREATE TABLE {table}_by_name AS SELECT * FROM {table}")
+    op.execute(f"DROP TABLE {table}")
+    op.create_table(model.__table__)
+    selected = ", ".join(f"r.{c}" for c in columns)
+    op.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}, category_id, total, count) "
+        f"SELECT {selected}, k.id, r.total, r.count FROM {table}_by_name r "
+        f"JOIN categories k ON k.user_id = r.user_id AND k.name = r.category"
+    )
+    op.execute(f"DROP TABLE {table}_by_name")
+
+
+def upgrade(op):
+    for table in ("incomes", "expenses"):
+        op.execute(_MISSING_CATEGORIES.format(table=table, condition="c.category_id IS NULL"))
+        op.execute(
+            f"UPDATE {table} SET category_id = ("
+            f"  SELECT k.id FROM categories k WHERE k.user_id = {table}.user_id AND k.name = {table}.category"
+            f") WHERE category_id IS NULL"
+        )
+        if not op.is_sqlite:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN category_id SET NOT NULL")
+        op.drop_index(f"ix_{table}_user_category_date")
+    _rekey_rollups(op, DailyRollup)
+    _rekey_rollups(op, MonthlyRollup)
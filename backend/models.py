@@ -1,7 +1,7 @@
 """
 BudgetIQ – SQLAlchemy Database Models
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -22,6 +22,7 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     is_verified = Column(Boolean, default=False)
     avatar_path = Column(String(500), nullable=True)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every data change
     created_at = Column(DateTime(timezone=True), default=_utcnow)
 
     # Relationships
@@ -38,12 +39,31 @@ class Income(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Float, nullable=False)
     source = Column(String(200), nullable=False)
-    category = Column(String(100), nullable=False, default="Other")
+    category = Column(String(100), nullable=False, default="Other")  # display name of category_id
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     date = Column(DateTime, nullable=False)
+    # Integer bucket keys of `date`, set at write time (see buckets.py)
+    epoch_day = Column(Integer, nullable=True)
+    iso_week = Column(Integer, nullable=True)
+    year_month = Column(Integer, nullable=True)
+    fingerprint = Column(String(64), nullable=True)  # duplicate detection for imports
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")  # user's data_version at last write
     created_at = Column(DateTime(timezone=True), default=_utcnow)
 
     user = relationship("User", back_populates="incomes")
 
+    __table_args__ = (
+        # Keyset pagination: newest-first listing seeks on (date, id) within a user
+        Index("ix_incomes_user_date_id", "user_id", "date", "id"),
+        Index("ix_incomes_user_category_id_date", "user_id", "category_id", "date", "id"),
+        Index("ix_incomes_user_amount_id", "user_id", "amount", "id"),
+        Index("ix_incomes_user_fingerprint", "user_id", "fingerprint"),
+        Index("ix_incomes_user_change_seq", "user_id", "change_seq", "id"),
+        Index("ix_incomes_user_epoch_day", "user_id", "epoch_day"),
+        Index("ix_incomes_user_iso_week", "user_id", "iso_week"),
+        Index("ix_incomes_user_year_month", "user_id", "year_month"),
+    )
+
 
 class Expense(Base):
     """Expense entry model."""
@@ -52,13 +72,45 @@ class Expense(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Float, nullable=False)
-    category = Column(String(100), nullable=False)
+    category = Column(String(100), nullable=False)  # display name of category_id
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     description = Column(Text, nullable=True)
     date = Column(DateTime, nullable=False)
+    # Integer bucket keys of `date`, set at write time (see buckets.py)
+    epoch_day = Column(Integer, nullable=True)
+    iso_week = Column(Integer, nullable=True)
+    year_month = Column(Integer, nullable=True)
+    fingerprint = Column(String(64), nullable=True)  # duplicate detection for imports
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")  # user's data_version at last write
     created_at = Column(DateTime(timezone=True), default=_utcnow)
 
     user = relationship("User", back_populates="expenses")
 
+    __table_args__ = (
+        # Keyset pagination: newest-first listing seeks on (date, id) within a user
+        Index("ix_expenses_user_date_id", "user_id", "date", "id"),
+        Index("ix_expenses_user_category_id_date", "user_id", "category_id", "date", "id"),
+        Index("ix_expenses_user_amount_id", "user_id", "amount", "id"),
+        Index("ix_expenses_user_fingerprint", "user_id", "fingerprint"),
+        Index("ix_expenses_user_change_seq", "user_id", "change_seq", "id"),
+        Index("ix_expenses_user_epoch_day", "user_id", "epoch_day"),
+        Index("ix_expenses_user_iso_week", "user_id", "iso_week"),
+        Index("ix_expenses_user_year_month", "user_id", "year_month"),
+    )
+
+
+class Category(Base):
+    """Per-user category name with a compact integer id, referenced by incomes/expenses."""
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(100), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_categories_user_name"),
+    )
+
 
 class Notification(Base):
     """Notification model for alerts and reminders."""
@@ -69,6 +121,85 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     type = Column(String(50), default="info")  # info, warning, alert
     is_read = Column(Boolean, default=False)
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")  # user's data_version at last write
     created_at = Column(DateTime(timezone=True), default=_utcnow)
 
     user = relationship("User", back_populates="notifications")
+
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at", "id"),
+        Index("ix_notifications_user_change_seq", "user_id", "change_seq", "id"),
+    )
+
+
+class Tombstone(Base):
+    """Record of a deleted income/expense/notification, so delta sync can report deletions."""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)  # income, expense, notification
+    entity_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), default=_utcnow)
+
+    __table_args__ = (
+        Index("ix_tombstones_user_change_seq", "user_id", "change_seq", "id"),
+    )
+
+
+class DailyRollup(Base):
+    """Per-user income/expense totals by day and category, maintained on every write."""
+    __tablename__ = "daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    epoch_day = Column(Integer, nullable=True)  # bucket keys of `day` (see buckets.py)
+    iso_week = Column(Integer, nullable=True)
+    year_month = Column(Integer, nullable=True)
+    kind = Column(String(10), primary_key=True)  # income, expense
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class MonthlyRollup(Base):
+    """Per-user income/expense totals by month (first day of month) and category."""
+    __tablename__ = "monthly_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    year_month = Column(Integer, nullable=True)  # bucket key of `month` (see buckets.py)
+    kind = Column(String(10), primary_key=True)  # income, expense
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class CategoryStats(Base):
+    """
+    Per-user running statistics of expense amounts by category, updated on each
+    new expense (see anomalies.py): Welford count/mean/m2 plus streaming
+    estimates of the median and median absolute deviation.
+    """
+    __tablename__ = "category_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0)
+    m2 = Column(Float, nullable=False, default=0)  # sum of squared deviations from the mean
+    median = Column(Float, nullable=False, default=0)
+    mad = Column(Float, nullable=False, default=0)
+    stale = Column(Boolean, nullable=False, default=False, server_default="0")  # edited/deleted since last rebuild
+
+
+class PrecomputedInsights(Base):
+    """A user's insight cards as computed by the last precompute_insights.py run."""
+    __tablename__ = "precomputed_insights"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    data_version = Column(Integer, nullable=False)  # user's data_version the insights were computed from
+    as_of = Column(Date, nullable=False)            # UTC day they were computed for
+    insights = Column(Text, nullable=False)         # JSON list of {type, message}
+    computed_at = Column(DateTime(timezone=True), default=_utcnow)
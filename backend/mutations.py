@@ -0,0 +1,146 @@
+"""
+BudgetIQ – Batch Mutations
+Deletes, recategorizes or edits many incomes/expenses – by id list and/or
+filter – with one set-based DELETE/UPDATE per operation, all inside the
+caller's transaction.
+
+Rollups stay exact: before each statement the affected rows are summed per
+(category, day) in one grouped SELECT and retracted; since every change is a
+constant applied to all selected rows, the post-change groups follow from the
+same sums and are re-applied. Anomaly statistics of the expense categories an
+operation touches are flagged stale for rebuild_anomaly_stats.py --stale.
+
+Fingerprints are left untouched by edits: they identify the statement line a
+row was imported from, so re-importing that statement still skips it.
+"""
+from datetime import datetime, time
+from typing import List, Tuple
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+from models import Income, Expense, Category
+from schemas import BatchOperation
+from filters import filter_clauses
+from rollups import apply_rollups, date_buckets, rollup_day, INCOME, EXPENSE
+from buckets import epoch_day_to_date
+from cache import bump_data_version
+from sync import record_tombstones
+from categories import resolve_category_id
+from anomalies import mark_stale
+
+_MODELS = {INCOME: Income, EXPENSE: Expense}
+
+# Text column each kind may edit in an "update" operation
+_TEXT_FIELD = {INCOME: "source", EXPENSE: "description"}
+
+# BatchChanges fields that are optional in a request but may not be set to null
+_NOT_NULL_FIELDS = ("amount", "category", "date", "source")
+
+
+def _selection(db: Session, model, user_id: int, op: BatchOperation) -> list:
+    """WHERE clauses for an operation's rows; requires ids or at least one filter criterion."""
+    clauses = [model.user_id == user_id]
+    if op.ids:
+        clauses.append(model.id.in_(op.ids))
+    if op.filter:
+        f = op.filter
+        if f.date_from and f.date_to and f.date_from > f.date_to:
+            raise HTTPException(status_code=400, detail="filter.date_from must be on or before filter.date_to")
+        clauses.extend(filter_clauses(db, model, user_id, f.category, f.date_from, f.date_to, f.min_amount, f.max_amount))
+    if len(clauses) == 1:
+        raise HTTPException(status_code=400, detail=f"{op.op} needs 'ids' or a non-empty 'filter'")
+    return clauses
+
+
+def _changes(db: Session, user_id: int, op: BatchOperation) -> dict:
+    """Column values an operation sets (empty for delete)."""
+    if op.op == "delete":
+        return {}
+    if op.op == "recategorize":
+        if not op.category:
+            raise HTTPException(status_code=400, detail="recategorize needs 'category'")
+        return {"category": op.category, "category_id": resolve_category_id(db, user_id, op.category)}
+
+    values = op.changes.model_dump(exclude_unset=True) if op.changes else {}
+    other = _TEXT_FIELD[EXPENSE if op.kind == INCOME else INCOME]
+    if other in values:
+        raise HTTPException(status_code=400, detail=f"'{other}' cannot be set on {op.kind} entries")
+    for field in _NOT_NULL_FIELDS:
+        if field in values and values[field] is None:
+            raise HTTPException(status_code=400, detail=f"'{field}' cannot be empty")
+    if not values:
+        raise HTTPException(status_code=400, detail="update needs at least one field in 'changes'")
+    if "category" in values:
+        values["category_id"] = resolve_category_id(db, user_id, values["category"])
+    if "date" in values:
+        values.update(date_buckets(values["date"]))
+    return values
+
+
+def _groups(db: Session, model, clauses: list) -> List[Tuple[int, int, float, int]]:
+    """(category_id, epoch_day, total, count) of the selected rows."""
+    return db.execute(
+        select(model.category_id, model.epoch_day, func.sum(model.amount), func.count(model.id))
+        .where(*clauses)
+        .group_by(model.category_id, model.epoch_day)
+    ).all()
+
+
+def apply_operation(db: Session, user_id: int, op: BatchOperation, seq: int) -> int:
+    """
+    Run one operation set-based and keep rollups in step; changed rows and
+    tombstones are stamped with change sequence `seq`. Returns rows affected.
+    Does not commit.
+    """
+    model = _MODELS[op.kind]
+    clauses = _selection(db, model, user_id, op)
+    values = _changes(db, user_id, op)
+
+    groups = _groups(db, model, clauses)
+    if not groups:
+        return 0
+
+    if op.op == "delete":
+        record_tombstones(db, model, op.kind, clauses, seq)
+        result = db.execute(delete(model).where(*clauses).execution_options(synchronize_session=False))
+    else:
+        result = db.execute(update(model).where(*clauses).values(**values, change_seq=seq).execution_options(synchronize_session=False))
+
+    # Rollup entries take datetimes; midnight of the rolled-up day maps back to it
+    days = {epoch_day: datetime.combine(epoch_day_to_date(epoch_day), time.min) for _, epoch_day, _, _ in groups}
+    entries = [(category_id, days[epoch_day], -total, -count) for category_id, epoch_day, total, count in groups]
+    if op.op != "delete":
+        new_day = datetime.combine(rollup_day(values["date"]), time.min) if "date" in values else None
+        for category_id, epoch_day, total, count in groups:
+            entries.append((
+                values.get("category_id", category_id),
+                new_day or days[epoch_day],
+                values["amount"] * count if "amount" in values else total,
+                count,
+            ))
+    apply_rollups(db, user_id, op.kind, entries)
+    if op.kind == EXPENSE and (op.op == "delete" or "amount" in values or "category" in values):
+        category_ids = {category_id for category_id, _, _, _ in groups}
+        if "category_id" in values:
+            category_ids.add(values["category_id"])
+        mark_stale(db, user_id, db.execute(select(Category.name).where(Category.id.in_(category_ids))).scalars())
+    return result.rowcount
+
+
+def run_batch(db: Session, user_id: int, operations: List[BatchOperation]) -> dict:
+    """
+    Apply operations in order in one transaction; any error rolls back all of them.
+    The user's data version is bumped first, which also serializes concurrent
+    writers for this user on PostgreSQL (row lock on the users row).
+    """
+    try:
+        seq = bump_data_version(db, user_id)
+        results = [
+            {"op": op.op, "kind": op.kind, "affected": apply_operation(db, user_id, op, seq)}
+            for op in operations
+        ]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"results": results, "total_affected": sum(r["affected"] for r in results)}
@@ -0,0 +1,97 @@
+"""
+BudgetIQ – Keyset (Cursor) Pagination
+Pages through a user's rows in (sort key, id) order – newest first by default –
+by seeking past the last row seen instead of OFFSET, so page N costs the same
+as page 1 and pages stay stable while new rows are inserted. Cursors are opaque
+to clients and only valid for the sort they were issued under.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque, URL-safe cursor for a list of JSON-encodable sort-key values."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Inverse of encode_cursor(); raises 400 on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list):
+            raise ValueError("cursor must decode to a list")
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def sort_value(sort: str, raw):
+    """Sort-key value from its JSON cursor form; raises ValueError if it doesn't fit the key."""
+    if sort == "date":
+        return datetime.fromisoformat(raw)
+    if sort == "amount":
+        return float(raw)
+    if not isinstance(raw, str):
+        raise ValueError("category cursor value must be a string")
+    return raw
+
+
+def _decode_sort_cursor(cursor: str, sort: str, order: str) -> Tuple[object, int]:
+    """Cursor -> (last sort value, last id); rejects cursors issued for another sort."""
+    values = decode_cursor(cursor)
+    try:
+        if len(values) == 2 and (sort, order) == ("date", "desc"):
+            # Cursors issued before sortable listings: [date, id]
+            return sort_value(sort, values[0]), int(values[1])
+        cursor_sort, cursor_order, value, last_id = values
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise ValueError("cursor was issued for a different sort")
+        return sort_value(sort, value), int(last_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def paginate(
+    query: Query,
+    model,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    sort: str = "date",
+    order: str = "desc",
+) -> Tuple[List, Optional[str]]:
+    """
+    Return (rows, next_cursor) for `query` ordered on (`sort` column, id) in
+    `order` direction; id breaks ties so the order is total. With a cursor,
+    seeks past it using the matching (user_id, <sort>, id) index; `skip` is
+    only honoured for legacy offset paging when no cursor is given.
+    """
+    column = getattr(model, sort)
+    if cursor:
+        last_value, last_id = _decode_sort_cursor(cursor, sort, order)
+        key, bound = tuple_(column, model.id), tuple_(last_value, last_id)
+        query = query.filter(key < bound if order == "desc" else key > bound)
+    if order == "desc":
+        query = query.order_by(column.desc(), model.id.desc())
+    else:
+        query = query.order_by(column.asc(), model.id.asc())
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    value = getattr(last, sort)
+    return rows, encode_cursor([sort, order, value.isoformat() if sort == "date" else value, last.id])
@@ -0,0 +1,160 @@
+"""
+BudgetIQ – Batch Insight Precomputation CLI
+Computes the AI insight cards of every active user ahead of time and stores
+them in precomputed_insights. /api/ai/insights serves a stored row while it
+matches the user's data version and the current day; any write since the run
+makes that user fall back to on-demand computation.
+
+Users are processed in id-range chunks across a process pool. Per chunk, one
+grouped rollup query returns the aggregates of all its users; they become NumPy
+arrays indexed by user and the insight rules are evaluated over them at once
+(ai_engine.evaluate_insights). Active users are those with rollup rows in the
+insight window (the previous month onwards); the rest are computed on demand.
+
+Usage:
+    python precompute_insights.py                  # every active user
+    python precompute_insights.py --user 42        # only one user
+    python precompute_insights.py --workers 4 --chunk-size 1000
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+from dotenv import load_dotenv
+load_dotenv()
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from database import SessionLocal, IS_SQLITE, engine, Base
+from models import User, PrecomputedInsights
+from aggregates import get_window_totals_for_users, MONEY_PLACES
+from ai_engine import InsightInputs, SnapshotWindow, evaluate_insights, snapshot_window
+from rollups import INCOME
+from rebuild_rollups import _user_chunks
+
+
+def _round(values: np.ndarray) -> np.ndarray:
+    # Python's round(), as FinancialSnapshot uses, so batch and live figures match
+    return np.array([round(v, MONEY_PLACES) for v in values.tolist()], dtype=float)
+
+
+def batch_inputs(rows: list, user_ids: List[int], window: SnapshotWindow) -> InsightInputs:
+    """
+    InsightInputs for `user_ids` (sorted) from get_window_totals_for_users()
+    rows: the same figures load_snapshot() derives, computed per user with
+    bincount over the rows instead of one query and loop per user.
+    """
+    n = len(user_ids)
+    count = len(rows)
+    user = np.searchsorted(np.asarray(user_ids), np.fromiter((r.user_id for r in rows), np.int64, count))
+    expense = np.fromiter((r.kind != INCOME for r in rows), bool, count)
+    month = np.fromiter((r.year_month for r in rows), np.int64, count)
+    total = np.fromiter((r.total for r in rows), float, count)
+    recent_total = np.fromiter((r.recent_total for r in rows), float, count)
+    recent_count = np.fromiter((r.recent_count for r in rows), float, count)
+    today_count = np.fromiter((r.today_count for r in rows), float, count)
+
+    def per_user(mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+        return np.bincount(user[mask], weights=values[mask], minlength=n)
+
+    current_income = _round(per_user(~expense & (month == window.current_month), total))
+    current_expense = _round(per_user(expense & (month == window.current_month), total))
+    prev_expense = _round(per_user(expense & (month == window.prev_month), total))
+    today_expense_count = per_user(expense, today_count).astype(np.int64)
+
+    # Last-30-day expense total per (user, category); categories emptied by deletes are skipped
+    total_30d, top_amount, top_category = np.zeros(n), np.zeros(n), [None] * n
+    has_expenses = np.zeros(n, dtype=bool)
+    if expense.any():
+        # Category ids are unique across users, so each one is a (user, category) pair
+        category_ids = np.fromiter((r.category_id for r in rows), np.int64, count)[expense]
+        _, first_row, pair = np.unique(category_ids, return_index=True, return_inverse=True)
+        names = np.array([r.category for r in rows], dtype=object)[expense][first_row]
+        pair_count = np.bincount(pair, weights=recent_count[expense])
+        live = np.flatnonzero(pair_count > 0)
+        pair_total = _round(np.bincount(pair, weights=recent_total[expense]))[live]
+        pair_user, pair_name = user[expense][first_row][live], live
+
+        total_30d = np.bincount(pair_user, weights=pair_total, minlength=n)
+        has_expenses = np.bincount(pair_user, minlength=n) > 0
+        # Largest category per user: first pair of each user when sorted by (user, -total)
+        order = np.lexsort((-pair_total, pair_user))
+        top_users, first = np.unique(pair_user[order], return_index=True)
+        top_amount[top_users] = pair_total[order][first]
+        for u, name in zip(top_users.tolist(), pair_name[order][first].tolist()):
+            top_category[u] = names[name]
+
+    return InsightInputs(
+        current_income=current_income,
+        current_expense=current_expense,
+        prev_expense=prev_expense,
+        total_expense_30d=total_30d,
+        top_amount=top_amount,
+        top_category=top_category,
+        has_data=has_expenses | (current_income > 0),
+        today_expense_count=today_expense_count,
+    )
+
+
+def precompute_chunk(lo: int, hi: int) -> int:
+    """Replace the precomputed insights of users in [lo, hi); returns how many were stored."""
+    db = SessionLocal()
+    try:
+        window = snapshot_window()
+        # Versions are read before the aggregates: a write in between leaves the
+        # stored version behind the user's, so that user is served live instead.
+        versions = dict(db.execute(select(User.id, User.data_version).where(User.id >= lo, User.id < hi)).all())
+        rows = get_window_totals_for_users(db, lo, hi, window.since, window.recent_since, window.today)
+        user_ids = sorted({r.user_id for r in rows} & versions.keys())
+        rows = [r for r in rows if r.user_id in versions]
+
+        db.execute(delete(PrecomputedInsights).where(PrecomputedInsights.user_id >= lo, PrecomputedInsights.user_id < hi))
+        if user_ids:
+            insights = evaluate_insights(batch_inputs(rows, user_ids, window))
+            db.execute(insert(PrecomputedInsights), [
+                {
+                    "user_id": user_id,
+                    "data_version": versions[user_id] or 0,
+                    "as_of": window.today,
+                    "insights": json.dumps(cards),
+                }
+                for user_id, cards in zip(user_ids, insights)
+            ])
+        db.commit()
+        return len(user_ids)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _init_worker():
+    # Forked workers must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute BudgetIQ insight cards for active users.")
+    parser.add_argument("--user", type=int, default=None, help="Limit to a single user id")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Users per chunk")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: 1 on SQLite, one per CPU on PostgreSQL)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    workers = args.workers or (1 if IS_SQLITE else os.cpu_count() or 1)
+    chunks = _user_chunks(args.user, args.chunk_size)
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            stored = sum(pool.map(precompute_chunk, *zip(*chunks)))
+    else:
+        stored = sum(precompute_chunk(lo, hi) for lo, hi in chunks)
+
+    print(f"Precomputed insights for {stored} user(s) across {len(chunks)} chunk(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+BudgetIQ – Anomaly Statistics Backfill CLI
+Recomputes category_stats (see anomalies.py) exactly from every user's
+expenses: one read per chunk of users, statistics for all of the chunk's
+(user, category) pairs computed at once with NumPy, one transaction per chunk.
+With --stale, only the statistics that edits and deletes flagged stale are
+recomputed; run it periodically (e.g. from cron).
+
+Usage:
+    python rebuild_anomaly_stats.py                  # every user
+    python rebuild_anomaly_stats.py --stale          # only statistics flagged stale
+    python rebuild_anomaly_stats.py --user 42        # only one user
+    python rebuild_anomaly_stats.py --chunk-size 500
+"""
+import argparse
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import delete, insert, select
+from database import SessionLocal, engine, Base
+from models import Expense, CategoryStats
+from anomalies import compute_category_stats
+from rebuild_rollups import _user_chunks
+
+
+def rebuild_chunk(lo: int, hi: int) -> int:
+    """Replace the statistics of users in [lo, hi) with ones computed from their expenses."""
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(Expense.user_id, Expense.category, Expense.amount)
+            .where(Expense.user_id >= lo, Expense.user_id < hi)
+        ).all()
+        stats = compute_category_stats(*zip(*rows)) if rows else []
+        db.execute(delete(CategoryStats).where(CategoryStats.user_id >= lo, CategoryStats.user_id < hi))
+        if stats:
+            db.execute(insert(CategoryStats), stats)
+        db.commit()
+        return len(stats)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def rebuild_stale_chunk(lo: int, hi: int) -> int:
+    """
+    Recompute the stale statistics of users in [lo, hi) in place. The rows stay
+    locked until commit, so expenses added meanwhile are folded in afterwards.
+    """
+    db = SessionLocal()
+    try:
+        stale = db.execute(
+            select(CategoryStats)
+            .where(CategoryStats.user_id >= lo, CategoryStats.user_id < hi, CategoryStats.stale.is_(True))
+            .with_for_update()
+        ).scalars().all()
+        if not stale:
+            return 0
+        rows = db.execute(
+            select(Expense.user_id, Expense.category, Expense.amount)
+            .join(CategoryStats, (CategoryStats.user_id == Expense.user_id) & (CategoryStats.category == Expense.category))
+            .where(Expense.user_id >= lo, Expense.user_id < hi, CategoryStats.stale.is_(True))
+        ).all()
+        fresh = {(s["user_id"], s["category"]): s for s in (compute_category_stats(*zip(*rows)) if rows else [])}
+        for stats in stale:
+            values = fresh.get((stats.user_id, stats.category))
+            if values is None:
+                db.delete(stats)
+                continue
+            for field in ("count", "mean", "m2", "median", "mad"):
+                setattr(stats, field, values[field])
+            stats.stale = False
+        db.commit()
+        return len(stale)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild BudgetIQ spending anomaly statistics.")
+    parser.add_argument("--user", type=int, default=None, help="Limit to a single user id")
+    parser.add_argument("--stale", action="store_true", help="Only recompute statistics flagged stale")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users per chunk")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    chunks = _user_chunks(args.user, args.chunk_size)
+    rebuild = rebuild_stale_chunk if args.stale else rebuild_chunk
+    total = sum(rebuild(lo, hi) for lo, hi in chunks)
+    print(f"Rebuilt {total} category statistics row(s) across {len(chunks)} chunk(s).")
+
+
+if __name__ == "__main__":
+    main()
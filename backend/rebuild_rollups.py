@@ -0,0 +1,160 @@
+"""
+BudgetIQ – Rollup Rebuild / Verify CLI
+Recomputes the daily/monthly rollup tables from the raw incomes and expenses.
+Users are processed in id-range chunks, in parallel, one transaction per chunk.
+
+Usage:
+    python rebuild_rollups.py                  # rebuild every user's rollups
+    python rebuild_rollups.py --verify         # compare rollups with raw data, no writes
+    python rebuild_rollups.py --user 42        # only one user
+    python rebuild_rollups.py --workers 4 --chunk-size 500
+"""
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import func, select, delete, insert, literal
+from database import SessionLocal, IS_SQLITE, engine, Base
+from models import User, Income, Expense, DailyRollup, MonthlyRollup
+from rollups import INCOME, EXPENSE
+from buckets import epoch_day_date_sql, year_month_date_sql
+
+# Float tolerance when comparing rollup totals against raw sums
+TOLERANCE = 0.005
+
+
+def _raw_daily(model, kind, lo, hi):
+    """
+    Daily rollup rows computed straight from a raw transaction table, grouped
+    on its integer bucket columns (the day's date is derived once per group).
+    """
+    return select(
+        model.user_id,
+        epoch_day_date_sql(model.epoch_day).label("day"),
+        model.epoch_day,
+        model.iso_week,
+        model.year_month,
+        literal(kind).label("kind"),
+        model.category_id,
+        func.sum(model.amount).label("total"),
+        func.count(model.id).label("count"),
+    ).where(model.user_id >= lo, model.user_id < hi).group_by(
+        model.user_id, model.epoch_day, model.iso_week, model.year_month, model.category_id
+    )
+
+
+def _user_chunks(user_id, chunk_size):
+    """Half-open user id ranges [lo, hi) covering every user."""
+    if user_id is not None:
+        return [(user_id, user_id + 1)]
+    db = SessionLocal()
+    try:
+        lo, hi = db.query(func.min(User.id), func.max(User.id)).one()
+    finally:
+        db.close()
+    if lo is None:
+        return []
+    return [(start, min(start + chunk_size, hi + 1)) for start in range(lo, hi + 1, chunk_size)]
+
+
+def rebuild_chunk(lo: int, hi: int) -> int:
+    """Replace the rollups of users in [lo, hi) with freshly computed ones."""
+    db = SessionLocal()
+    try:
+        for model in (DailyRollup, MonthlyRollup):
+            db.execute(delete(model).where(model.user_id >= lo, model.user_id < hi))
+
+        cols = ["user_id", "day", "epoch_day", "iso_week", "year_month", "kind", "category_id", "total", "count"]
+        for model, kind in ((Income, INCOME), (Expense, EXPENSE)):
+            db.execute(insert(DailyRollup).from_select(cols, _raw_daily(model, kind, lo, hi)))
+
+        db.execute(insert(MonthlyRollup).from_select(
+            ["user_id", "month", "year_month", "kind", "category_id", "total", "count"],
+            select(
+                DailyRollup.user_id, year_month_date_sql(DailyRollup.year_month), DailyRollup.year_month,
+                DailyRollup.kind, DailyRollup.category_id,
+                func.sum(DailyRollup.total), func.sum(DailyRollup.count),
+            ).where(DailyRollup.user_id >= lo, DailyRollup.user_id < hi).group_by(
+                DailyRollup.user_id, DailyRollup.year_month, DailyRollup.kind, DailyRollup.category_id
+            ),
+        ))
+        db.commit()
+        return db.query(func.count()).select_from(DailyRollup).filter(
+            DailyRollup.user_id >= lo, DailyRollup.user_id < hi
+        ).scalar()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def verify_chunk(lo: int, hi: int) -> list:
+    """Return a list of human-readable mismatches for users in [lo, hi)."""
+    db = SessionLocal()
+    try:
+        expected = {}
+        for model, kind in ((Income, INCOME), (Expense, EXPENSE)):
+            for row in db.execute(_raw_daily(model, kind, lo, hi)):
+                expected[(row.user_id, str(row.day), row.kind, row.category_id)] = (float(row.total), int(row.count))
+
+        actual = {}
+        for row in db.execute(select(DailyRollup).where(DailyRollup.user_id >= lo, DailyRollup.user_id < hi)):
+            r = row[0]
+            if r.count:
+                actual[(r.user_id, str(r.day), r.kind, r.category_id)] = (float(r.total), int(r.count))
+
+        month_expected = {}
+        for (uid, day, kind, category_id), (total, count) in expected.items():
+            key = (uid, day[:7] + "-01", kind, category_id)
+            prev = month_expected.get(key, (0.0, 0))
+            month_expected[key] = (prev[0] + total, prev[1] + count)
+
+        month_actual = {}
+        for row in db.execute(select(MonthlyRollup).where(MonthlyRollup.user_id >= lo, MonthlyRollup.user_id < hi)):
+            r = row[0]
+            if r.count:
+                month_actual[(r.user_id, str(r.month), r.kind, r.category_id)] = (float(r.total), int(r.count))
+    finally:
+        db.close()
+
+    problems = []
+    for table, want, got in (("daily", expected, actual), ("monthly", month_expected, month_actual)):
+        for key in sorted(set(want) | set(got), key=str):
+            w, g = want.get(key, (0.0, 0)), got.get(key, (0.0, 0))
+            if w[1] != g[1] or abs(w[0] - g[0]) > TOLERANCE:
+                problems.append(f"{table} user={key[0]} bucket={key[1]} {key[2]}/category {key[3]}: expected {w}, found {g}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify BudgetIQ rollup tables.")
+    parser.add_argument("--verify", action="store_true", help="Only compare rollups with raw data")
+    parser.add_argument("--user", type=int, default=None, help="Limit to a single user id")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users per chunk")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel chunks (default: 1 on SQLite, 4 on PostgreSQL)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    workers = args.workers or (1 if IS_SQLITE and not args.verify else 4)
+    chunks = _user_chunks(args.user, args.chunk_size)
+    job = verify_chunk if args.verify else rebuild_chunk
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda c: job(*c), chunks))
+
+    if args.verify:
+        problems = [p for chunk in results for p in chunk]
+        for p in problems:
+            print(p)
+        print(f"Verified {len(chunks)} chunk(s): {len(problems)} mismatch(es).")
+        sys.exit(1 if problems else 0)
+
+    print(f"Rebuilt {sum(results)} daily rollup row(s) across {len(chunks)} chunk(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+BudgetIQ – Incremental Rollup Maintenance
+Keeps the daily/monthly rollup tables in step with the raw incomes and expenses.
+Write routes call apply_rollup() inside the same transaction as the row change,
+so dashboard and AI aggregates can read O(buckets) rollup rows instead of
+re-scanning every transaction. Rollups are keyed by the integer category_id;
+readers join the categories table for display names.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from database import IS_SQLITE
+from models import DailyRollup, MonthlyRollup
+from buckets import day_buckets
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert as _dialect_insert
+else:
+    from sqlalchemy.dialects.postgresql import insert as _dialect_insert
+
+INCOME = "income"
+EXPENSE = "expense"
+
+
+def rollup_day(dt: datetime) -> date:
+    """
+    Calendar day a transaction is rolled up under.
+    Matches how each backend buckets the stored value: SQLite keeps the naive
+    wall-clock fields, PostgreSQL stores timestamptz and buckets in UTC.
+    """
+    if IS_SQLITE or dt.tzinfo is None:
+        return dt.date()
+    return dt.astimezone(timezone.utc).date()
+
+
+def date_buckets(dt: datetime) -> Dict[str, int]:
+    """Integer bucket columns (epoch_day, iso_week, year_month) for a transaction date."""
+    return day_buckets(rollup_day(dt))
+
+
+def _upsert(db: Session, model, key_column: str, rows: list):
+    """Add total/count deltas to rollup rows, creating them when missing."""
+    if not rows:
+        return
+    stmt = _dialect_insert(model)
+    table = model.__table__
+    new_count = table.c.count + stmt.excluded.count
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", key_column, "kind", "category_id"],
+        set_={
+            # Snap the total to exactly zero once a bucket is emptied, so float
+            # drift from add/delete pairs never leaks into the dashboard.
+            "total": case((new_count == 0, 0.0), else_=table.c.total + stmt.excluded.total),
+            "count": new_count,
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def apply_rollups(db: Session, user_id: int, kind: str, entries: Iterable[Tuple[int, datetime, float, int]]):
+    """
+    Apply a batch of (category_id, date, amount, count) deltas to both rollup tables.
+    Use a negative amount and count to retract deleted rows. Does not commit.
+    """
+    daily = defaultdict(lambda: [0.0, 0])
+    for category_id, dt, amount, count in entries:
+        bucket = daily[(rollup_day(dt), category_id)]
+        bucket[0] += amount
+        bucket[1] += count
+
+    monthly = defaultdict(lambda: [0.0, 0])
+    for (day, category_id), (amount, count) in daily.items():
+        bucket = monthly[(day.replace(day=1), category_id)]
+        bucket[0] += amount
+        bucket[1] += count
+
+    _upsert(db, DailyRollup, "day", [
+        {"user_id": user_id, "day": day, **day_buckets(day), "kind": kind, "category_id": category_id, "total": amount, "count": count}
+        for (day, category_id), (amount, count) in daily.items()
+    ])
+    _upsert(db, MonthlyRollup, "month", [
+        {"user_id": user_id, "month": month, "year_month": day_buckets(month)["year_month"],
+         "kind": kind, "category_id": category_id, "total": amount, "count": count}
+        for (month, category_id), (amount, count) in monthly.items()
+    ])
+
+
+def apply_rollup(db: Session, user_id: int, kind: str, category_id: int, dt: datetime, amount: float, count: int = 1):
+    """Apply a single transaction's delta to the rollups. Does not commit."""
+    apply_rollups(db, user_id, kind, [(category_id, dt, amount, count)])
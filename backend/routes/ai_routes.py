@@ -1,31 +1,125 @@
 """
 BudgetIQ – AI Insights & Chatbot Routes
 """
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 from auth import get_current_user
-from schemas import AiInsight, ChatMessage, ChatResponse
-from ai_engine import generate_insights, chat_response
-from typing import List
+from schemas import AiInsight, ChatMessage, ChatResponse, ForecastResponse
+from ai_engine import get_user_insights, chat_response, chat_stream
+from forecast import get_forecast, DEFAULT_HORIZON_DAYS, MAX_HORIZON_DAYS
+from cache import response_cache
+from etags import etag_guard
+from typing import AsyncIterator, List
 
 router = APIRouter(prefix="/api/ai", tags=["AI Insights"])
+logger = logging.getLogger(__name__)
 
 
-@router.get("/insights", response_model=List[AiInsight])
+@router.get("/insights", response_model=List[AiInsight], dependencies=[Depends(etag_guard("ai.insights", daily=True))])
 def get_insights(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    """Get AI-generated insights based on user's real financial data."""
-    raw_insights = generate_insights(db, user.id)
-    return [AiInsight(**i) for i in raw_insights]
+    """
+    Get AI-generated insights based on user's real financial data: the batch
+    precomputed ones while still current, otherwise computed on demand.
+    """
+    user_id, version = user.id, user.data_version or 0
+    return response_cache.get_or_compute(
+        db, user, "ai.insights", None, lambda s: get_user_insights(s, user_id, version)
+    )
+
+
+@router.get("/forecast", response_model=ForecastResponse, dependencies=[Depends(etag_guard("ai.forecast", daily=True))])
+def get_spending_forecast(
+    horizon: int = Query(DEFAULT_HORIZON_DAYS, ge=1, le=MAX_HORIZON_DAYS, description="Days to forecast, starting tomorrow"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Per-category spending forecast and this month's projected total."""
+    return get_forecast(db, user.id, horizon)
 
 
 @router.post("/chat", response_model=ChatResponse)
-def chat(
+async def chat(
     msg: ChatMessage,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    """Chat with the AI assistant about your finances."""
-    reply = chat_response(db, user.id, msg.message)
+    """
+    Chat with the AI assistant about your finances.
+    The LLM call is awaited, so waiting on it holds no worker thread or DB connection.
+    """
+    user_id = user.id
+    # Release the auth session's pooled connection; the chat context uses its own.
+    db.close()
+    reply = await chat_response(user_id, msg.message)
     return ChatResponse(reply=reply)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _wait_for_disconnect(request: Request):
+    """Return once the client has gone away (the request body is already consumed)."""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _relay(request: Request, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Forward reply chunks as SSE events, racing each one against client
+    disconnect so an abandoned stream stops waiting on the LLM right away
+    rather than at its next write.
+    """
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        async with aclosing(chunks):
+            while True:
+                next_chunk = asyncio.ensure_future(chunks.__anext__())
+                await asyncio.wait({next_chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_chunk.done():
+                    next_chunk.cancel()
+                    await asyncio.gather(next_chunk, return_exceptions=True)
+                    logger.info("AI chat stream cancelled: client disconnected")
+                    return
+                try:
+                    text = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                yield _sse("token", {"text": text})
+        yield _sse("done", {})
+    except Exception as e:
+        logger.error(f"AI chat stream failed: {e}", exc_info=True)
+        yield _sse("error", {"detail": "The reply was interrupted. Please try again."})
+    finally:
+        disconnected.cancel()
+
+
+@router.post("/chat/stream")
+async def chat_stream_route(
+    msg: ChatMessage,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Chat with the AI assistant, streaming the reply as Server-Sent Events:
+    `token` events ({"text": ...}) as it is generated, then `done` (or `error`).
+    Disconnecting cancels the LLM request.
+    """
+    user_id = user.id
+    # Release the auth session's pooled connection; the chat context uses its own.
+    db.close()
+    return StreamingResponse(
+        _relay(request, chat_stream(user_id, msg.message)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
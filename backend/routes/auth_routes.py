@@ -11,6 +11,7 @@ from auth import hash_password, verify_password, create_access_token, create_ver
 from schemas import SignupRequest, LoginRequest, ForgotPasswordRequest, ResetPasswordRequest, TokenResponse, MessageResponse, UserResponse
 from config import BACKEND_URL, FRONTEND_URL
 from email_utils import send_verification_email, send_password_reset_email
+from cache import bump_data_version
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 logger = logging.getLogger(__name__)
@@ -76,6 +77,7 @@ def verify_email(request: Request, token: str, db: Session = Depends(get_db)):
             )
 
         user.is_verified = True
+        bump_data_version(db, user.id)
         db.commit()
 
         return RedirectResponse(
@@ -0,0 +1,20 @@
+"""
+BudgetIQ – Category Routes
+"""
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User
+from auth import get_current_user
+from schemas import CategoryResponse
+from etags import etag_guard
+from categories import list_categories
+
+router = APIRouter(prefix="/api/categories", tags=["Categories"])
+
+
+@router.get("", response_model=List[CategoryResponse], dependencies=[Depends(etag_guard("categories"))])
+def get_categories(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """All categories the user has used, alphabetically (read from the lookup table, not a DISTINCT scan)."""
+    return list_categories(db, user.id)
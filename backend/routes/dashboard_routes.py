@@ -1,121 +1,238 @@
 """
-BudgetIQ – Dashboard Routes (Summary & Chart Data)
+BudgetIQ – Dashboard Routes (Summary, Chart Data, Time Series & Bootstrap)
 """
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from datetime import datetime, timedelta, timezone
-from database import get_db
-from models import Income, Expense, User
+from datetime import date, datetime, timedelta, timezone
+from database import get_db, SessionLocal
+from models import User
 from auth import get_current_user
-from schemas import DashboardSummary, ChartDataPoint
-from typing import List
+from schemas import DashboardSummary, ChartDataPoint, TimeSeriesResponse, DashboardBootstrap, NotificationResponse
+from aggregates import (
+    get_totals, get_bucket_series, get_category_bucket_series, densify,
+    bucket_floor, bucket_starts, count_buckets, next_bucket, PRIOR_BUCKET,
+)
+from buckets import bucket_number
+from rollups import INCOME, EXPENSE
+from cache import response_cache
+from etags import etag_guard
+from ai_engine import get_user_insights
+from routes.notification_routes import list_notifications
+from typing import Callable, List, Optional
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
+logger = logging.getLogger(__name__)
 
+# Upper bound on buckets per time-series response (e.g. ~2.7 years of days)
+MAX_TIMESERIES_POINTS = 1000
+
+
+def _month_starts(now: datetime, count: int) -> List[datetime]:
+    """Starts of the last `count` calendar months, oldest first (current month last)."""
+    starts = []
+    year, month = now.year, now.month
+    for _ in range(count):
+        starts.append(now.replace(year=year, month=month, day=1, hour=0, minute=0, second=0, microsecond=0))
+        month -= 1
+        if month == 0:
+            month, year = 12, year - 1
+    return starts[::-1]
+
+
+def _week_starts(now: datetime, count: int) -> List[datetime]:
+    """Mondays of the last `count` weeks, oldest first (current week last)."""
+    this_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return [this_week - timedelta(weeks=i) for i in range(count - 1, -1, -1)]
 
-@router.get("/summary", response_model=DashboardSummary)
-def get_summary(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    """Get total income, total expenses, and current balance."""
-    total_income = db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
-        Income.user_id == user.id
-    ).scalar()
-    total_expense = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-        Expense.user_id == user.id
-    ).scalar()
-    income_count = db.query(func.count(Income.id)).filter(Income.user_id == user.id).scalar()
-    expense_count = db.query(func.count(Expense.id)).filter(Expense.user_id == user.id).scalar()
+
+def compute_summary(db: Session, user_id: int) -> DashboardSummary:
+    """Total income, total expenses, and current balance for a user."""
+    totals = get_totals(db, user_id)
 
     return DashboardSummary(
-        total_income=float(total_income),
-        total_expense=float(total_expense),
-        current_balance=float(total_income) - float(total_expense),
-        income_count=income_count,
-        expense_count=expense_count
+        total_income=totals["total_income"],
+        total_expense=totals["total_expense"],
+        current_balance=totals["total_income"] - totals["total_expense"],
+        income_count=totals["income_count"],
+        expense_count=totals["expense_count"]
     )
 
 
-@router.get("/chart-data", response_model=List[ChartDataPoint])
+def compute_chart_data(db: Session, user_id: int, period: str) -> List[ChartDataPoint]:
+    """Income vs expense per bucket for the last 6 months or 8 weeks."""
+    now = datetime.now(timezone.utc)
+
+    if period == "monthly":
+        # Last 6 calendar months
+        granularity = "month"
+        bucket_starts = _month_starts(now, 6)
+        last = bucket_starts[-1]
+        window_end = last.replace(year=last.year + 1, month=1) if last.month == 12 else last.replace(month=last.month + 1)
+    else:
+        # Last 8 weeks
+        granularity = "week"
+        bucket_starts = _week_starts(now, 8)
+        window_end = bucket_starts[-1] + timedelta(days=7)
+    series = get_bucket_series(db, user_id, granularity, bucket_starts[0], window_end)
+
+    data_points = []
+    for point in densify(series, bucket_starts, granularity):
+        if period == "monthly":
+            label = point["start"].strftime("%b %Y")
+        else:
+            label = f"Week {point['start'].strftime('%d/%m')}"
+        data_points.append(ChartDataPoint(
+            label=label, income=point["income"], expense=point["expense"], net_worth=point["net_worth"]
+        ))
+
+    return data_points
+
+
+@router.get("/summary", response_model=DashboardSummary, dependencies=[Depends(etag_guard("dashboard.summary"))])
+def get_summary(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """Get total income, total expenses, and current balance."""
+    user_id = user.id
+    return response_cache.get_or_compute(
+        db, user, "dashboard.summary", None, lambda s: compute_summary(s, user_id)
+    )
+
+
+@router.get("/chart-data", response_model=List[ChartDataPoint],
+            dependencies=[Depends(etag_guard("dashboard.chart-data", daily=True))])
 def get_chart_data(
     period: str = Query("monthly", regex="^(weekly|monthly)$"),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """Get time-series income vs expense data for charts."""
-    now = datetime.now(timezone.utc)
-    data_points = []
+    user_id = user.id
+    return response_cache.get_or_compute(
+        db, user, "dashboard.chart-data", {"period": period},
+        lambda s: compute_chart_data(s, user_id, period)
+    )
 
-    if period == "monthly":
-        # Calculate balance BEFORE the 6-month window to start the running total
-        start_of_window = (now.replace(day=1) - timedelta(days=5 * 30)).replace(day=1)
-        prior_income = db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
-            Income.user_id == user.id, Income.date < start_of_window
-        ).scalar()
-        prior_expense = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-            Expense.user_id == user.id, Expense.date < start_of_window
-        ).scalar()
-        running_net_worth = float(prior_income) - float(prior_expense)
-
-        # Last 6 months
-        for i in range(5, -1, -1):
-            month_start = (now.replace(day=1) - timedelta(days=i * 30)).replace(day=1)
-            if month_start.month == 12:
-                month_end = month_start.replace(year=month_start.year + 1, month=1, day=1)
-            else:
-                month_end = month_start.replace(month=month_start.month + 1, day=1)
-
-            income = db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
-                Income.user_id == user.id,
-                Income.date >= month_start,
-                Income.date < month_end
-            ).scalar()
-
-            expense = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-                Expense.user_id == user.id,
-                Expense.date >= month_start,
-                Expense.date < month_end
-            ).scalar()
-
-            running_net_worth += (float(income) - float(expense))
-            label = month_start.strftime("%b %Y")
-            data_points.append(ChartDataPoint(
-                label=label, income=float(income), expense=float(expense), net_worth=running_net_worth
-            ))
-    else:
-        # Calculate balance BEFORE the 8-week window
-        start_of_window = now - timedelta(weeks=7, days=now.weekday())
-        start_of_window = start_of_window.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        prior_income = db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
-            Income.user_id == user.id, Income.date < start_of_window
-        ).scalar()
-        prior_expense = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-            Expense.user_id == user.id, Expense.date < start_of_window
-        ).scalar()
-        running_net_worth = float(prior_income) - float(prior_expense)
 
-        # Last 8 weeks
-        for i in range(7, -1, -1):
-            week_start = now - timedelta(weeks=i, days=now.weekday())
-            week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-            week_end = week_start + timedelta(days=7)
-
-            income = db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
-                Income.user_id == user.id,
-                Income.date >= week_start,
-                Income.date < week_end
-            ).scalar()
-
-            expense = db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(
-                Expense.user_id == user.id,
-                Expense.date >= week_start,
-                Expense.date < week_end
-            ).scalar()
-
-            running_net_worth += (float(income) - float(expense))
-            label = f"Week {week_start.strftime('%d/%m')}"
-            data_points.append(ChartDataPoint(
-                label=label, income=float(income), expense=float(expense), net_worth=running_net_worth
-            ))
+def compute_timeseries(db: Session, user_id: int, start: date, end: date, granularity: str, split: bool) -> dict:
+    """
+    Densified income/expense series over whole buckets covering [start, end].
+    One grouped query regardless of range; `split` adds per-category amounts.
+    """
+    starts = bucket_starts(start, end, granularity)
+    window_end = next_bucket(starts[-1], granularity)
+
+    if not split:
+        points = densify(get_bucket_series(db, user_id, granularity, starts[0], window_end), starts, granularity)
+        return {"granularity": granularity, "start": starts[0], "end": window_end - timedelta(days=1), "points": points}
+
+    series = get_category_bucket_series(db, user_id, granularity, starts[0], window_end)
+    prior = series.get(PRIOR_BUCKET)
+    running = round(sum(prior[INCOME].values()) - sum(prior[EXPENSE].values()), 2) if prior else 0.0
+    points = []
+    for bucket_start in starts:
+        bucket = series.get(bucket_number(bucket_start, granularity), {INCOME: {}, EXPENSE: {}})
+        income = round(sum(bucket[INCOME].values()), 2)
+        expense = round(sum(bucket[EXPENSE].values()), 2)
+        running = round(running + income - expense, 2)
+        points.append({
+            "start": bucket_start,
+            "income": income,
+            "expense": expense,
+            "net_worth": running,
+            "income_by_category": bucket[INCOME],
+            "expense_by_category": bucket[EXPENSE],
+        })
+    return {"granularity": granularity, "start": starts[0], "end": window_end - timedelta(days=1), "points": points}
+
+
+@router.get("/timeseries", response_model=TimeSeriesResponse,
+            dependencies=[Depends(etag_guard("dashboard.timeseries", daily=True))])
+def get_timeseries(
+    start: Optional[date] = Query(None, description="First day of the range (default: one year before end)"),
+    end: Optional[date] = Query(None, description="Last day of the range (default: today)"),
+    granularity: str = Query("month", regex="^(day|week|month|quarter|year)$"),
+    split: Optional[str] = Query(None, regex="^category$"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Income vs expense over an arbitrary date range and granularity.
+    The range is widened to whole buckets and empty buckets are filled in.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=364)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    buckets = count_buckets(start, end, granularity)
+    if buckets > MAX_TIMESERIES_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans {buckets} {granularity} buckets (max {MAX_TIMESERIES_POINTS}). "
+                   f"Use a coarser granularity or a shorter range."
+        )
+    try:
+        # The series is reported up to the end of the last bucket, which must be a valid date
+        next_bucket(bucket_floor(end, granularity), granularity)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail=f"end is too late: its {granularity} bucket ends after {date.max}")
+
+    user_id = user.id
+    split_by_category = split == "category"
+    return response_cache.get_or_compute(
+        db, user, "dashboard.timeseries",
+        {"start": start, "end": end, "granularity": granularity, "split": split_by_category},
+        lambda s: compute_timeseries(s, user_id, start, end, granularity, split_by_category)
+    )
 
-    return data_points
+
+def _run_section(name: str, user_id: int, compute: Callable[[Session], object]):
+    """Run one bootstrap section on its own session; returns (name, value, error)."""
+    db = SessionLocal()
+    try:
+        return name, compute(db), None
+    except Exception as e:
+        logger.error(f"Bootstrap section '{name}' failed for user {user_id}: {e}", exc_info=True)
+        return name, None, f"Failed to load {name.replace('_', ' ')}"
+    finally:
+        db.close()
+
+
+@router.get("/bootstrap", response_model=DashboardBootstrap,
+            dependencies=[Depends(etag_guard("dashboard.bootstrap", daily=True))])
+async def get_bootstrap(
+    period: str = Query("monthly", regex="^(weekly|monthly)$"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Summary, chart data, AI insights and latest notifications in one response.
+    Authenticates once, then computes the sections concurrently; a failing
+    section comes back null with a message in `errors` instead of failing the request.
+    """
+    user_id, version = user.id, user.data_version or 0
+    # Release the auth session's pooled connection; each section checks out its own.
+    db.close()
+
+    sections = {
+        "summary": lambda s: response_cache.get_or_compute(
+            s, user, "dashboard.summary", None, lambda c: compute_summary(c, user_id)),
+        "chart_data": lambda s: response_cache.get_or_compute(
+            s, user, "dashboard.chart-data", {"period": period}, lambda c: compute_chart_data(c, user_id, period)),
+        "insights": lambda s: response_cache.get_or_compute(
+            s, user, "ai.insights", None, lambda c: get_user_insights(c, user_id, version)),
+        "notifications": lambda s: [
+            NotificationResponse.model_validate(n) for n in list_notifications(s, user_id)
+        ],
+    }
+    results = await asyncio.gather(*(
+        run_in_threadpool(_run_section, name, user_id, compute) for name, compute in sections.items()
+    ))
+
+    payload = {"errors": {}}
+    for name, value, error in results:
+        payload[name] = value
+        if error:
+            payload["errors"][name] = error
+    return payload
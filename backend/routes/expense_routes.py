@@ -1,50 +1,99 @@
 """
 BudgetIQ – Expense Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models import Expense, User
 from auth import get_current_user
-from schemas import ExpenseCreate, ExpenseResponse
+from schemas import ExpenseCreate, ExpenseResponse, BulkRequest, BulkInsertResult
+from rollups import apply_rollup, apply_rollups, date_buckets, EXPENSE
+from cache import bump_data_version
+from sync import record_tombstones
+from categories import resolve_category_id, with_category_ids
+from etags import etag_guard
+from anomalies import observe_expense, fold_expenses, mark_stale
+from pagination import paginate, NEXT_CURSOR_HEADER
+from filters import TransactionQuery
+from bulk import validate_items, insert_rows, assign_fingerprints, manual_fingerprint
 
 router = APIRouter(prefix="/api/expenses", tags=["Expenses"])
 
 
-@router.get("", response_model=List[ExpenseResponse])
+@router.get("", response_model=List[ExpenseResponse], dependencies=[Depends(etag_guard("expenses"))])
 def get_expenses(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Legacy offset paging; prefer cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    filters: TransactionQuery = Depends(),
     db: Session = Depends(get_db), 
     user: User = Depends(get_current_user)
 ):
-    """Get all expense entries for the authenticated user."""
-    return db.query(Expense).filter(Expense.user_id == user.id).order_by(Expense.date.desc()).offset(skip).limit(limit).all()
+    """Get expense entries for the authenticated user, filtered and sorted in SQL (newest first by default), one page at a time."""
+    query = filters.apply(db, db.query(Expense).filter(Expense.user_id == user.id), Expense, user.id)
+    rows, next_cursor = paginate(query, Expense, limit, cursor, skip, filters.sort, filters.order)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
 
 
 @router.post("", response_model=ExpenseResponse)
 def add_expense(req: ExpenseCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    """Add a new expense entry."""
+    """Add a new expense entry, raising an alert notification if it is unusually large for its category."""
     expense = Expense(
         user_id=user.id,
         amount=req.amount,
         category=req.category,
+        category_id=resolve_category_id(db, user.id, req.category),
         description=req.description,
-        date=req.date
+        date=req.date,
+        **date_buckets(req.date),
     )
+    expense.change_seq = bump_data_version(db, user.id)
+    expense.fingerprint = manual_fingerprint(db, Expense, user.id, EXPENSE, req.date, req.amount, req.description)
     db.add(expense)
+    apply_rollup(db, user.id, EXPENSE, expense.category_id, expense.date, expense.amount)
+    observe_expense(db, user.id, expense.category, expense.amount, expense.change_seq)
     db.commit()
     db.refresh(expense)
     return expense
 
 
+@router.post("/bulk", response_model=BulkInsertResult)
+def add_expenses_bulk(req: BulkRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """
+    Add many expense entries in one transaction.
+    Invalid items are skipped and reported by index; valid ones are inserted together.
+    """
+    items, errors = validate_items(req.items, ExpenseCreate)
+    rows = [{"user_id": user.id, "amount": item.amount, "category": item.category, "description": item.description, "date": item.date}
+            for item in items]
+    if rows:
+        with_category_ids(db, user.id, rows)
+        seq = bump_data_version(db, user.id)
+        assign_fingerprints(db, Expense, user.id, EXPENSE, rows, "description")
+        for r in rows:
+            r.update(date_buckets(r["date"]), change_seq=seq)
+    ids = insert_rows(db, Expense, rows)
+    if ids:
+        apply_rollups(db, user.id, EXPENSE, [(r["category_id"], r["date"], r["amount"], 1) for r in rows])
+        fold_expenses(db, user.id, [(r["category"], r["amount"]) for r in rows])
+    db.commit()
+    return {"inserted": len(ids), "ids": ids, "errors": errors}
+
+
 @router.delete("/{expense_id}")
 def delete_expense(expense_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     """Delete an expense entry by ID."""
     expense = db.query(Expense).filter(Expense.id == expense_id, Expense.user_id == user.id).first()
     if not expense:
         raise HTTPException(status_code=404, detail="Expense entry not found")
+    apply_rollup(db, user.id, EXPENSE, expense.category_id, expense.date, -expense.amount, -1)
+    seq = bump_data_version(db, user.id)
+    record_tombstones(db, Expense, EXPENSE, [Expense.id == expense.id], seq)
+    mark_stale(db, user.id, [expense.category])
     db.delete(expense)
     db.commit()
     return {"message": "Expense entry deleted successfully"}
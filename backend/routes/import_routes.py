@@ -0,0 +1,72 @@
+"""
+BudgetIQ – Bank Statement Import Routes
+"""
+import io
+import json
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from database import get_db, SessionLocal
+from models import User
+from auth import get_current_user
+from schemas import CsvColumnMapping
+from csv_import import run_import
+
+router = APIRouter(prefix="/api/import", tags=["Import"])
+logger = logging.getLogger(__name__)
+
+
+@router.post("/csv")
+def import_csv(
+    file: UploadFile = File(...),
+    date_column: str = Form("Date"),
+    amount_column: Optional[str] = Form("Amount"),
+    debit_column: Optional[str] = Form(None),
+    credit_column: Optional[str] = Form(None),
+    description_column: Optional[str] = Form("Description"),
+    category_column: Optional[str] = Form(None),
+    default_category: str = Form("Uncategorized"),
+    date_format: Optional[str] = Form(None),
+    delimiter: str = Form(","),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Import a bank-statement CSV as incomes and expenses.
+    Streams newline-delimited JSON events: per-line errors, progress after each
+    committed chunk, and a final summary. Rows already imported are skipped.
+    """
+    if file.filename and not file.filename.lower().endswith((".csv", ".txt")):
+        raise HTTPException(status_code=400, detail="Only .csv files can be imported")
+    try:
+        mapping = CsvColumnMapping(
+            date_column=date_column, amount_column=amount_column or None,
+            debit_column=debit_column or None, credit_column=credit_column or None,
+            description_column=description_column or None, category_column=category_column or None,
+            default_category=default_category, date_format=date_format or None, delimiter=delimiter,
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user_id = user.id
+    # The import runs while the response streams; release the auth session now.
+    db.close()
+    # The upload is spooled to disk by the multipart parser; read it as a text stream.
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+
+    def events():
+        import_db = SessionLocal()
+        try:
+            for event in run_import(import_db, stream, user_id, mapping):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            import_db.rollback()
+            logger.error(f"CSV import failed for user {user_id}: {e}", exc_info=True)
+            yield json.dumps({"event": "failed", "message": "Import aborted by a server error"}) + "\n"
+        finally:
+            import_db.close()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
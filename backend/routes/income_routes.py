@@ -1,26 +1,41 @@
 """
 BudgetIQ – Income Routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models import Income, User
 from auth import get_current_user
-from schemas import IncomeCreate, IncomeResponse
+from schemas import IncomeCreate, IncomeResponse, BulkRequest, BulkInsertResult
+from rollups import apply_rollup, apply_rollups, date_buckets, INCOME
+from cache import bump_data_version
+from sync import record_tombstones
+from categories import resolve_category_id, with_category_ids
+from etags import etag_guard
+from pagination import paginate, NEXT_CURSOR_HEADER
+from filters import TransactionQuery
+from bulk import validate_items, insert_rows, assign_fingerprints, manual_fingerprint
 
 router = APIRouter(prefix="/api/income", tags=["Income"])
 
 
-@router.get("", response_model=List[IncomeResponse])
+@router.get("", response_model=List[IncomeResponse], dependencies=[Depends(etag_guard("income"))])
 def get_incomes(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Legacy offset paging; prefer cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    filters: TransactionQuery = Depends(),
     db: Session = Depends(get_db), 
     user: User = Depends(get_current_user)
 ):
-    """Get all income entries for the authenticated user."""
-    return db.query(Income).filter(Income.user_id == user.id).order_by(Income.date.desc()).offset(skip).limit(limit).all()
+    """Get income entries for the authenticated user, filtered and sorted in SQL (newest first by default), one page at a time."""
+    query = filters.apply(db, db.query(Income).filter(Income.user_id == user.id), Income, user.id)
+    rows, next_cursor = paginate(query, Income, limit, cursor, skip, filters.sort, filters.order)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
 
 
 @router.post("", response_model=IncomeResponse)
@@ -31,20 +46,50 @@ def add_income(req: IncomeCreate, db: Session = Depends(get_db), user: User = De
         amount=req.amount,
         source=req.source,
         category=req.category,
-        date=req.date
+        category_id=resolve_category_id(db, user.id, req.category),
+        date=req.date,
+        **date_buckets(req.date),
     )
+    income.change_seq = bump_data_version(db, user.id)
+    income.fingerprint = manual_fingerprint(db, Income, user.id, INCOME, req.date, req.amount, req.source)
     db.add(income)
+    apply_rollup(db, user.id, INCOME, income.category_id, income.date, income.amount)
     db.commit()
     db.refresh(income)
     return income
 
 
+@router.post("/bulk", response_model=BulkInsertResult)
+def add_incomes_bulk(req: BulkRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """
+    Add many income entries in one transaction.
+    Invalid items are skipped and reported by index; valid ones are inserted together.
+    """
+    items, errors = validate_items(req.items, IncomeCreate)
+    rows = [{"user_id": user.id, "amount": item.amount, "source": item.source, "category": item.category, "date": item.date}
+            for item in items]
+    if rows:
+        with_category_ids(db, user.id, rows)
+        seq = bump_data_version(db, user.id)
+        assign_fingerprints(db, Income, user.id, INCOME, rows, "source")
+        for r in rows:
+            r.update(date_buckets(r["date"]), change_seq=seq)
+    ids = insert_rows(db, Income, rows)
+    if ids:
+        apply_rollups(db, user.id, INCOME, [(r["category_id"], r["date"], r["amount"], 1) for r in rows])
+    db.commit()
+    return {"inserted": len(ids), "ids": ids, "errors": errors}
+
+
 @router.delete("/{income_id}")
 def delete_income(income_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     """Delete an income entry by ID."""
     income = db.query(Income).filter(Income.id == income_id, Income.user_id == user.id).first()
     if not income:
         raise HTTPException(status_code=404, detail="Income entry not found")
+    apply_rollup(db, user.id, INCOME, income.category_id, income.date, -income.amount, -1)
+    seq = bump_data_version(db, user.id)
+    record_tombstones(db, Income, INCOME, [Income.id == income.id], seq)
     db.delete(income)
     db.commit()
     return {"message": "Income entry deleted successfully"}
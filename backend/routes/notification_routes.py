@@ -8,16 +8,23 @@ from database import get_db
 from models import Notification, User
 from auth import get_current_user
 from schemas import NotificationResponse
+from cache import bump_data_version
+from etags import etag_guard
 
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
 
 
-@router.get("", response_model=List[NotificationResponse])
+def list_notifications(db: Session, user_id: int, limit: int = 50) -> List[Notification]:
+    """Latest notifications for a user, newest first."""
+    return db.query(Notification).filter(
+        Notification.user_id == user_id
+    ).order_by(Notification.created_at.desc()).limit(limit).all()
+
+
+@router.get("", response_model=List[NotificationResponse], dependencies=[Depends(etag_guard("notifications"))])
 def get_notifications(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     """Get all notifications for the authenticated user, newest first."""
-    return db.query(Notification).filter(
-        Notification.user_id == user.id
-    ).order_by(Notification.created_at.desc()).limit(50).all()
+    return list_notifications(db, user.id)
 
 
 @router.put("/{notif_id}/read")
@@ -29,6 +36,7 @@ def mark_read(notif_id: int, db: Session = Depends(get_db), user: User = Depends
     if not notif:
         raise HTTPException(status_code=404, detail="Notification not found")
     notif.is_read = True
+    notif.change_seq = bump_data_version(db, user.id)
     db.commit()
     return {"message": "Notification marked as read"}
 
@@ -36,8 +44,9 @@ def mark_read(notif_id: int, db: Session = Depends(get_db), user: User = Depends
 @router.put("/read-all")
 def mark_all_read(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     """Mark all notifications as read."""
+    seq = bump_data_version(db, user.id)
     db.query(Notification).filter(
         Notification.user_id == user.id, Notification.is_read == False
-    ).update({"is_read": True})
+    ).update({"is_read": True, "change_seq": seq})
     db.commit()
     return {"message": "All notifications marked as read"}
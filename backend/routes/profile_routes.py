@@ -10,6 +10,8 @@ from models import User
 from auth import get_current_user
 from schemas import UserResponse, ProfileUpdateRequest
 from config import UPLOAD_DIR, MAX_AVATAR_SIZE
+from cache import bump_data_version
+from etags import etag_guard
 
 router = APIRouter(prefix="/api/profile", tags=["Profile"])
 
@@ -17,7 +19,7 @@ router = APIRouter(prefix="/api/profile", tags=["Profile"])
 ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
 
 
-@router.get("", response_model=UserResponse)
+@router.get("", response_model=UserResponse, dependencies=[Depends(etag_guard("profile"))])
 def get_profile(user: User = Depends(get_current_user)):
     """Get the authenticated user's profile."""
     return user
@@ -38,6 +40,7 @@ def update_profile(
         if existing:
             raise HTTPException(status_code=400, detail="Email already in use")
         user.email = req.email
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(user)
     return user
@@ -83,6 +86,7 @@ async def upload_avatar(
         f.write(content)
 
     user.avatar_path = filename
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(user)
     return user
@@ -35,6 +35,18 @@ def get_date_range(period: str):
     return start, now
 
 
+def get_period_entries(db: Session, user_id: int, start: datetime, end: datetime):
+    """(incomes, expenses) dated within [start, end], oldest first."""
+    incomes = db.query(Income).filter(
+        Income.user_id == user_id, Income.date >= start, Income.date <= end
+    ).order_by(Income.date).all()
+
+    expenses = db.query(Expense).filter(
+        Expense.user_id == user_id, Expense.date >= start, Expense.date <= end
+    ).order_by(Expense.date).all()
+    return incomes, expenses
+
+
 @router.get("/pdf")
 def export_pdf(
     period: str = Query("monthly", regex="^(weekly|monthly)$"),
@@ -45,13 +57,7 @@ def export_pdf(
     start, end = get_date_range(period)
 
     # Fetch data
-    incomes = db.query(Income).filter(
-        Income.user_id == user.id, Income.date >= start, Income.date <= end
-    ).order_by(Income.date).all()
-
-    expenses = db.query(Expense).filter(
-        Expense.user_id == user.id, Expense.date >= start, Expense.date <= end
-    ).order_by(Expense.date).all()
+    incomes, expenses = get_period_entries(db, user.id, start, end)
 
     total_income = sum(i.amount for i in incomes)
     total_expense = sum(e.amount for e in expenses)
@@ -161,13 +167,7 @@ def export_excel(
     """Generate and download an Excel report."""
     start, end = get_date_range(period)
 
-    incomes = db.query(Income).filter(
-        Income.user_id == user.id, Income.date >= start, Income.date <= end
-    ).order_by(Income.date).all()
-
-    expenses = db.query(Expense).filter(
-        Expense.user_id == user.id, Expense.date >= start, Expense.date <= end
-    ).order_by(Expense.date).all()
+    incomes, expenses = get_period_entries(db, user.id, start, end)
 
     total_income = sum(i.amount for i in incomes)
     total_expense = sum(e.amount for e in expenses)
@@ -0,0 +1,46 @@
+"""
+BudgetIQ – Transaction Search Routes
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User
+from auth import get_current_user
+from schemas import SearchResult
+from etags import etag_guard
+from pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from search import search_transactions, search_terms
+
+router = APIRouter(prefix="/api/search", tags=["Search"])
+
+
+@router.get("", response_model=List[SearchResult], dependencies=[Depends(etag_guard("search"))])
+def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: str = Query("all", regex="^(all|income|expense)$"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Full-text search over expense descriptions and income sources (and categories),
+    best match first. Every word must match, as a prefix.
+    """
+    if not search_terms(q):
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+    offset = 0
+    if cursor:
+        # Ranked results page by position; the cursor records it
+        values = decode_cursor(cursor)
+        if len(values) != 2 or values[0] != "search" or not isinstance(values[1], int) or values[1] < 0:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        offset = values[1]
+
+    rows = search_transactions(db, user.id, q, kind, limit + 1, offset)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(["search", offset + limit])
+    return rows
@@ -0,0 +1,28 @@
+"""
+BudgetIQ – Delta Sync Routes
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User
+from auth import get_current_user
+from schemas import SyncResponse
+from etags import etag_guard
+from sync import get_changes
+
+router = APIRouter(prefix="/api/sync", tags=["Sync"])
+
+
+@router.get("", response_model=SyncResponse, dependencies=[Depends(etag_guard("sync"))])
+def sync(
+    since: Optional[str] = Query(None, description="next_token from the previous sync; omit for a full initial sync"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """
+    Incomes, expenses and notifications created or modified since the token,
+    plus ids deleted since then. Keep calling with next_token while has_more.
+    """
+    return get_changes(db, user.id, user.data_version or 0, since, limit)
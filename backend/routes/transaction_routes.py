@@ -0,0 +1,45 @@
+"""
+BudgetIQ – Unified Transactions Feed & Batch Mutation Routes
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User
+from auth import get_current_user
+from schemas import TransactionItem, BatchMutationRequest, BatchMutationResult
+from etags import etag_guard
+from filters import TransactionQuery
+from pagination import NEXT_CURSOR_HEADER
+from feed import get_feed
+from mutations import run_batch
+from rollups import INCOME, EXPENSE
+
+router = APIRouter(prefix="/api/transactions", tags=["Transactions"])
+
+
+@router.get("", response_model=List[TransactionItem], dependencies=[Depends(etag_guard("transactions"))])
+def get_transactions(
+    response: Response,
+    kind: str = Query("all", regex="^(all|income|expense)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    filters: TransactionQuery = Depends(),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Incomes and expenses interleaved in one order (newest first by default), one page at a time."""
+    kinds = (INCOME, EXPENSE) if kind == "all" else (kind,)
+    rows, next_cursor = get_feed(db, user.id, filters, limit, cursor, kinds)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
+
+
+@router.post("/batch", response_model=BatchMutationResult)
+def batch_mutate(req: BatchMutationRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """
+    Delete, recategorize or edit many incomes/expenses (by ids and/or filter) in
+    one transaction. Returns the rows affected per operation.
+    """
+    return run_batch(db, user.id, req.operations)
@@ -2,8 +2,9 @@
 BudgetIQ – Pydantic Schemas for request/response validation
 """
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Any, Optional, List, Dict
+from datetime import date, datetime
+from config import MAX_BULK_ITEMS
 
 
 # ─── Auth Schemas ────────────────────────────────────────
@@ -92,6 +93,35 @@ class ExpenseResponse(BaseModel):
         from_attributes = True
 
 
+# ─── Bulk Ingestion Schemas ─────────────────────────────
+
+class BulkRequest(BaseModel):
+    # Items are validated one by one so a bad row is reported, not fatal
+    items: List[Any] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class BulkItemError(BaseModel):
+    index: int
+    errors: List[str]
+
+class BulkInsertResult(BaseModel):
+    inserted: int
+    ids: List[int]
+    errors: List[BulkItemError]
+
+
+class CsvColumnMapping(BaseModel):
+    """How bank-statement CSV columns map onto incomes/expenses."""
+    date_column: str = "Date"
+    amount_column: Optional[str] = "Amount"  # signed: negative = expense, positive = income
+    debit_column: Optional[str] = None       # alternative to amount_column: debits are expenses
+    credit_column: Optional[str] = None      # ...and credits are income
+    description_column: Optional[str] = "Description"
+    category_column: Optional[str] = None
+    default_category: str = Field("Uncategorized", min_length=1, max_length=100)
+    date_format: Optional[str] = None        # strptime format; ISO and common bank formats by default
+    delimiter: str = Field(",", min_length=1, max_length=1)
+
+
 # ─── Dashboard Schemas ──────────────────────────────────
 
 class DashboardSummary(BaseModel):
@@ -107,6 +137,20 @@ class ChartDataPoint(BaseModel):
     expense: float
     net_worth: float
 
+class TimeSeriesPoint(BaseModel):
+    start: date
+    income: float
+    expense: float
+    net_worth: float
+    income_by_category: Optional[Dict[str, float]] = None
+    expense_by_category: Optional[Dict[str, float]] = None
+
+class TimeSeriesResponse(BaseModel):
+    granularity: str
+    start: date
+    end: date
+    points: List[TimeSeriesPoint]
+
 
 # ─── AI / Chat Schemas ──────────────────────────────────
 
@@ -115,6 +159,22 @@ class AiInsight(BaseModel):
     message: str
     icon: Optional[str] = None
 
+class ForecastCategory(BaseModel):
+    category: str
+    model: str  # exponential_smoothing, seasonal_naive, linear_trend
+    forecast: float
+    month_to_date: float
+    month_end: float
+
+class ForecastResponse(BaseModel):
+    as_of: date
+    horizon_days: int
+    history_days: int
+    total: float
+    month_to_date: float
+    month_end: float
+    categories: List[ForecastCategory]
+
 class ChatMessage(BaseModel):
     message: str
 
@@ -134,3 +194,102 @@ class NotificationResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# ─── Dashboard Bootstrap Schema ─────────────────────────
+
+class DashboardBootstrap(BaseModel):
+    """Everything the dashboard needs on load; a failed section is null and listed in errors."""
+    summary: Optional[DashboardSummary] = None
+    chart_data: Optional[List[ChartDataPoint]] = None
+    insights: Optional[List[AiInsight]] = None
+    notifications: Optional[List[NotificationResponse]] = None
+    errors: Dict[str, str] = {}
+
+
+# ─── Search Schemas ─────────────────────────────────────
+
+class SearchResult(BaseModel):
+    kind: str  # income, expense
+    id: int
+    amount: float
+    category: str
+    text: Optional[str] = None  # expense description / income source
+    date: datetime
+    score: float
+
+
+# ─── Transactions Feed Schema ───────────────────────────
+
+class TransactionItem(BaseModel):
+    kind: str  # income, expense
+    id: int
+    amount: float
+    category: str
+    description: Optional[str] = None  # expenses only
+    source: Optional[str] = None       # incomes only
+    date: datetime
+    created_at: datetime
+
+
+# ─── Batch Mutation Schemas ─────────────────────────────
+
+class BatchFilter(BaseModel):
+    """Selects rows like the list routes' filters; date_to includes the whole day."""
+    category: Optional[List[str]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    min_amount: Optional[float] = Field(None, ge=0)
+    max_amount: Optional[float] = Field(None, ge=0)
+
+class BatchChanges(BaseModel):
+    amount: Optional[float] = Field(None, gt=0)
+    category: Optional[str] = Field(None, min_length=1, max_length=100)
+    date: Optional[datetime] = None
+    description: Optional[str] = None                                   # expenses only
+    source: Optional[str] = Field(None, min_length=1, max_length=200)  # incomes only
+
+class BatchOperation(BaseModel):
+    op: str = Field(..., pattern="^(delete|recategorize|update)$")
+    kind: str = Field(..., pattern="^(income|expense)$")
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=MAX_BULK_ITEMS)
+    filter: Optional[BatchFilter] = None
+    category: Optional[str] = Field(None, min_length=1, max_length=100)  # recategorize
+    changes: Optional[BatchChanges] = None                                # update
+
+class BatchMutationRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=50)
+
+class BatchOperationResult(BaseModel):
+    op: str
+    kind: str
+    affected: int
+
+class BatchMutationResult(BaseModel):
+    results: List[BatchOperationResult]
+    total_affected: int
+
+
+# ─── Delta Sync Schemas ─────────────────────────────────
+
+class SyncTombstone(BaseModel):
+    kind: str  # income, expense, notification
+    id: int
+
+class SyncResponse(BaseModel):
+    incomes: List[IncomeResponse]
+    expenses: List[ExpenseResponse]
+    notifications: List[NotificationResponse]
+    deleted: List[SyncTombstone]
+    next_token: str  # pass as ?since= on the next call
+    has_more: bool   # call again right away with next_token
+
+
+# ─── Category Schemas ───────────────────────────────────
+
+class CategoryResponse(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
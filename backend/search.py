@@ -0,0 +1,136 @@
+"""
+BudgetIQ – Full-Text Search over Transactions
+Indexes Expense.description and Income.source (plus category) for ranked search.
+
+  - SQLite: external-content FTS5 tables (expenses_fts, incomes_fts) kept in
+    sync by insert/update/delete triggers, ranked with bm25().
+  - PostgreSQL: a generated tsvector column per table with a GIN index, ranked
+    with ts_rank(). The database keeps it current on every write.
+
+ensure_search_index() is idempotent and is applied by migration 0007.
+"""
+import logging
+import re
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from database import IS_SQLITE
+
+logger = logging.getLogger(__name__)
+
+# Searchable text column per table
+SEARCH_TABLES = {"expenses": "description", "incomes": "source"}
+
+# Terms beyond this are ignored; keeps MATCH / tsquery expressions small
+MAX_SEARCH_TERMS = 8
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(q: str) -> List[str]:
+    """Lower-cased word tokens of a user query; punctuation and operators are dropped."""
+    return [t.lower() for t in _TERM.findall(q or "")][:MAX_SEARCH_TERMS]
+
+
+# ─── Index Setup ─────────────────────────────────────────
+
+def _ensure_sqlite(conn):
+    for table, column in SEARCH_TABLES.items():
+        fts = f"{table}_fts"
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+        ).first()
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{column}, category, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {column}, category) VALUES (new.id, new.{column}, new.category); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column}, category) VALUES ('delete', old.id, old.{column}, old.category); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {column}, category ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {column}, category) VALUES ('delete', old.id, old.{column}, old.category); "
+            f"INSERT INTO {fts}(rowid, {column}, category) VALUES (new.id, new.{column}, new.category); END"
+        ))
+        if not exists:
+            # Index rows written before the FTS table existed
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            logger.info(f"Built full-text index {fts}.")
+
+
+def _ensure_postgres(conn):
+    for table, column in SEARCH_TABLES.items():
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('simple', coalesce({column}, '') || ' ' || coalesce(category, ''))) STORED"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+        ))
+
+
+def ensure_search_index(conn: Connection):
+    """Create the full-text index structures if missing (idempotent; run by migration 0007)."""
+    if conn.dialect.name == "sqlite":
+        _ensure_sqlite(conn)
+    else:
+        _ensure_postgres(conn)
+
+
+# ─── Queries ─────────────────────────────────────────────
+
+def _sqlite_select(kind: str, table: str, column: str) -> str:
+    fts = f"{table}_fts"
+    return (
+        f"SELECT '{kind}' AS kind, t.id, t.amount, t.category, t.{column} AS text, t.date, "
+        f"-bm25({fts}) AS score "
+        f"FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+        f"WHERE {fts} MATCH :match AND t.user_id = :user_id"
+    )
+
+
+def _postgres_select(kind: str, table: str, column: str) -> str:
+    return (
+        f"SELECT '{kind}' AS kind, t.id, t.amount, t.category, t.{column} AS text, t.date, "
+        f"ts_rank(t.search_vector, to_tsquery('simple', :match)) AS score "
+        f"FROM {table} t "
+        f"WHERE t.user_id = :user_id AND t.search_vector @@ to_tsquery('simple', :match)"
+    )
+
+
+def search_transactions(db: Session, user_id: int, q: str, kind: str = "all", limit: int = 50, offset: int = 0) -> List[dict]:
+    """
+    Rank a user's incomes/expenses against `q` (every term must match, each as a
+    prefix). Returns up to `limit` dicts (kind, id, amount, category, text, date,
+    score), best match first; ties fall back to newest first.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    if IS_SQLITE:
+        match = " ".join(f'"{t}"*' for t in terms)
+        build = _sqlite_select
+    else:
+        match = " & ".join(f"{t}:*" for t in terms)
+        build = _postgres_select
+
+    selects = []
+    if kind in ("all", "expense"):
+        selects.append(build("expense", "expenses", SEARCH_TABLES["expenses"]))
+    if kind in ("all", "income"):
+        selects.append(build("income", "incomes", SEARCH_TABLES["incomes"]))
+
+    sql = (
+        " UNION ALL ".join(selects)
+        + " ORDER BY score DESC, date DESC, kind, id DESC LIMIT :limit OFFSET :offset"
+    )
+    rows = db.execute(
+        text(sql), {"match": match, "user_id": user_id, "limit": limit, "offset": offset}
+    ).mappings().all()
+    return [dict(r) for r in rows]
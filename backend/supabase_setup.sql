@@ -11,35 +11,79 @@ CREATE TABLE IF NOT EXISTS users (
     hashed_password VARCHAR(255) NOT NULL,
     is_verified BOOLEAN DEFAULT FALSE,
     avatar_path VARCHAR(500),
+    data_version INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 
+-- 1b. CATEGORIES (per-user lookup; incomes, expenses and rollups reference it by category_id)
+CREATE TABLE IF NOT EXISTS categories (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    CONSTRAINT uq_categories_user_name UNIQUE (user_id, name)
+);
+
 -- 2. INCOMES TABLE
 CREATE TABLE IF NOT EXISTS incomes (
     id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     amount DOUBLE PRECISION NOT NULL,
     source VARCHAR(200) NOT NULL,
+    category VARCHAR(100) NOT NULL DEFAULT 'Other',  -- display name of category_id
+    category_id INTEGER NOT NULL REFERENCES categories(id),
     date TIMESTAMP WITH TIME ZONE NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    -- integer bucket keys of date, set by the API on every write (see buckets.py)
+    epoch_day INTEGER,
+    iso_week INTEGER,
+    year_month INTEGER,
+    fingerprint VARCHAR(64),
+    change_seq INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    search_vector tsvector GENERATED ALWAYS AS (to_tsvector('simple', coalesce(source, '') || ' ' || coalesce(category, ''))) STORED
 );
 
 CREATE INDEX IF NOT EXISTS idx_incomes_user ON incomes(user_id);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_date_id ON incomes(user_id, date, id);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_category_id_date ON incomes(user_id, category_id, date, id);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_amount_id ON incomes(user_id, amount, id);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_fingerprint ON incomes(user_id, fingerprint);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_change_seq ON incomes(user_id, change_seq, id);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_epoch_day ON incomes(user_id, epoch_day);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_iso_week ON incomes(user_id, iso_week);
+CREATE INDEX IF NOT EXISTS ix_incomes_user_year_month ON incomes(user_id, year_month);
+CREATE INDEX IF NOT EXISTS ix_incomes_search_vector ON incomes USING GIN (search_vector);
 
 -- 3. EXPENSES TABLE
 CREATE TABLE IF NOT EXISTS expenses (
     id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     amount DOUBLE PRECISION NOT NULL,
-    category VARCHAR(100) NOT NULL,
+    category VARCHAR(100) NOT NULL,  -- display name of category_id
+    category_id INTEGER NOT NULL REFERENCES categories(id),
     description TEXT,
     date TIMESTAMP WITH TIME ZONE NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    -- integer bucket keys of date, set by the API on every write (see buckets.py)
+    epoch_day INTEGER,
+    iso_week INTEGER,
+    year_month INTEGER,
+    fingerprint VARCHAR(64),
+    change_seq INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    search_vector tsvector GENERATED ALWAYS AS (to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(category, ''))) STORED
 );
 
 CREATE INDEX IF NOT EXISTS idx_expenses_user ON expenses(user_id);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_date_id ON expenses(user_id, date, id);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_category_id_date ON expenses(user_id, category_id, date, id);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_amount_id ON expenses(user_id, amount, id);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_fingerprint ON expenses(user_id, fingerprint);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_change_seq ON expenses(user_id, change_seq, id);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_epoch_day ON expenses(user_id, epoch_day);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_iso_week ON expenses(user_id, iso_week);
+CREATE INDEX IF NOT EXISTS ix_expenses_user_year_month ON expenses(user_id, year_month);
+CREATE INDEX IF NOT EXISTS ix_expenses_search_vector ON expenses USING GIN (search_vector);
 
 -- 4. NOTIFICATIONS TABLE
 CREATE TABLE IF NOT EXISTS notifications (
@@ -48,10 +92,76 @@ CREATE TABLE IF NOT EXISTS notifications (
     message TEXT NOT NULL,
     type VARCHAR(50) DEFAULT 'info',
     is_read BOOLEAN DEFAULT FALSE,
+    change_seq INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id);
+CREATE INDEX IF NOT EXISTS ix_notifications_user_created ON notifications(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_notifications_user_change_seq ON notifications(user_id, change_seq, id);
+
+-- 5. ROLLUP TABLES (maintained by the API on every income/expense write;
+--    backfill existing data with: python rebuild_rollups.py)
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    epoch_day INTEGER,
+    iso_week INTEGER,
+    year_month INTEGER,
+    kind VARCHAR(10) NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, kind, category_id)
+);
+
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    year_month INTEGER,
+    kind VARCHAR(10) NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month, kind, category_id)
+);
+
+-- 5b. CATEGORY STATS (per-category expense statistics for anomaly alerts, updated
+--     by the API on every new expense; backfill with: python rebuild_anomaly_stats.py,
+--     recompute the ones edits/deletes flagged stale with: python rebuild_anomaly_stats.py --stale)
+CREATE TABLE IF NOT EXISTS category_stats (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    category VARCHAR(100) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+    m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+    median DOUBLE PRECISION NOT NULL DEFAULT 0,
+    mad DOUBLE PRECISION NOT NULL DEFAULT 0,
+    stale BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (user_id, category)
+);
+
+-- 5c. PRECOMPUTED INSIGHTS (written by: python precompute_insights.py; served while
+--     data_version and as_of still match the user)
+CREATE TABLE IF NOT EXISTS precomputed_insights (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    data_version INTEGER NOT NULL,
+    as_of DATE NOT NULL,
+    insights TEXT NOT NULL,
+    computed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 6. TOMBSTONES (deleted incomes/expenses/notifications, for /api/sync)
+CREATE TABLE IF NOT EXISTS tombstones (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    kind VARCHAR(20) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    change_seq INTEGER NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_tombstones_user_change_seq ON tombstones(user_id, change_seq, id);
 
 
 -- ============================================================
@@ -0,0 +1,114 @@
+"""
+BudgetIQ – Delta Sync
+Lets clients keep a local copy of their incomes, expenses and notifications
+and fetch only what changed. The user's data_version doubles as a per-user
+change sequence: every write bumps it first and stamps the rows it creates or
+modifies with the new value (change_seq); deletes leave a Tombstone stamped
+the same way.
+
+A sync token is an opaque cursor over (change_seq, stream, id). Each table is
+read in that order from its (user_id, change_seq, id) index and the streams
+are merged, so a token may point inside one large write and still resume
+exactly.
+"""
+import heapq
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import func, insert, literal, select, tuple_
+from sqlalchemy.orm import Session
+from models import Income, Expense, Notification, Tombstone
+from pagination import decode_cursor, encode_cursor
+
+# Change streams in merge order (ties on change_seq break on stream name)
+STREAMS = (
+    ("expense", Expense),
+    ("income", Income),
+    ("notification", Notification),
+    ("tombstone", Tombstone),
+)
+
+
+def record_tombstones(db: Session, model, kind: str, clauses: list, seq: int):
+    """
+    Insert a tombstone for every `model` row matching `clauses`, in one
+    INSERT ... SELECT. Call before deleting those rows. Does not commit.
+    """
+    db.execute(insert(Tombstone).from_select(
+        ["user_id", "kind", "entity_id", "change_seq", "deleted_at"],
+        select(model.user_id, literal(kind), model.id, literal(seq), func.now()).where(*clauses),
+    ))
+
+
+# Stream marker meaning "every row stamped with this change_seq was delivered";
+# sorts after all stream names
+_SEQ_COMPLETE = "~"
+
+
+def encode_token(seq: int, stream: Optional[str] = None, last_id: int = 0) -> str:
+    """Token for "delivered through seq" or, mid-write, "through (seq, stream, id)"."""
+    return encode_cursor([seq] if stream is None else [seq, stream, last_id])
+
+
+def decode_token(token: Optional[str]) -> Tuple[int, str, int]:
+    """(seq, stream, id) already delivered; no token means nothing delivered yet."""
+    if not token:
+        return -1, _SEQ_COMPLETE, 0
+    values = decode_cursor(token)
+    try:
+        if len(values) == 1:
+            return int(values[0]), _SEQ_COMPLETE, 0
+        seq, stream, last_id = values
+        if stream not in dict(STREAMS):
+            raise ValueError("unknown stream")
+        return int(seq), stream, int(last_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+def _after(model, stream: str, seq: int, last_stream: str, last_id: int):
+    """Rows of one stream that sort after (seq, last_stream, last_id)."""
+    if stream == last_stream:
+        return tuple_(model.change_seq, model.id) > tuple_(seq, last_id)
+    return model.change_seq >= seq if stream > last_stream else model.change_seq > seq
+
+
+def get_changes(db: Session, user_id: int, current_version: int, token: Optional[str], limit: int) -> dict:
+    """
+    Changes after `token`, up to `limit` rows across all streams, bounded by
+    `current_version` so rows from uncommitted or later writes are left for the
+    next sync. Returns rows grouped by stream plus next_token and has_more.
+    """
+    seq, last_stream, last_id = decode_token(token)
+
+    candidates = []
+    for stream, model in STREAMS:
+        rows = db.execute(
+            select(model)
+            .where(model.user_id == user_id, model.change_seq <= current_version,
+                   _after(model, stream, seq, last_stream, last_id))
+            .order_by(model.change_seq, model.id)
+            .limit(limit + 1)
+        ).scalars().all()
+        candidates.append([(row.change_seq, stream, row.id, row) for row in rows])
+
+    merged = list(heapq.merge(*candidates, key=lambda c: c[:3]))
+    has_more = len(merged) > limit
+    page = merged[:limit]
+
+    changes = {stream: [] for stream, _ in STREAMS}
+    for _, stream, _, row in page:
+        changes[stream].append(row)
+
+    if has_more:
+        last_seq, last_stream, last_id = page[-1][:3]
+        next_token = encode_token(last_seq, last_stream, last_id)
+    else:
+        next_token = encode_token(max(current_version, seq))
+    return {
+        "incomes": changes["income"],
+        "expenses": changes["expense"],
+        "notifications": changes["notification"],
+        "deleted": [{"kind": t.kind, "id": t.entity_id} for t in changes["tombstone"]],
+        "next_token": next_token,
+        "has_more": has_more,
+    }
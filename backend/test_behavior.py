@@ -0,0 +1,427 @@
+"""
+BudgetIQ – Behavioral Regression Tests
+Drives the API end to end against a migrated throwaway database and checks
+what clients rely on: delta sync paging and tombstones, rollups staying exact
+through batch mutations, CSV re-import deduplication, anomaly statistics
+following bulk writes, conditional GETs, time-series range limits, rejection
+of malformed cursors, the LLM provider contract, and which chat messages skip
+the LLM.
+
+Uses a throwaway SQLite file unless TEST_DATABASE_URL points at a PostgreSQL
+database (it is never read from .env, so tests can't touch production data).
+Every test signs in as a fresh user, so tests don't depend on each other.
+
+Usage:
+    python -m pytest test_behavior.py
+    python test_behavior.py
+"""
+import itertools
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+_TMP_DIR = tempfile.mkdtemp(prefix="budgetiq-behavior-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{_TMP_DIR}/behavior.db"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from database import engine, Base, SessionLocal
+from models import User, Expense, DailyRollup, CategoryStats
+from migrate import run_migrations
+from auth import create_access_token
+from rebuild_anomaly_stats import rebuild_stale_chunk
+from rollups import EXPENSE
+
+_client = None
+_user_numbers = itertools.count(1)
+
+
+def setup_module(module=None):
+    global _client
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    import main
+    _client = TestClient(main.app)
+
+
+def new_user() -> dict:
+    """Create a verified user and return auth headers for it."""
+    email = f"behavior-{os.getpid()}-{next(_user_numbers)}@example.com"
+    db = SessionLocal()
+    try:
+        db.add(User(name="Behavior Test", email=email, hashed_password="x", is_verified=True))
+        db.commit()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def user_id(headers: dict) -> int:
+    return _client.get("/api/profile", headers=headers).json()["id"]
+
+
+def add_expense(headers: dict, amount: float, category: str = "Food", days_ago: int = 1) -> int:
+    when = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    r = _client.post("/api/expenses", headers=headers, json={
+        "amount": amount, "category": category, "description": f"{category} {amount}", "date": when.isoformat(),
+    })
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def assert_rollups_exact(uid: int):
+    """Daily expense rollups must equal the expenses table grouped by (category_id, day)."""
+    db = SessionLocal()
+    try:
+        actual = {
+            (category_id, day): (round(total, 2), count)
+            for category_id, day, total, count in db.execute(
+                select(Expense.category_id, Expense.epoch_day, func.sum(Expense.amount), func.count(Expense.id))
+                .where(Expense.user_id == uid)
+                .group_by(Expense.category_id, Expense.epoch_day)
+            )
+        }
+        rolled = {
+            (r.category_id, r.epoch_day): (round(r.total, 2), r.count)
+            for r in db.execute(
+                select(DailyRollup).where(DailyRollup.user_id == uid, DailyRollup.kind == EXPENSE, DailyRollup.count != 0)
+            ).scalars()
+        }
+    finally:
+        db.close()
+    assert rolled == actual, f"rollups {rolled} != expenses {actual}"
+
+
+def import_csv(headers: dict, text: str) -> dict:
+    """Upload a CSV and return its final event."""
+    r = _client.post("/api/import/csv", headers=headers, files={"file": ("statement.csv", text, "text/csv")})
+    assert r.status_code == 200, r.text
+    return json.loads(r.text.strip().splitlines()[-1])
+
+
+# ─── Delta Sync ──────────────────────────────────────────
+
+def test_sync_paging_and_tombstones():
+    headers = new_user()
+    ids = [add_expense(headers, 10 + i) for i in range(5)]
+
+    seen, token, pages = [], None, 0
+    while True:
+        params = {"limit": 2} if token is None else {"limit": 2, "since": token}
+        body = _client.get("/api/sync", headers=headers, params=params).json()
+        seen.extend(e["id"] for e in body["expenses"])
+        token, pages = body["next_token"], pages + 1
+        if not body["has_more"]:
+            break
+    assert sorted(seen) == sorted(ids), f"paged sync delivered {seen}, expected {ids}"
+    assert pages == 3, f"5 rows at limit 2 should take 3 pages, took {pages}"
+
+    assert _client.delete(f"/api/expenses/{ids[0]}", headers=headers).status_code == 200
+    body = _client.get("/api/sync", headers=headers, params={"since": token}).json()
+    assert body["deleted"] == [{"kind": "expense", "id": ids[0]}], body["deleted"]
+    assert body["expenses"] == []
+
+    body = _client.get("/api/sync", headers=headers, params={"since": body["next_token"]}).json()
+    assert body["deleted"] == [] and body["expenses"] == [], "an up-to-date token must return no changes"
+
+
+# ─── Batch Mutations ─────────────────────────────────────
+
+def test_batch_mutation_rollups():
+    headers = new_user()
+    food = [add_expense(headers, 20 + i, "Food", days_ago=1 + i % 3) for i in range(6)]
+    rent = add_expense(headers, 900, "Rent", days_ago=2)
+
+    r = _client.post("/api/transactions/batch", headers=headers, json={"operations": [
+        {"op": "recategorize", "kind": "expense", "ids": food[:2], "category": "Travel"},
+        {"op": "update", "kind": "expense", "ids": food[2:4], "changes": {"amount": 5}},
+        {"op": "update", "kind": "expense", "ids": [rent],
+         "changes": {"date": (datetime.now(timezone.utc) - timedelta(days=40)).isoformat()}},
+        {"op": "delete", "kind": "expense", "ids": food[4:]},
+    ]})
+    assert r.status_code == 200, r.text
+    assert r.json()["total_affected"] == 7, r.json()
+    assert_rollups_exact(user_id(headers))
+
+
+def test_batch_mutation_rolls_back_on_error():
+    headers = new_user()
+    ids = [add_expense(headers, 30), add_expense(headers, 40)]
+    r = _client.post("/api/transactions/batch", headers=headers, json={"operations": [
+        {"op": "delete", "kind": "expense", "ids": ids[:1]},
+        {"op": "recategorize", "kind": "expense", "ids": ids[1:]},  # missing category
+    ]})
+    assert r.status_code == 400, r.text
+    listed = [e["id"] for e in _client.get("/api/expenses", headers=headers).json()]
+    assert sorted(listed) == sorted(ids), "a failed batch must not apply earlier operations"
+    assert_rollups_exact(user_id(headers))
+
+
+def test_batch_update_rejects_null_changes():
+    headers = new_user()
+    ids = [add_expense(headers, 30)]
+    for field in ("amount", "category", "date"):
+        r = _client.post("/api/transactions/batch", headers=headers, json={"operations": [
+            {"op": "update", "kind": "expense", "ids": ids, "changes": {field: None}},
+        ]})
+        assert r.status_code == 400, f"null {field}: {r.status_code} {r.text}"
+    assert_rollups_exact(user_id(headers))
+
+
+# ─── CSV Import ──────────────────────────────────────────
+
+def test_csv_reimport_skips_duplicates():
+    headers = new_user()
+    statement = (
+        "Date,Amount,Description\n"
+        "02/01/2024,-12.50,Coffee\n"
+        "02/01/2024,-12.50,Coffee\n"   # a second identical purchase, not a duplicate
+        "03/01/2024,2500,Salary\n"
+        "not a date,-1,Broken\n"
+    )
+    first = import_csv(headers, statement)
+    assert (first["inserted"], first["duplicates"], first["errors"]) == (3, 0, 1), first
+
+    again = import_csv(headers, statement)
+    assert (again["inserted"], again["duplicates"]) == (0, 3), again
+
+    extended = import_csv(headers, statement + "04/01/2024,-7,Lunch\n")
+    assert (extended["inserted"], extended["duplicates"]) == (1, 3), extended
+    assert_rollups_exact(user_id(headers))
+
+
+def test_csv_import_skips_manual_entries():
+    headers = new_user()
+    when = datetime(2024, 3, 6, 12, 0)
+    for _ in range(2):
+        r = _client.post("/api/expenses", headers=headers, json={
+            "amount": 9.5, "category": "Food", "description": "Coffee", "date": when.isoformat(),
+        })
+        assert r.status_code == 200, r.text
+    statement = "Date,Amount,Description\n2024-03-06,-9.50,Coffee\n2024-03-06,-9.50,Coffee\n2024-03-06,-9.50,Coffee\n"
+    result = import_csv(headers, statement)
+    assert (result["inserted"], result["duplicates"]) == (1, 2), result
+
+
+# ─── Anomaly Alerts ──────────────────────────────────────
+
+def alerts(headers: dict) -> list:
+    return [n for n in _client.get("/api/notifications", headers=headers).json() if n["type"] == "alert"]
+
+
+def test_anomaly_stats_follow_bulk_writes():
+    headers = new_user()
+    uid = user_id(headers)
+    day = (datetime.now(timezone.utc) - timedelta(days=3)).isoformat()
+    items = [{"amount": 40 + i % 5, "category": "Food", "description": f"lunch {i}", "date": day} for i in range(12)]
+    ids = _client.post("/api/expenses/bulk", headers=headers, json={"items": items}).json()["ids"]
+    statement = "Date,Amount,Description\n" + "".join(f"0{1 + i % 9}/01/2024,-{20 + i % 3},Bus {i}\n" for i in range(12))
+    assert import_csv(headers, statement)["inserted"] == 12
+
+    add_expense(headers, 400, "Food")
+    add_expense(headers, 300, "Uncategorized")
+    assert len(alerts(headers)) == 2, "expenses far above bulk-added and imported history must alert"
+
+    r = _client.post("/api/transactions/batch", headers=headers, json={"operations": [
+        {"op": "delete", "kind": "expense", "ids": ids[:6]},
+    ]})
+    assert r.status_code == 200, r.text
+    add_expense(headers, 45, "Food")
+
+    def food_stats():
+        db = SessionLocal()
+        try:
+            stats = db.get(CategoryStats, (uid, "Food"))
+            amounts = db.execute(
+                select(Expense.amount).where(Expense.user_id == uid, Expense.category == "Food")
+            ).scalars().all()
+            return stats, amounts
+        finally:
+            db.close()
+
+    stats, amounts = food_stats()
+    assert stats.stale and stats.count == 14, "deletes must only flag the stats, not rebuild them on the request"
+    assert rebuild_stale_chunk(uid, uid + 1) == 1
+    stats, amounts = food_stats()
+    assert not stats.stale and stats.count == len(amounts) == 8, f"stats count {stats.count}, expenses {len(amounts)}"
+    assert abs(stats.mean - sum(amounts) / len(amounts)) < 1e-9, "the stale rebuild must recompute from history"
+
+
+# ─── Conditional GET ─────────────────────────────────────
+
+def test_etag_not_modified():
+    headers = new_user()
+    add_expense(headers, 15)
+    first = _client.get("/api/expenses", headers=headers)
+    etag = first.headers["ETag"]
+
+    cached = _client.get("/api/expenses", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304, cached.status_code
+    assert cached.headers["ETag"] == etag and not cached.content
+
+    weak = _client.get("/api/expenses", headers={**headers, "If-None-Match": f'"other", W/{etag}'})
+    assert weak.status_code == 304, "a weak or listed match must also be Not Modified"
+
+    add_expense(headers, 16)
+    changed = _client.get("/api/expenses", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag, "a write must change the ETag"
+
+
+# ─── Time Series ─────────────────────────────────────────
+
+def test_timeseries_range_limits():
+    headers = new_user()
+    for granularity, start in (("day", "9999-12-01"), ("week", "9999-12-01"), ("month", "9999-12-01"),
+                               ("quarter", "9999-10-01"), ("year", "9999-01-01")):
+        r = _client.get("/api/dashboard/timeseries", headers=headers,
+                        params={"start": start, "end": "9999-12-31", "granularity": granularity})
+        assert r.status_code == 400, f"{granularity} ending at date.max: {r.status_code}"
+    r = _client.get("/api/dashboard/timeseries", headers=headers,
+                    params={"start": "9999-11-01", "end": "9999-11-30", "granularity": "month"})
+    assert r.status_code == 200, r.text
+
+
+# ─── Forecast ────────────────────────────────────────────
+
+def test_forecast_cache_follows_utc_day():
+    import forecast
+    headers = new_user()
+    add_expense(headers, 12)
+    today = _client.get("/api/ai/forecast", headers=headers).json()
+
+    class Tomorrow(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(days=1)
+
+    forecast.datetime = Tomorrow
+    try:
+        tomorrow = _client.get("/api/ai/forecast", headers=headers).json()
+    finally:
+        forecast.datetime = datetime
+    assert tomorrow["as_of"] > today["as_of"], "a cached forecast must not outlive its UTC day"
+
+
+# ─── Cursor Validation ───────────────────────────────────
+
+def test_malformed_cursors_rejected():
+    headers = new_user()
+    for i in range(3):
+        add_expense(headers, 50 + i)
+
+    for cursor in ("not-a-cursor", "e30", "WzEsMl0"):  # garbage, {}, [1,2]
+        r = _client.get("/api/transactions", headers=headers, params={"cursor": cursor})
+        assert r.status_code == 400, f"cursor {cursor!r}: {r.status_code}"
+
+    page = _client.get("/api/transactions", headers=headers, params={"limit": 1, "sort": "amount"})
+    cursor = page.headers["X-Next-Cursor"]
+    assert _client.get("/api/transactions", headers=headers,
+                       params={"limit": 1, "sort": "amount", "cursor": cursor}).status_code == 200
+    r = _client.get("/api/transactions", headers=headers, params={"limit": 1, "sort": "category", "cursor": cursor})
+    assert r.status_code == 400, "a cursor must not be accepted under another sort"
+
+    for token in ("not-a-token", "WzEsInBldHMiLDJd"):  # garbage, [1,"pets",2]
+        r = _client.get("/api/sync", headers=headers, params={"since": token})
+        assert r.status_code == 400, f"sync token {token!r}: {r.status_code}"
+
+
+# ─── LLM Providers ───────────────────────────────────────
+
+def test_llm_providers():
+    import asyncio
+    from ai_engine import LLMProvider, FakeProvider, FakeLLMError
+
+    class GenerateOnly(LLMProvider):
+        async def generate(self, prompt: str) -> str:
+            return ""
+
+    try:
+        GenerateOnly()
+        assert False, "a provider without stream() must not be instantiable"
+    except TypeError:
+        pass
+
+    async def drain(provider):
+        return [token async for token in provider.stream("prompt")]
+
+    failing = FakeProvider(latency=0, tokens_per_second=0, error_rate=1.0, reply_words=3, seed=1)
+    for _ in range(20):
+        try:
+            asyncio.run(drain(failing))
+            assert False, "error_rate=1 must fail every stream"
+        except FakeLLMError:
+            pass
+
+
+# ─── Chat Routing ────────────────────────────────────────
+
+# Finance questions the canned replies don't answer; they must reach the LLM
+LLM_QUESTIONS = (
+    "What are my transport costs?",
+    "Is my employer's 401k matching program worth joining?",
+    "What's the tax code for freelance income?",
+    "How much should I invest in index funds?",
+    "Where should I keep my emergency fund?",
+    "Explain the rule of 72",
+    "Should I plan for retirement with a Roth IRA?",
+    "How much have I spent on food compared to last month?",
+    "Hello! Is a credit card or a debit card better for me?",
+)
+
+# Questions a canned reply answers exactly from the user's numbers
+DIRECT_QUESTIONS = {
+    "What's my balance?": "balance",
+    "Show me my spending breakdown": "breakdown",
+    "How much have I spent this month?": "breakdown",
+    "What is my income?": "income",
+    "How does this month compare to last month?": "compare",
+    "Make me a budget": "budget",
+}
+
+
+def test_chat_routing():
+    from ai_engine import route_message
+    for message in LLM_QUESTIONS:
+        route = route_message(message)
+        assert not route.direct, f"{message!r} skipped the LLM as {route.intent}"
+        assert route.intent != "off_topic", f"{message!r} was rejected as off-topic"
+    for message, intent in DIRECT_QUESTIONS.items():
+        route = route_message(message)
+        assert route.direct_intent == intent, f"{message!r} routed to {route}"
+    for message in ("Tell me a joke", "What's the weather like?", "Recommend a movie"):
+        route = route_message(message)
+        assert route.intent == "off_topic" and not route.direct, f"{message!r} routed to {route}"
+
+
+def test_chat_prompts():
+    from ai_engine import prepare_chat
+    headers = new_user()
+    add_expense(headers, 25, "Transport")
+    uid = user_id(headers)
+    for message in LLM_QUESTIONS:
+        assert prepare_chat(uid, message, use_llm=True).prompt is not None, f"no LLM prompt for {message!r}"
+    for message in DIRECT_QUESTIONS:
+        plan = prepare_chat(uid, message, use_llm=True)
+        assert plan.prompt is None and plan.fallback, f"{message!r} should be answered without the LLM"
+
+    # Without an LLM, replies keep the keyword precedence ("how much" is a balance question)
+    balance = prepare_chat(uid, "What's my balance?", use_llm=False).fallback
+    breakdown = prepare_chat(uid, "Show me my spending breakdown", use_llm=False).fallback
+    assert prepare_chat(uid, "How much have I spent this month?", use_llm=False).fallback == balance
+    assert prepare_chat(uid, "How much have I spent this month?", use_llm=True).fallback == breakdown
+    assert prepare_chat(uid, "How much have I spent this month?", use_llm=False).prompt is None
+
+
+if __name__ == "__main__":
+    setup_module()
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_") and callable(f)):
+        try:
+            test()
+            print(f"PASS  {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {name}\n{e}\n")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,189 @@
+"""
+BudgetIQ – Query Plan Regression Tests
+Runs the hot read paths of the dashboard, AI engine, reports and list routes
+against a migrated database, captures every SELECT they issue, and EXPLAINs
+each one. A test fails if any statement falls back to a full table scan.
+
+Uses a throwaway SQLite file unless TEST_DATABASE_URL points at a PostgreSQL
+database (it is never read from .env, so tests can't touch production data).
+PostgreSQL plans are checked with enable_seqscan off, since on small tables the
+planner would choose sequential scans regardless of indexes.
+
+Usage:
+    python -m pytest test_query_plans.py
+    python test_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+_TMP_DIR = tempfile.mkdtemp(prefix="budgetiq-plans-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{_TMP_DIR}/plans.db"
+
+from sqlalchemy import event
+from database import engine, Base, SessionLocal, IS_SQLITE
+import models  # noqa: F401  (registers tables on Base.metadata)
+from migrate import run_migrations
+
+# Tables that must only ever be reached through an index
+INDEXED_TABLES = (
+    "incomes", "expenses", "notifications", "tombstones",
+    "daily_rollups", "monthly_rollups", "users",
+)
+
+# Nonexistent user: plans don't depend on data, and nothing real is read
+USER_ID = 2_147_483_000
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+_PG_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def setup_module(module=None):
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+@contextmanager
+def captured_selects():
+    """Collect (sql, params) for every SELECT executed on the engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def full_scans(statement: str, parameters) -> list:
+    """Tables the plan reads without an index (empty list when the plan is fine)."""
+    with engine.connect() as conn:
+        raw = conn.connection.cursor()
+        try:
+            if IS_SQLITE:
+                raw.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                lines = [row[-1] for row in raw.fetchall()]
+                return [m.group(1) for m in map(_SQLITE_SCAN.match, lines) if m and m.group(1) in INDEXED_TABLES]
+            raw.execute("SET LOCAL enable_seqscan = off")
+            raw.execute(f"EXPLAIN {statement}", parameters)
+            lines = [row[0] for row in raw.fetchall()]
+            return [t for line in lines for t in _PG_SEQ_SCAN.findall(line) if t in INDEXED_TABLES]
+        finally:
+            raw.close()
+            conn.rollback()
+
+
+def assert_indexed(run):
+    """Run `run(db)` and fail if any SELECT it issued full-scans an indexed table."""
+    db = SessionLocal()
+    try:
+        with captured_selects() as statements:
+            run(db)
+    finally:
+        db.close()
+    assert statements, "no SELECT statements were captured"
+    failures = []
+    for statement, parameters in statements:
+        scanned = full_scans(statement, parameters)
+        if scanned:
+            failures.append(f"full scan of {', '.join(scanned)} in:\n{statement}")
+    assert not failures, "\n\n".join(failures)
+
+
+# ─── Dashboard ───────────────────────────────────────────
+
+def test_dashboard_summary():
+    from routes.dashboard_routes import compute_summary
+    assert_indexed(lambda db: compute_summary(db, USER_ID))
+
+
+def test_dashboard_chart_data():
+    from routes.dashboard_routes import compute_chart_data
+    assert_indexed(lambda db: (compute_chart_data(db, USER_ID, "monthly"), compute_chart_data(db, USER_ID, "weekly")))
+
+
+def test_dashboard_timeseries():
+    from routes.dashboard_routes import compute_timeseries
+    end = date.today()
+    assert_indexed(lambda db: (
+        compute_timeseries(db, USER_ID, end - timedelta(days=90), end, "day", False),
+        compute_timeseries(db, USER_ID, end - timedelta(days=730), end, "month", True),
+    ))
+
+
+def test_dashboard_notifications():
+    from routes.notification_routes import list_notifications
+    assert_indexed(lambda db: list_notifications(db, USER_ID))
+
+
+# ─── AI Engine ───────────────────────────────────────────
+
+def test_ai_context_queries():
+    from ai_engine import build_user_context
+    assert_indexed(lambda db: build_user_context(db, USER_ID))
+
+
+def test_ai_insights():
+    from ai_engine import generate_insights
+    assert_indexed(lambda db: generate_insights(db, USER_ID))
+
+
+def test_ai_insights_batch():
+    from ai_engine import snapshot_window
+    from aggregates import get_window_totals_for_users
+    window = snapshot_window()
+    assert_indexed(lambda db: get_window_totals_for_users(
+        db, USER_ID, USER_ID + 100, window.since, window.recent_since, window.today))
+
+
+def test_ai_forecast():
+    from forecast import compute_forecast
+    assert_indexed(lambda db: compute_forecast(db, USER_ID))
+
+
+# ─── Reports ─────────────────────────────────────────────
+
+def test_report_period_entries():
+    from routes.report_routes import get_period_entries
+    end = datetime.now(timezone.utc)
+    assert_indexed(lambda db: get_period_entries(db, USER_ID, end - timedelta(days=30), end))
+
+
+# ─── Feed & Sync ─────────────────────────────────────────
+
+def test_feed_and_sync():
+    from feed import get_feed
+    from filters import TransactionQuery
+    from sync import get_changes
+
+    def run(db):
+        for sort in ("date", "amount", "category"):
+            query = TransactionQuery(category=None, date_from=None, date_to=None, min_amount=None,
+                                     max_amount=None, sort=sort, order="desc")
+            get_feed(db, USER_ID, query, 50)
+        filtered = TransactionQuery(category=["Food", "Rent"], date_from=None, date_to=None, min_amount=None,
+                                    max_amount=None, sort="date", order="desc")
+        get_feed(db, USER_ID, filtered, 50)
+        get_changes(db, USER_ID, 10, None, 100)
+
+    assert_indexed(run)
+
+
+if __name__ == "__main__":
+    setup_module()
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_") and callable(f)):
+        try:
+            test()
+            print(f"PASS  {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {name}\n{e}\n")
+    sys.exit(1 if failed else 0)